@@ -0,0 +1,71 @@
+"""Measure the memory used by the data points of a listed data set.
+
+    python scripts/data_point_memory_benchmark.py [--rows 20000] [--columns 3]
+
+The data points are created from the items returned by the api, as the cache of
+the data set does when it lists them, and the memory allocated is measured with
+tracemalloc. No request is sent.
+"""
+import argparse
+import tracemalloc
+from uuid import uuid4
+
+from shimoku.api.client import ApiClient
+from shimoku.api.resources.universe import Universe
+from shimoku.api.resources.business import Business
+from shimoku.api.resources.app import App
+from shimoku.api.resources.data_set import DataSet
+
+
+def get_data_set() -> DataSet:
+    api_client = ApiClient(
+        environment="production", playground=True, config={"access_token": "local"}
+    )
+    universe = Universe(api_client, uuid="local")
+    business = Business(parent=universe, uuid=str(uuid4()))
+    app = App(parent=business, uuid=str(uuid4()))
+    return DataSet(parent=app, uuid=str(uuid4()))
+
+
+def get_items(data_set: DataSet, rows: int, columns: int) -> list:
+    """Items as returned by the api, every field of the schema is present"""
+    items = []
+    for row in range(rows):
+        item = {"id": str(uuid4()), "dataSetId": data_set["id"]}
+        item.update({f"stringField{i}": None for i in range(1, 51)})
+        item.update({f"intField{i}": None for i in range(1, 51)})
+        item.update({f"dateField{i}": None for i in range(1, 6)})
+        item.update(orderField1=None, description=None, customField1=None)
+        for column in range(1, columns + 1):
+            item[f"stringField{column}"] = f"value {row}"
+            item[f"intField{column}"] = float(row)
+        items.append(item)
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--columns", type=int, default=3)
+    args = parser.parse_args()
+
+    data_set = get_data_set()
+    items = get_items(data_set, args.rows, args.columns)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data_points = [
+        DataSet.DataPoint(parent=data_set, db_resource=item) for item in items
+    ]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(
+        f"{len(data_points)} data points with {args.columns} string and "
+        f"{args.columns} int columns: {(after - before) / len(data_points):.0f} "
+        f"bytes per row ({(after - before) / 2 ** 20:.1f} MiB)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Measure the time it takes to import the SDK with `python -X importtime`.
+
+    python scripts/import_time_benchmark.py [--runs 5] [--top 10]
+
+Each statement is executed in a new interpreter several times and the median is
+compared with its budget, the script fails if a budget is exceeded. The modules
+imported by the interpreter at startup are not counted.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Statement executed in a new interpreter and its budget in milliseconds
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    # The package only loads its submodules when they are used
+    "import shimoku": 30,
+    # Loads pandas and aiohttp, the layers need them
+    "from shimoku import Client": 800,
+    # The CLI only imports the modules of the command that is executed
+    "import shimoku.cli.main": 300,
+}
+
+
+def parse_import_times(output: str) -> List[Tuple[str, int, int, int]]:
+    """Parse the output of -X importtime
+    :param output: the standard error of the interpreter
+    :return: the module, its depth, its own time and its cumulative time in us
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_time, cumulative_time, module = line[len("import time:") :].split("|")
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        imports.append((module.strip(), depth, int(self_time), int(cumulative_time)))
+    return imports
+
+
+def run_with_import_times(statement: str) -> List[Tuple[str, int, int, int]]:
+    """Execute a statement in a new interpreter and get its import times"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_import_times(result.stderr)
+
+
+def measure(statement: str, runs: int, startup_modules: set) -> Tuple[float, list]:
+    """Median milliseconds spent importing the modules of a statement
+    :param statement: the python statement
+    :param runs: the number of interpreters executed
+    :param startup_modules: the modules imported by an empty interpreter
+    :return: the median and the imports of the last run
+    """
+    totals = []
+    imports = []
+    for _ in range(runs):
+        imports = [
+            entry
+            for entry in run_with_import_times(statement)
+            if entry[0] not in startup_modules
+        ]
+        totals.append(sum(entry[3] for entry in imports if entry[1] == 0) / 1000)
+    return statistics.median(totals), imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    startup_modules = {entry[0] for entry in run_with_import_times("pass")}
+    exceeded = False
+    for statement, budget in IMPORT_BUDGETS_MS.items():
+        median, imports = measure(statement, args.runs, startup_modules)
+        status = "ok" if median <= budget else "OVER BUDGET"
+        exceeded = exceeded or median > budget
+        print(f"{statement}: {median:.1f} ms (budget {budget:.0f} ms) {status}")
+        for module, _, self_time, _ in sorted(imports, key=lambda e: -e[2])[: args.top]:
+            print(f"    {self_time / 1000:8.1f} ms  {module}")
+    sys.exit(1 if exceeded else 0)
+
+
+if __name__ == "__main__":
+    main()
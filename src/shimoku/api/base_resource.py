@@ -1,14 +1,35 @@
 import logging
 import asyncio
+import hashlib
 import json
 
-from typing import Optional, Dict, Any, List, TypeVar, Type, Set, Tuple, Union, NewType
+from typing import (
+    Optional,
+    Dict,
+    Any,
+    List,
+    TypeVar,
+    Type,
+    Set,
+    Tuple,
+    Union,
+    NewType,
+    Iterable,
+    Callable,
+)
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from copy import deepcopy
+from functools import partial
+from itertools import islice
+from time import monotonic
 
 from abc import ABC
 
 from shimoku.utils import IN_BROWSER
 from shimoku.api.client import ApiClient
-from shimoku.exceptions import ResourceIdMissing, CacheError
+from shimoku.api.cache_policy import CachePolicy
+from shimoku.exceptions import ResourceIdMissing, CacheError, BatchUploadError
 from shimoku.execution_logger import log_error, ClassWithLogging
 from dataclasses import is_dataclass, asdict
 
@@ -17,6 +38,9 @@ if not IN_BROWSER:
 
 logger = logging.getLogger(__name__)
 
+# Batches of children uploaded at the same time by create_children_batch
+BATCHES_IN_FLIGHT = 16
+
 IsResource = TypeVar("IsResource", bound="Resource")
 Alias = NewType("Alias", Union[str, Tuple[str, ...]])
 AliasField = NewType("AliasField", Union[str, Tuple[str, ...]])
@@ -29,10 +53,239 @@ class ResourceCache(ClassWithLogging):
         self._parent = parent
         self._resource_class = resource_class
         self._resource_plural = resource_class.plural
-        self._cache: Dict[str:IsResource] = {}
+        # In order of use, the least recently used resources are evicted first
+        self._cache: "OrderedDict[str, IsResource]" = OrderedDict()
         self._aliases: Dict[str:str] = {}
         self._listed = False
         self._listing_lock = None
+        # Monotonic times of the last listing and of when each resource was stored
+        self._listed_at: Optional[float] = None
+        self._stored_at: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self.evictions = 0
+        self.refreshes = 0
+        # Secondary indexes, value of each indexed field -> ids of the resources
+        self._indexes: Dict[str, Dict[Any, Dict[str, None]]] = {
+            field: {} for field in resource_class.indexed_fields
+        }
+        self._indexed_values: Dict[str, Tuple] = {}
+
+    @property
+    def policy(self) -> Optional[CachePolicy]:
+        return self._parent.api_client.get_cache_policy(self._resource_class)
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether the listing of the resources has to be fetched again"""
+        policy = self.policy
+        return policy is not None and policy.is_stale(self._listed_at)
+
+    def _store(self, resource: IsResource):
+        resource_id = resource["id"]
+        alias = resource["alias"]
+        if alias is not None:
+            self._aliases[alias] = resource_id
+        self._cache[resource_id] = resource
+        self._cache.move_to_end(resource_id)
+        self._stored_at[resource_id] = monotonic()
+        resource._base_resource.cache = self
+        self.reindex(resource)
+        policy = self.policy
+        if policy is not None and policy.max_bytes is not None:
+            self._bytes -= self._sizes.get(resource_id, 0)
+            self._sizes[resource_id] = policy.estimate_size(
+                resource._base_resource.params
+            )
+            self._bytes += self._sizes[resource_id]
+
+    def _remove(self, resource_id: str):
+        resource = self._cache.pop(resource_id)
+        alias = resource["alias"]
+        if alias is not None and self._aliases.get(alias) == resource_id:
+            del self._aliases[alias]
+        self._stored_at.pop(resource_id, None)
+        self._bytes -= self._sizes.pop(resource_id, 0)
+        self._unindex(resource_id)
+        if resource._base_resource.cache is self:
+            resource._base_resource.cache = None
+
+    def _unindex(self, resource_id: str):
+        for field, value in zip(
+            self._indexes, self._indexed_values.pop(resource_id, ())
+        ):
+            ids = self._indexes[field][value]
+            del ids[resource_id]
+            if not ids:
+                del self._indexes[field][value]
+
+    def _clear_indexes(self):
+        self._indexes = {field: {} for field in self._indexes}
+        self._indexed_values = {}
+
+    def reindex(self, resource: IsResource):
+        """Update the secondary indexes with the current params of a resource, it is
+        called when an indexed param changes
+        :param resource: the cached resource
+        """
+        resource_id = resource["id"]
+        # Resources discarded by a new listing are not indexed
+        if not self._indexes or self._cache.get(resource_id) is not resource:
+            return
+        self._unindex(resource_id)
+        values = tuple(resource._base_resource.params[field] for field in self._indexes)
+        for field, value in zip(self._indexes, values):
+            self._indexes[field].setdefault(value, {})[resource_id] = None
+        self._indexed_values[resource_id] = values
+
+    async def find(self, field: str, value: Any) -> List[IsResource]:
+        """Get the resources with a value in an indexed field, without scanning them
+        :param field: the indexed field, one of the indexed_fields of the class
+        :param value: the value of the field
+        :return: List of resources
+        """
+        if field not in self._indexes:
+            log_error(
+                logger,
+                f"{self._resource_plural} are not indexed by {field}",
+                CacheError,
+            )
+        await self.list()
+        return [self._cache[uuid] for uuid in self._indexes[field].get(value, ())]
+
+    async def get_index_values(self, field: str) -> List[Any]:
+        """Get the distinct values of an indexed field in the resources
+        :param field: the indexed field, one of the indexed_fields of the class
+        """
+        if field not in self._indexes:
+            log_error(
+                logger,
+                f"{self._resource_plural} are not indexed by {field}",
+                CacheError,
+            )
+        await self.list()
+        return list(self._indexes[field])
+
+    async def group_by(self, field: str) -> Dict[Any, List[IsResource]]:
+        """Get the resources grouped by the values of an indexed field, with a single
+        listing, instead of one call to find for each value
+        :param field: the indexed field, one of the indexed_fields of the class
+        :return: the resources with each value of the field
+        """
+        if field not in self._indexes:
+            log_error(
+                logger,
+                f"{self._resource_plural} are not indexed by {field}",
+                CacheError,
+            )
+        await self.list()
+        return {
+            value: [self._cache[uuid] for uuid in ids]
+            for value, ids in self._indexes[field].items()
+        }
+
+    def _refresh(self, resource: IsResource, db_resource: Dict):
+        """Replace the params of a cached resource with the ones of the api, the object
+        is kept as it can be referenced from elsewhere
+        :param resource: the cached resource
+        :param db_resource: the resource returned by the api
+        """
+        fresh = self._resource_class(db_resource=db_resource, parent=self._parent)
+        alias = resource["alias"]
+        if alias is not None and self._aliases.get(alias) == resource["id"]:
+            del self._aliases[alias]
+        resource._base_resource.params = fresh._base_resource.params
+        resource.empty_changed_params()
+        self._store(resource)
+        self.refreshes += 1
+
+    @staticmethod
+    def _can_be_evicted(resource: IsResource) -> bool:
+        """The resources with changes that have not been sent, or in use by the
+        client, are kept"""
+        return not (
+            getattr(resource, "currently_in_use", False)
+            or getattr(resource, "dirty", False)
+            or resource._base_resource.has_changes()
+        )
+
+    def _evict(self):
+        """Evict the least recently used resources until the cache fits its policy. Only
+        the resources that have to be evicted are checked for changes"""
+        policy = self.policy
+        if policy is None or (policy.max_entries is None and policy.max_bytes is None):
+            return
+        entries, size = len(self._cache), self._bytes
+
+        def exceeded() -> bool:
+            return (
+                policy.max_entries is not None and entries > policy.max_entries
+            ) or (policy.max_bytes is not None and size > policy.max_bytes)
+
+        evicted: List[str] = []
+        for resource_id, resource in self._cache.items():
+            if not exceeded():
+                break
+            if self._can_be_evicted(resource):
+                evicted.append(resource_id)
+                entries -= 1
+                size -= self._sizes.get(resource_id, 0)
+
+        for resource_id in evicted:
+            logger.debug(f"CACHE EVICTION: Resource {resource_id}")
+            self._remove(resource_id)
+            self.evictions += 1
+            # The listing is not complete anymore
+            self._listed = False
+
+    async def _flush_dirty(self):
+        await asyncio.gather(
+            *[
+                resource.update()
+                for resource in self._cache.values()
+                if "dirty" in dir(resource) and resource.dirty
+            ]
+        )
+
+    async def fetch_items(self, limit: Optional[int] = None) -> Optional[List[Dict]]:
+        """Fetch the child resources as returned by the api, without caching them
+        :param limit: Limit the number of resources to be fetched
+        :return: List of the resources as dicts, None if the response is not valid
+        """
+        endpoint: str = (
+            f'{self._parent["base_url"]}{self._parent.resource_type}/'
+            f'{self._parent["id"]}/{self._resource_plural}'
+        )
+
+        resources_raw: Dict = await self._parent.api_client.query_element(
+            endpoint=endpoint,
+            method="GET",
+            limit=limit,
+            elastic_supported=self._resource_class.elastic_supported,
+        )
+        try:
+            resources = (
+                resources_raw.get("items")
+                if isinstance(resources_raw, dict)
+                else resources_raw
+            )
+            if not isinstance(resources, list):
+                raise AttributeError()
+        except AttributeError:
+            logger.warning("Resource's json should have an 'items' field")
+            return None
+
+        # If the resources have no 'id' field, they have to have only one field and it has to be a dict
+        # Then the resources are mapped to that field
+        if resources and resources[0].get("id") is None:
+            resources_keys = [
+                k for k in list(resources[0].keys()) if not k.startswith("_")
+            ]
+            assert len(resources_keys) == 1
+            assert isinstance(resources[0][resources_keys[0]], dict)
+            resources = [resource[resources_keys[0]] for resource in resources]
+
+        return resources
 
     async def list(self, limit: Optional[int] = None) -> List[IsResource]:
         """List all child resources
@@ -43,59 +296,42 @@ class ResourceCache(ClassWithLogging):
             self._listing_lock = asyncio.Lock()
 
         async with self._listing_lock:
+            previous: Dict[str, IsResource] = {}
             if self._parent.api_client.cache_enabled:
-                if self._listed:
+                if self._listed and not self.is_stale:
                     logger.debug("Resource cache already listed")
                     return list(self._cache.values())
+                if self._listed:
+                    logger.debug("STALE CACHE: Listing the resources again")
+                    await self._flush_dirty()
+                    # The resources that still exist are refreshed in place
+                    previous = dict(self._cache)
+                    self._cache = OrderedDict()
+                    self._aliases = {}
+                    self._clear_indexes()
             else:
-                await asyncio.gather(
-                    *[
-                        resource.update()
-                        for resource in self._cache.values()
-                        if "dirty" in dir(resource) and resource.dirty
-                    ]
-                )
-                self._cache = {}
+                await self._flush_dirty()
+                self._cache = OrderedDict()
                 self._aliases = {}
+                self._clear_indexes()
 
             self._listed = True
-            endpoint: str = (
-                f'{self._parent["base_url"]}{self._parent.resource_type}/'
-                f'{self._parent["id"]}/{self._resource_plural}'
-            )
-
-            resources_raw: Dict = await self._parent.api_client.query_element(
-                endpoint=endpoint,
-                method="GET",
-                limit=limit,
-                elastic_supported=self._resource_class.elastic_supported,
-            )
-            try:
-                resources = (
-                    resources_raw.get("items")
-                    if isinstance(resources_raw, dict)
-                    else resources_raw
-                )
-                if not isinstance(resources, list):
-                    raise AttributeError()
-            except AttributeError:
-                logger.warning("Resource's json should have an 'items' field")
+            self._listed_at = monotonic()
+            resources = await self.fetch_items(limit)
+            if resources is None:
                 return []
 
-            # If the resources have no 'id' field, they have to have only one field and it has to be a dict
-            # Then the resources are mapped to that field
-            if resources and resources[0].get("id") is None:
-                resources_keys = [
-                    k for k in list(resources[0].keys()) if not k.startswith("_")
-                ]
-                assert len(resources_keys) == 1
-                assert isinstance(resources[0][resources_keys[0]], dict)
-                resources = [resource[resources_keys[0]] for resource in resources]
-
             # Sort resources by id to ensure consistent ordering for alias collision resolution
             resources = sorted(resources, key=lambda x: x.get("id"))
 
+            self._stored_at = {}
+            self._sizes = {}
+            self._bytes = 0
             for resource_dict in resources:
+                resource_id = resource_dict.get("id")
+                if resource_id in previous:
+                    self._refresh(previous[resource_id], resource_dict)
+                    continue
                 resource = self._resource_class(
                     db_resource=resource_dict, parent=self._parent
                 )
@@ -103,12 +339,13 @@ class ResourceCache(ClassWithLogging):
                 if alias_entry:
                     if alias_entry in self._aliases:
                         continue
-                    self._aliases[alias_entry] = resource_dict.get("id")
-                self._cache[resource_dict.get("id")] = resource
                 resource.empty_changed_params()
+                self._store(resource)
+            listed = list(self._cache.values())
+            self._evict()
 
         self._listing_lock = None
-        return list(self._cache.values())
+        return listed
 
     async def add(
         self,
@@ -150,18 +387,10 @@ class ResourceCache(ClassWithLogging):
                     f"Resource {resource_id} already exists in cache",
                     CacheError,
                 )
-            del self._cache[resource_id]
-            for alias_key, alias_value in list(self._aliases.items()):
-                if alias_value == resource_id:
-                    del self._aliases[alias_key]
-                    break
-
-        alias = resource["alias"]
-
-        if alias is not None:
-            self._aliases[alias] = resource_id
+            self._remove(resource_id)
 
-        self._cache[resource_id] = resource
+        self._store(resource)
+        self._evict()
 
         return resource
 
@@ -176,8 +405,22 @@ class ResourceCache(ClassWithLogging):
                 uuid = self._aliases[alias]
 
             if uuid in self._cache:
+                resource = self._cache[uuid]
+                policy = self.policy
+                if (
+                    policy is not None
+                    and policy.is_stale(self._stored_at.get(uuid))
+                    and self._can_be_evicted(resource)
+                ):
+                    logger.debug(f"STALE CACHE: Resource {uuid}")
+                    db_resource = await self._resource_class(
+                        parent=self._parent, uuid=uuid
+                    ).get()
+                    self._refresh(resource, db_resource)
+                    return resource
                 logger.debug(f"CACHE HIT: Resource {uuid}")
-                return self._cache[uuid]
+                self._cache.move_to_end(uuid)
+                return resource
 
         if not uuid:
             if alias is not None:
@@ -233,8 +476,7 @@ class ResourceCache(ClassWithLogging):
             return False
         uuid = resource["id"]
         await resource.delete()
-        del self._cache[uuid]
-        self._aliases = {k: v for k, v in self._aliases.items() if v != uuid}
+        self._remove(uuid)
         return True
 
     async def raise_if_alias_exists(self, alias: Alias):
@@ -249,9 +491,24 @@ class ResourceCache(ClassWithLogging):
         return [resource.cascade_to_dict() for resource in self._cache.values()]
 
     def clear(self):
-        self._cache = {}
+        self._cache = OrderedDict()
         self._aliases = {}
         self._listed = False
+        self._listed_at = None
+        self._stored_at = {}
+        self._sizes = {}
+        self._bytes = 0
+        self._clear_indexes()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Size of the cache and the resources evicted and refreshed"""
+        return {
+            "entries": len(self._cache),
+            "bytes": self._bytes,
+            "listed": self._listed,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+        }
 
     def __iter__(self):
         return iter(self._cache.items())
@@ -269,6 +526,70 @@ class ResourceCache(ClassWithLogging):
         return self.delete(uuid=key)
 
 
+class SparseParams(MutableMapping):
+    """
+    Params of a resource with a fixed schema where most of the values are the default
+    ones, e.g. a data point uses a few of its hundred fields. Only the values that are
+    not the default are stored, the defaults are shared by every instance, it behaves
+    like a dict with every field of the schema.
+    """
+
+    __slots__ = ("_defaults", "_values")
+
+    def __init__(
+        self, defaults: Dict[str, Any], values: Optional[Dict[str, Any]] = None
+    ):
+        """
+        :param defaults: the fields of the schema and their immutable default values
+        :param values: the values that are not the default
+        """
+        self._defaults = defaults
+        self._values: Dict[str, Any] = {}
+        if values:
+            self.update(values)
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            return self._defaults[key]
+
+    def __setitem__(self, key, value):
+        if key in self._defaults and value is self._defaults[key]:
+            self._values.pop(key, None)
+        else:
+            self._values[key] = value
+
+    def __delitem__(self, key):
+        if key in self._defaults:
+            self._values.pop(key, None)
+        else:
+            del self._values[key]
+
+    def __contains__(self, key):
+        return key in self._defaults or key in self._values
+
+    def __iter__(self):
+        yield from self._defaults
+        for key in self._values:
+            if key not in self._defaults:
+                yield key
+
+    def __len__(self):
+        return len(self._defaults) + sum(
+            key not in self._defaults for key in self._values
+        )
+
+    def copy(self) -> "SparseParams":
+        return SparseParams(self._defaults, self._values)
+
+    def __deepcopy__(self, memo) -> "SparseParams":
+        return SparseParams(self._defaults, deepcopy(self._values, memo))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._values!r})"
+
+
 class BaseResource(ClassWithLogging):
     """Base class for all the resources in the API"""
 
@@ -295,9 +616,15 @@ class BaseResource(ClassWithLogging):
         self.parent = parent
         self.api_client = api_client
         self.children: Dict[Type[IsResource] : ResourceCache] = {}
+        # The cache of the parent that holds the resource
+        self.cache: Optional[ResourceCache] = None
         self.base_url = ""
         self.params = params if params else {}
         self.changed_params: Set[str] = set()
+        # Digests of the mutable params that have been read, to detect if they change
+        self.snapshots: Dict[str, bytes] = {}
+        # Params set with the value they already had
+        self.unchanged_writes: Set[str] = set()
         self.params_to_serialize = params_to_serialize if params_to_serialize else []
         self.await_children = await_children
         self.wrapper_class_instance = wrapper_class_instance
@@ -366,6 +693,52 @@ class BaseResource(ClassWithLogging):
 
         return self.wrapper_class_instance
 
+    @staticmethod
+    def get_digest(value: Any) -> bytes:
+        """Digest of the serialized value of a param"""
+        if is_dataclass(value):
+            value = asdict(value)
+        try:
+            serialized = json.dumps(value, sort_keys=True, default=str)
+        except TypeError:
+            serialized = repr(value)
+        return hashlib.blake2b(serialized.encode(), digest_size=16).digest()
+
+    def take_snapshot(self, param: str):
+        """Keep the digest of a mutable param before it can be modified, the first time
+        it is read since the last synchronization with the api
+        :param param: the name of the param
+        """
+        if param not in self.snapshots:
+            self.snapshots[param] = self.get_digest(self.params[param])
+
+    def get_changed_params(self) -> Set[str]:
+        """The params that have been set to a new value or modified since they were
+        read"""
+        return self.changed_params | {
+            param
+            for param, digest in self.snapshots.items()
+            if param not in self.changed_params
+            and self.get_digest(self.params[param]) != digest
+        }
+
+    def has_changes(self) -> bool:
+        """Whether get_changed_params is not empty, stopping at the first modified
+        param"""
+        return bool(self.changed_params) or any(
+            self.get_digest(self.params[param]) != digest
+            for param, digest in self.snapshots.items()
+        )
+
+    def reset_changes(self):
+        """Forget the changes, the params are the ones of the api. The snapshots are taken
+        again as the params read can still be modified through their references."""
+        self.changed_params = set()
+        self.unchanged_writes = set()
+        self.snapshots = {
+            param: self.get_digest(self.params[param]) for param in self.snapshots
+        }
+
     async def get(self):
         """Fetches the resource from the API and updates the params."""
         endpoint = f"{self.base_url}{self.resource_type}/{self.id}"
@@ -382,7 +755,7 @@ class BaseResource(ClassWithLogging):
                     else json.loads(value if value else "{}")
                 )
 
-        self.changed_params = set()
+        self.reset_changes()
         return resource_dict
 
     async def create(self) -> str:
@@ -392,7 +765,7 @@ class BaseResource(ClassWithLogging):
         else:
             endpoint = f"{self.base_url}{self.resource_type}"
 
-        self.changed_params = set()
+        self.reset_changes()
 
         params = {
             param: p_value
@@ -433,8 +806,15 @@ class BaseResource(ClassWithLogging):
         """Updates the resource in the API with the current params."""
         endpoint = f"{self.base_url}{self.resource_type}/{self.id}"
 
-        params = {k: v for k, v in self.params.items() if k in self.changed_params}
-        self.changed_params = set()
+        changed_params = self.get_changed_params()
+        # Marked as changed before, because they were read or set to the same value
+        untouched_params = (
+            set(self.snapshots) | self.unchanged_writes
+        ) - changed_params
+        params = {k: v for k, v in self.params.items() if k in changed_params}
+        self.reset_changes()
+        if untouched_params and not params:
+            self.api_client.avoided_patches_counter += 1
 
         for field in self.params_to_serialize:
             if field in params:
@@ -464,58 +844,139 @@ class BaseResource(ClassWithLogging):
     async def create_children_batch(
         self,
         resource_class: Type[IsResource],
-        children_params: List[Dict],
+        children_params: Iterable[Dict],
         unit: str,
         batch_size: int = 100,
+        max_in_flight: int = BATCHES_IN_FLIGHT,
+        progress_callback: Optional[Callable[[int, Optional[int]], Any]] = None,
     ):
         """Creates a batch of children of a given resource class. It doesn't return the created resources,
         And it doesn't save them in the cache.
+        The chunks are taken from the parameters as they are needed, so only a bounded number of
+        them exists at the same time. If some chunks fail the rest are still created, and then a
+        BatchUploadError with the ranges of the failed chunks is raised.
         :param resource_class: The class of the resource to create.
-        :param children_params: The parameters of the resources to create.
+        :param children_params: The parameters of the resources to create, a list or an iterator.
         :param unit: The unit of the progress bar.
         :param batch_size: The size of the batch to create.
+        :param max_in_flight: The maximum number of batches being uploaded at the same time.
+        :param progress_callback: Called after each batch with the number of resources created
+            and the total, None if the total is unknown. If it raises, the upload stops.
         """
         if batch_size >= 1000:
             raise ValueError("batch_size must be less than 1000")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
 
         endpoint = f"{self.base_url}{self.resource_type}/{self.id}/{resource_class.resource_type}/batch"
 
+        total = len(children_params) if hasattr(children_params, "__len__") else None
         log_level = logger.getEffectiveLevel()
-        disable = log_level > logging.INFO or len(children_params) < 1000
+        disable = log_level > logging.INFO or (total is not None and total < 1000)
 
+        serialized_fields = []
         # TODO Seems to be converted in the api when returned? Solve in local server if that is the case
         if self.api_client.playground:
             # TODO maybe params_to_serialize should be a class attribute
             mock_resource = resource_class(parent=self.wrapper_class_instance)
-            for child_params in children_params:
-                for field in mock_resource.params_to_serialize:
-                    if field in child_params:
-                        child_params[field] = json.dumps(child_params[field])
+            serialized_fields = mock_resource.params_to_serialize
 
         if not disable:
             logger.info("Uploading data")
 
         if not IN_BROWSER:
-            progress_bar = tqdm(total=len(children_params), unit=unit, disable=disable)
+            progress_bar = tqdm(total=total, unit=unit, disable=disable)
         else:
             progress_bar = None
 
-        query_tasks = []
-        for chunk in range(0, len(children_params), batch_size):
-            query_tasks.append(
-                self.api_client.query_element(
-                    method="POST",
-                    endpoint=endpoint,
-                    **{
-                        "body_params": children_params[chunk : chunk + batch_size],
-                        "progress_bar": (
-                            progress_bar,
-                            len(children_params[chunk : chunk + batch_size]),
-                        ),
-                    },
-                )
+        # Bounded, so the producer waits while the workers are busy
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=max_in_flight)
+        failed_chunks: List[Tuple[int, int, Exception]] = []
+        created = 0
+
+        async def upload_chunks():
+            nonlocal created
+            while True:
+                item = await chunks.get()
+                if item is None:
+                    return
+                start, chunk = item
+                try:
+                    await self.api_client.query_element(
+                        method="POST",
+                        endpoint=endpoint,
+                        **{
+                            "body_params": chunk,
+                            "progress_bar": (progress_bar, len(chunk)),
+                        },
+                    )
+                except Exception as e:
+                    failed_chunks.append((start, start + len(chunk), e))
+                    continue
+                created += len(chunk)
+                if progress_callback is not None:
+                    progress_callback(created, total)
+
+        workers = [asyncio.ensure_future(upload_chunks()) for _ in range(max_in_flight)]
+
+        async def put_chunk(item: Optional[Tuple[int, List[Dict]]]):
+            # The workers only stop before the end if they raise, e.g. in the
+            # progress_callback, then nobody would take the chunk from the queue
+            put = asyncio.ensure_future(chunks.put(item))
+            try:
+                while not put.done():
+                    for worker in workers:
+                        if worker.done():
+                            worker.result()
+                    running = [worker for worker in workers if not worker.done()]
+                    await asyncio.wait(
+                        [put, *running], return_when=asyncio.FIRST_COMPLETED
+                    )
+            finally:
+                put.cancel()
+
+        try:
+            children_iterator = iter(children_params)
+            start = 0
+            while True:
+                chunk = list(islice(children_iterator, batch_size))
+                if not chunk:
+                    break
+                for child_params in chunk:
+                    for field in serialized_fields:
+                        if field in child_params:
+                            child_params[field] = json.dumps(child_params[field])
+                await put_chunk((start, chunk))
+                start += len(chunk)
+            for _ in workers:
+                await put_chunk(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if progress_bar is not None:
+                progress_bar.close()
+
+        if failed_chunks:
+            failed_chunks.sort(key=lambda failed_chunk: failed_chunk[0])
+            failed_ranges: List[Tuple[int, int]] = []
+            for chunk_start, chunk_end, _ in failed_chunks:
+                if failed_ranges and failed_ranges[-1][1] == chunk_start:
+                    failed_ranges[-1] = (failed_ranges[-1][0], chunk_end)
+                else:
+                    failed_ranges.append((chunk_start, chunk_end))
+            first_error = failed_chunks[0][2]
+            log_error(
+                logger,
+                f"{len(failed_chunks)} batches of {resource_class.resource_type} "
+                f"could not be created, failed ranges: {failed_ranges}, "
+                f"first error: {getattr(first_error, 'text', first_error)}",
+                partial(
+                    BatchUploadError,
+                    status_code=getattr(first_error, "status_code", None),
+                    failed_ranges=failed_ranges,
+                ),
             )
-        await asyncio.gather(*query_tasks)
 
         logger.info("data uploaded") if not disable else None
 
@@ -577,6 +1038,17 @@ class BaseResource(ClassWithLogging):
         """
         return await self.children[resource_class].list(limit)
 
+    async def find_children(
+        self, resource_class: Type[IsResource], field: str, value: Any
+    ) -> List[IsResource]:
+        """Gets the children of a given resource class with a value in an indexed field.
+        :param resource_class: The class of the resources to get.
+        :param field: The indexed field.
+        :param value: The value of the field.
+        :return: A list of resources.
+        """
+        return await self.children[resource_class].find(field, value)
+
     async def get_child(
         self,
         resource_class: Type[IsResource],
@@ -653,6 +1125,10 @@ class Resource(ClassWithLogging, ABC):
     url_post_name: Optional[str] = None
 
     elastic_supported: bool = False
+    # Eviction and staleness of the cache of this class, the client can override it
+    cache_policy: Optional[CachePolicy] = None
+    # Params of the children looked up without scanning them, see ResourceCache.find
+    indexed_fields: Tuple[str, ...] = ()
 
     def __init__(
         self,
@@ -747,7 +1223,7 @@ class Resource(ClassWithLogging, ABC):
 
     def empty_changed_params(self):
         """Empties the changed_params set."""
-        self._base_resource.changed_params = set()
+        self._base_resource.reset_changes()
 
     def get_alias_from_other_params(self, params: dict) -> Optional[str]:
         """Returns the alias of the resource based on the given parameters."""
@@ -764,7 +1240,8 @@ class Resource(ClassWithLogging, ABC):
         elif item in self._base_resource.params:
             result = self._base_resource.params[item]
             if isinstance(result, (dict, list)) or is_dataclass(result):
-                self._base_resource.changed_params.add(item)
+                # It can be modified through the reference
+                self._base_resource.take_snapshot(item)
             return result
         elif (
             isinstance(item, tuple)
@@ -813,9 +1290,20 @@ class Resource(ClassWithLogging, ABC):
                     f"is not of type {self._base_resource.params[key].__class__}",
                     ValueError,
                 )
+        previous_value = self._base_resource.params[key]
         self._base_resource.params[key] = value if value is not None else class_type()
         if not self._initializing:
-            self._base_resource.changed_params.add(key)
+            try:
+                changed = bool(previous_value != self._base_resource.params[key])
+            except (TypeError, ValueError):
+                changed = True
+            if changed:
+                self._base_resource.changed_params.add(key)
+            else:
+                self._base_resource.unchanged_writes.add(key)
+            cache = self._base_resource.cache
+            if cache is not None and key in self.indexed_fields:
+                cache.reindex(self)
 
     def __contains__(self, item):
         """Returns whether the resource contains a parameter with the given name."""
@@ -0,0 +1,49 @@
+import json
+from time import monotonic
+from typing import Optional, Dict, Any
+
+
+class CachePolicy:
+    """
+    Limits of the cache of the children of a resource. The listing of the children is
+    refreshed once it is older than the ttl, instead of being trusted forever, and
+    when there are more entries or bytes than allowed the least recently used ones
+    are evicted. The evicted children are fetched again the next time they are used.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        """
+        :param ttl: seconds after which a listing or a cached child is stale
+        :param max_entries: maximum number of children kept in each cache
+        :param max_bytes: approximate maximum size of the params kept in each cache
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def is_stale(self, stored_at: Optional[float]) -> bool:
+        """Whether something stored at a monotonic time has to be fetched again
+        :param stored_at: the monotonic time when it was stored
+        """
+        return (
+            self.ttl is not None
+            and stored_at is not None
+            and monotonic() - stored_at > self.ttl
+        )
+
+    @staticmethod
+    def estimate_size(params: Dict[str, Any]) -> int:
+        """Approximate size in bytes of the params of a resource, its json length"""
+        return len(json.dumps(dict(params), default=str))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
@@ -3,15 +3,26 @@ Used as base Mailchimp:
 https://github.com/mailchimp/mailchimp-marketing-python/blob/master/mailchimp_marketing/api_client.py
 """
 
-from typing import Optional, Callable
+from typing import Optional, Dict, Callable, Set, Tuple
 
 import datetime
 import asyncio
+import gzip
+import zlib
+import weakref
+from copy import deepcopy
+from functools import partial
+from time import perf_counter
 
 from shimoku.exceptions import APIError
+from shimoku.api.concurrency import AdaptiveConcurrencyLimiter
+from shimoku.api.metrics import ApiMetrics
+from shimoku.api.codec import JsonCodec
+from shimoku.api.transport import Transport
+from shimoku.api.rate_limit import RateLimiter, get_shared_rate_limiter
+from shimoku.api.retry import RetryPolicy, parse_retry_after
+from shimoku.api.cache_policy import CachePolicy
 from shimoku.utils import IN_BROWSER
-import json
-from pkg_resources import get_distribution
 
 
 import logging
@@ -21,9 +32,18 @@ logger = logging.getLogger(__name__)
 
 SHIMOKU_VERSION_KEY = "python-shimoku-pkg-version"
 
+# Classes of endpoints that have their own concurrency limiter
+BATCH_ENDPOINTS = "batch"
+DEFAULT_ENDPOINTS = "default"
+
+REQUEST_CONTENT_ENCODINGS = ("gzip", "deflate")
+
 
 def get_request_function():
-    """Auxiliary function to get the appropriate request function"""
+    """Auxiliary function to get the appropriate request function, used by the default
+    transport. The request function returns the decoded data and the sizes in bytes of
+    the bodies sent and received.
+    """
     if IN_BROWSER:
         from pyodide.http import pyfetch
 
@@ -38,24 +58,27 @@ def get_request_function():
             params = dict(
                 method=method,
                 headers=headers,
-                body=body
-                if isinstance(body, bytes)
-                else json.dumps(body).encode("utf-8"),
+                body=body if isinstance(body, bytes) else self.codec.dumps(body),
                 timeout=self.timeout,
                 params=query_params,
             )
             if not body:
                 del params["body"]
             res = await pyfetch(url, **params)
+            raw_data = await res.bytes()
             if (res.js_response.headers.has("content-type")
                 and "application/json" in res.js_response.headers.get("content-type")
             ):
-                data = await res.json()
+                data = self.codec.loads(raw_data) if raw_data.strip() else None
             else:
-                data = await res.bytes()
+                data = raw_data
             if not res.ok:
-                self.raise_api_exception(data)
-            return data
+                self.raise_api_exception(
+                    data,
+                    res.status,
+                    parse_retry_after(res.js_response.headers.get("retry-after")),
+                )
+            return data, len(params.get("body", b"")), len(raw_data)
 
     else:
         import aiohttp
@@ -68,61 +91,69 @@ def get_request_function():
             headers,
             body,
         ):
-            session_params = {
-                "auth": aiohttp.BasicAuth("user", self.api_key)
-                if self.is_basic_auth
-                else None
-            }
-            if not session_params["auth"]:
-                del session_params["auth"]
-
+            # The body is encoded here instead of by aiohttp to know its size
+            if body and not isinstance(body, bytes):
+                body = self.codec.dumps(body)
+                if not any(key.lower() == "content-type" for key in headers or {}):
+                    headers = {**(headers or {}), "Content-Type": "application/json"}
             request_options = {
                 "method": method,
                 "url": url,
                 "headers": headers,
                 "params": query_params,
-                "json": body,
+                "data": body,
             }
             if not headers:
                 del request_options["headers"]
             if not query_params:
                 del request_options["params"]
             if not body:
-                del request_options["json"]
-            elif isinstance(body, bytes):
-                request_options["data"] = body
-                del request_options["json"]
-
-            async with aiohttp.ClientSession(**session_params) as session:
-                async with session.request(**request_options) as res:
-                    if (
-                        "content-type" in res.headers
-                        and "application/json" in res.headers.get("content-type")
-                    ):
-                        data = await res.json()
-                    else:
-                        data = await res.read()
-                    if not res.ok:
-                        self.raise_api_exception(data)
-                    return data
+                del request_options["data"]
+
+            session: aiohttp.ClientSession = self.get_session()
+            async with session.request(**request_options) as res:
+                raw_data = await res.read()
+                if (
+                    "content-type" in res.headers
+                    and "application/json" in res.headers.get("content-type")
+                ):
+                    data = self.codec.loads(raw_data) if raw_data.strip() else None
+                else:
+                    data = raw_data
+                if not res.ok:
+                    self.raise_api_exception(
+                        data,
+                        res.status,
+                        parse_retry_after(res.headers.get("Retry-After")),
+                    )
+                return data, len(body) if body else 0, len(raw_data)
 
     return request
 
 
-def retry(a_func: Callable, n_retries: int):
-    """Auxiliary function to retry a function n_retries times waiting exponentially for each retry"""
-
-    async def wrapper(*args, **kwargs):
-        for i in range(n_retries):
-            try:
-                return await a_func(*args, **kwargs)
-            except APIError as e:
-                await asyncio.sleep(2**i)
-                if i == n_retries - 1:
-                    raise e
-                logger.warning(f"Error: {e}")
-
-    return wrapper
+def log_request(
+    method: str,
+    url: str,
+    latency: float,
+    bytes_sent: int = 0,
+    bytes_received: int = 0,
+    failed: bool = False,
+):
+    """Log the timing of a http request, the values are fields of the JSON logs"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug(
+        f"{method} {url} {'failed' if failed else 'answered'} "
+        f"in {1000 * latency:.2f} ms",
+        extra={
+            "http_method": method,
+            "url": url,
+            "latency_ms": round(1000 * latency, 3),
+            "bytes_sent": bytes_sent,
+            "bytes_received": bytes_received,
+            "failed": failed,
+        },
+    )
 
 
 class ApiClient(ClassWithLogging):
@@ -130,6 +161,9 @@ class ApiClient(ClassWithLogging):
 
     _module_logger = logger
 
+    # Clients with an open HTTP session, so that they can be closed all at once
+    _clients_with_session: "weakref.WeakSet[ApiClient]" = weakref.WeakSet()
+
     def __init__(
         self,
         environment: str,
@@ -138,11 +172,24 @@ class ApiClient(ClassWithLogging):
         server_host="127.0.0.1",
         server_port=8000,
         retry_attempts: int = 5,
+        retry_policy: Optional[RetryPolicy] = None,
+        transport: Optional[Transport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
     ):
         self.cache_enabled = True
+        # Eviction and staleness of the resource caches, per plural of the resource
+        # class, the None key applies to the classes without their own policy
+        self.cache_policies: Dict[Optional[str], CachePolicy] = {}
         self.environment = environment
         self.playground = playground
         self.retry_attempts = retry_attempts
+        self.retry_policy: RetryPolicy = (
+            retry_policy
+            if retry_policy is not None
+            else RetryPolicy(max_attempts=retry_attempts)
+        )
+        # Layer that sends the requests, it can be replaced to record or replay them
+        self.transport: Transport = transport if transport is not None else Transport()
 
         if config is None:
             config = {}
@@ -161,9 +208,36 @@ class ApiClient(ClassWithLogging):
         if playground:
             self.host = f"http://{server_host}:{server_port}/external/v1/"
 
-        # semaphor for async api calls
+        # Latency, throughput and errors of the requests, per endpoint
+        self.metrics = ApiMetrics(self.host)
+
+        # Adaptive concurrency of the async api calls, one limiter per class of endpoint
         self.semaphore_limit = 10
-        self.semaphore = None
+        self.max_concurrency = 64
+        self.pinned_concurrency: Dict[str, int] = {}
+        self.limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+        # Single flight, identical GETs executed at the same time share one request
+        self.single_flight: bool = True
+        self._in_flight_gets: Dict[tuple, asyncio.Future] = {}
+        self._in_flight_get_followers: Dict[tuple, int] = {}
+        self.coalesced_calls_counter = 0
+        # Updates not sent because the params read or set had not changed
+        self.avoided_patches_counter = 0
+
+        # Requests per second, can be shared with other clients and processes
+        self.rate_limiter: Optional[RateLimiter] = None
+
+        # Compression of the request bodies, opt-in as the API has to accept it
+        self.request_compression: Optional[str] = None
+        self.compression_threshold: int = 1024
+        self.compression_level: int = 6
+        self.compressed_endpoints: Set[str] = {BATCH_ENDPOINTS}
+
+        # Pagination of the elastic supported endpoints
+        self.page_size: int = 100
+        self.parallel_pagination: bool = True
+        self.pagination_window: int = 8
 
         # DEFAULTS
         # Api key
@@ -176,10 +250,20 @@ class ApiClient(ClassWithLogging):
         self.server: str = "invalid-server"
         self.timeout: int = 120
 
+        # Connection pool, the session is reused by every request made from the same event loop
+        self.connection_limit: int = 100
+        self.connection_limit_per_host: int = 0
+        self.keepalive_timeout: float = 30
+        self.dns_cache_ttl: int = 300
+        self._session = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
         self.default_headers = {
             "Content-Type": "application/json",
         }
         self.set_config(config)
+        if rate_limiter is not None:
+            self.rate_limiter = rate_limiter
         self.call_counter = 0
         # Default vars
 
@@ -208,6 +292,194 @@ class ApiClient(ClassWithLogging):
 
         self.timeout = config["timeout"] if "timeout" in config.keys() else 120
 
+        # Json library used to encode the bodies and decode the responses
+        self.codec: JsonCodec = JsonCodec(
+            config["json_codec"] if "json_codec" in config.keys() else None
+        )
+
+        # Concurrency
+        self.semaphore_limit: int = (
+            config["initial_concurrency"]
+            if "initial_concurrency" in config.keys()
+            else 10
+        )
+        self.max_concurrency: int = (
+            config["max_concurrency"] if "max_concurrency" in config.keys() else 64
+        )
+        self.pinned_concurrency: Dict[str, int] = (
+            dict(config["concurrency_limits"])
+            if "concurrency_limits" in config.keys()
+            else {}
+        )
+
+        # Single flight
+        self.single_flight: bool = (
+            config["single_flight"] if "single_flight" in config.keys() else True
+        )
+
+        # Rate limit, the clients with the same rate limit name share their bucket
+        self.rate_limiter: Optional[RateLimiter] = (
+            get_shared_rate_limiter(
+                name=(
+                    config["rate_limit_name"]
+                    if "rate_limit_name" in config.keys()
+                    else "default"
+                ),
+                rate=config["rate_limit"],
+                burst=(
+                    config["rate_limit_burst"]
+                    if "rate_limit_burst" in config.keys()
+                    else None
+                ),
+                path=(
+                    config["rate_limit_file"]
+                    if "rate_limit_file" in config.keys()
+                    else None
+                ),
+            )
+            if "rate_limit" in config.keys()
+            else None
+        )
+
+        # Request compression
+        request_compression = (
+            config["request_compression"]
+            if "request_compression" in config.keys()
+            else None
+        )
+        if request_compression is True:
+            request_compression = "gzip"
+        if request_compression and request_compression not in REQUEST_CONTENT_ENCODINGS:
+            log_error(
+                logger,
+                f"Unknown request compression '{request_compression}', "
+                f"the available ones are {REQUEST_CONTENT_ENCODINGS}",
+                ValueError,
+            )
+        self.request_compression: Optional[str] = request_compression or None
+        self.compression_threshold: int = (
+            config["compression_threshold"]
+            if "compression_threshold" in config.keys()
+            else 1024
+        )
+        self.compression_level: int = (
+            config["compression_level"] if "compression_level" in config.keys() else 6
+        )
+        self.compressed_endpoints: Set[str] = (
+            set(config["compressed_endpoints"])
+            if "compressed_endpoints" in config.keys()
+            else {BATCH_ENDPOINTS}
+        )
+
+        # Pagination
+        self.page_size: int = (
+            config["page_size"] if "page_size" in config.keys() else 100
+        )
+        self.parallel_pagination: bool = (
+            config["parallel_pagination"]
+            if "parallel_pagination" in config.keys()
+            else True
+        )
+        self.pagination_window: int = (
+            config["pagination_window"] if "pagination_window" in config.keys() else 8
+        )
+
+        # Connection pool
+        self.connection_limit: int = (
+            config["connection_limit"] if "connection_limit" in config.keys() else 100
+        )
+        self.connection_limit_per_host: int = (
+            config["connection_limit_per_host"]
+            if "connection_limit_per_host" in config.keys()
+            else 0
+        )
+        self.keepalive_timeout: float = (
+            config["keepalive_timeout"] if "keepalive_timeout" in config.keys() else 30
+        )
+        self.dns_cache_ttl: int = (
+            config["dns_cache_ttl"] if "dns_cache_ttl" in config.keys() else 300
+        )
+
+    def get_session(self):
+        """Get the HTTP session bound to the running event loop, creating it if needed.
+        A session can only be used from the loop where it was created, so when the loop
+        changes (e.g. the client is used from a new asyncio.run) a new one is created.
+        """
+        if IN_BROWSER:
+            return None
+
+        loop = asyncio.get_running_loop()
+        if (
+            self._session is not None
+            and not self._session.closed
+            and self._session_loop is loop
+        ):
+            return self._session
+
+        if self._session is not None and not self._session.closed:
+            self._discard_session()
+
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.connection_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        session_params = {"connector": connector}
+        if self.is_basic_auth:
+            session_params["auth"] = aiohttp.BasicAuth("user", self.api_key)
+
+        logger.debug("Opening a new HTTP session")
+        self._session = aiohttp.ClientSession(**session_params)
+        self._session_loop = loop
+        self._clients_with_session.add(self)
+        return self._session
+
+    def _discard_session(self):
+        """Close a session that belongs to another event loop. If that loop is still running
+        the closing is scheduled in it, if it is already closed there is nothing left to await.
+        """
+        session, session_loop = self._session, self._session_loop
+        self._session, self._session_loop = None, None
+        self._clients_with_session.discard(self)
+        if session_loop is not None and session_loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), session_loop)
+        else:
+            logger.debug("Discarding HTTP session of a closed event loop")
+
+    async def open(self) -> "ApiClient":
+        """Open the HTTP session in the running event loop"""
+        self.get_session()
+        return self
+
+    async def close(self):
+        """Close the HTTP session and its connection pool"""
+        self.transport.flush()
+        if self._session is None:
+            return
+        if self._session_loop is not asyncio.get_running_loop():
+            self._discard_session()
+            return
+        session = self._session
+        self._session, self._session_loop = None, None
+        self._clients_with_session.discard(self)
+        await session.close()
+
+    @classmethod
+    async def close_all(cls):
+        """Close the HTTP sessions of every client that has one open"""
+        await asyncio.gather(
+            *[client.close() for client in list(cls._clients_with_session)]
+        )
+
+    async def __aenter__(self) -> "ApiClient":
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
     async def call_api(
         self,
         resource_path,
@@ -250,12 +522,14 @@ class ApiClient(ClassWithLogging):
         if self.server:
             url = url.replace("server", self.server)
 
-        if not self.semaphore:
-            self.semaphore = asyncio.Semaphore(self.semaphore_limit)
+        limiter = self.get_limiter(self.get_endpoint_class(method, url))
+        if self.requests_pages_concurrently(limit, elastic_supported):
+            # Each page takes its own slot, holding one for the whole listing would let
+            # the pages of concurrent listings go over the window
+            limiter = None
 
-        try:
-            # perform request and return response
-            async with self.semaphore:
+        async def perform_request():
+            if limiter is None:
                 return await self.request(
                     method,
                     url,
@@ -265,9 +539,7 @@ class ApiClient(ClassWithLogging):
                     limit=limit,
                     elastic_supported=elastic_supported,
                 )
-        except asyncio.CancelledError:
-            self.semaphore = asyncio.Semaphore(self.semaphore_limit)
-            async with self.semaphore:
+            async with limiter.slot():
                 return await self.request(
                     method,
                     url,
@@ -278,6 +550,74 @@ class ApiClient(ClassWithLogging):
                     elastic_supported=elastic_supported,
                 )
 
+        try:
+            # perform request and return response
+            return await perform_request()
+        except asyncio.CancelledError:
+            return await perform_request()
+
+    def requests_pages_concurrently(
+        self, limit: Optional[int], elastic_supported: bool
+    ) -> bool:
+        """Whether the pages of a listing are requested concurrently, each of them in its
+        own slot of the concurrency limiter
+        :param limit: the limit of the listing
+        :param elastic_supported: whether the endpoint supports elastic search
+        """
+        return elastic_supported and self.parallel_pagination and not limit
+
+    @staticmethod
+    def get_endpoint_class(method: str, url: str) -> str:
+        """Get the class of an endpoint, each class has its own concurrency limiter
+        :param method: the http method
+        :param url: the url of the endpoint
+        """
+        if method == "POST" and url.rstrip("/").endswith("/batch"):
+            return BATCH_ENDPOINTS
+        return DEFAULT_ENDPOINTS
+
+    def get_limiter(self, endpoint_class: str) -> AdaptiveConcurrencyLimiter:
+        """Get the concurrency limiter of a class of endpoints, creating it if needed
+        :param endpoint_class: the class of the endpoints
+        """
+        if endpoint_class not in self.limiters:
+            self.limiters[endpoint_class] = AdaptiveConcurrencyLimiter(
+                initial_limit=self.semaphore_limit,
+                max_limit=max(self.max_concurrency, self.semaphore_limit),
+                pinned_limit=self.pinned_concurrency.get(endpoint_class),
+            )
+        return self.limiters[endpoint_class]
+
+    def pin_concurrency(self, endpoint_class: str, limit: Optional[int]):
+        """Fix the concurrency of a class of endpoints, or let it adapt again if None
+        :param endpoint_class: the class of the endpoints ('batch' or 'default')
+        :param limit: the number of concurrent requests
+        """
+        if limit is None:
+            self.pinned_concurrency.pop(endpoint_class, None)
+        else:
+            self.pinned_concurrency[endpoint_class] = limit
+        self.get_limiter(endpoint_class).pin(limit)
+
+    def get_cache_policy(self, resource_class) -> Optional[CachePolicy]:
+        """Get the cache policy of a resource class: the one set for its plural, else
+        the one of the class, else the default one
+        :param resource_class: the class of the cached resources
+        """
+        policy = self.cache_policies.get(resource_class.plural)
+        if policy is None:
+            policy = resource_class.cache_policy
+        if policy is None:
+            policy = self.cache_policies.get(None)
+        return policy
+
+    def get_concurrency_stats(self) -> Dict[str, Dict]:
+        """Get the current window and the statistics of every concurrency limiter"""
+        return {
+            endpoint_class: limiter.get_stats()
+            for endpoint_class, limiter in self.limiters.items()
+        }
+
     def set_http_info(self, **kwargs):  # noqa: E501
         """
         This method makes a synchronous HTTP request by default. To make an
@@ -359,37 +699,184 @@ class ApiClient(ClassWithLogging):
         if endpoint in params:
             path_params[endpoint] = params[endpoint]  # noqa: E501
 
-        element_data: dict = await retry(self.call_api, n_retries=self.retry_attempts)(
-            endpoint,
-            method,
-            path_params,
-            query_params,
-            header_params,
-            limit=limit,
-            elastic_supported=elastic_supported,
-            body=body_params,
-            post_params=form_params,
-            files=local_var_files,
-            response_type=None,  # noqa: E501
-            auth_settings=auth_settings,
-            async_req=params.get("async_req"),
-            _return_http_data_only=params.get("_return_http_data_only"),
-            _preload_content=params.get("_preload_content", True),
-            _request_timeout=params.get("_request_timeout"),
-            collection_formats=collection_formats,
+        if body_params and not isinstance(body_params, bytes):
+            # Encoded once, so that the retries send the same bytes
+            body_params = self.codec.dumps(body_params)
+
+        attempts = 0
+
+        async def call_api_counting_attempts(*args, **kwargs):
+            nonlocal attempts
+            attempts += 1
+            return await self.call_api(*args, **kwargs)
+
+        request_function = partial(
+            self.retry_policy.call, method, call_api_counting_attempts
         )
+        if body_params and self.request_compression:
+            request_function = partial(
+                self.send_compressed, method, endpoint, request_function
+            )
+        if self.single_flight and method == "GET" and not body_params:
+            request_function = partial(
+                self.coalesce_get,
+                (endpoint, limit, elastic_supported),
+                request_function,
+            )
+
+        try:
+            element_data: dict = await request_function(
+                endpoint,
+                method,
+                path_params,
+                query_params,
+                header_params=header_params,
+                limit=limit,
+                elastic_supported=elastic_supported,
+                body=body_params,
+                post_params=form_params,
+                files=local_var_files,
+                response_type=None,  # noqa: E501
+                auth_settings=auth_settings,
+                async_req=params.get("async_req"),
+                _return_http_data_only=params.get("_return_http_data_only"),
+                _preload_content=params.get("_preload_content", True),
+                _request_timeout=params.get("_request_timeout"),
+                collection_formats=collection_formats,
+            )
+        finally:
+            self.metrics.record_retries(
+                method if not elastic_supported else "POST", endpoint, attempts - 1
+            )
 
         if kwargs.get("progress_bar"):
             progress_bar, how_much = kwargs.get("progress_bar")
-            if progress_bar:
+            if progress_bar is not None:
                 progress_bar.update(how_much)
 
         return element_data
 
+    def compress_body(
+        self, method: str, endpoint: str, body: bytes
+    ) -> Tuple[bytes, Optional[str]]:
+        """Compress a body if the compression is enabled for the class of its endpoint and
+        the body is big enough for the compression to pay off
+        :param method: the http method
+        :param endpoint: the endpoint of the request
+        :param body: the encoded body
+        :return: the body to send and its content encoding, None if it is not compressed
+        """
+        endpoint_class = self.get_endpoint_class(method, endpoint)
+        if (
+            not self.request_compression
+            or len(body) < self.compression_threshold
+            or endpoint_class not in self.compressed_endpoints
+        ):
+            return body, None
+        if self.request_compression == "gzip":
+            return (
+                gzip.compress(body, compresslevel=self.compression_level, mtime=0),
+                "gzip",
+            )
+        return zlib.compress(body, self.compression_level), "deflate"
+
+    async def send_compressed(
+        self,
+        method: str,
+        endpoint: str,
+        a_func: Callable,
+        *args,
+        header_params: Optional[dict] = None,
+        body: Optional[bytes] = None,
+        **kwargs,
+    ):
+        """Execute a request with its body compressed. If the API does not accept the
+        encoding (415) the body is sent uncompressed, and the compression is disabled
+        for the class of the endpoint.
+        :param method: the http method
+        :param endpoint: the endpoint of the request
+        :param a_func: the function that executes the request
+        :param header_params: the headers of the request
+        :param body: the encoded body
+        """
+        header_params = header_params or {}
+        compressed_body, content_encoding = self.compress_body(method, endpoint, body)
+        if content_encoding is None:
+            return await a_func(*args, header_params=header_params, body=body, **kwargs)
+        try:
+            return await a_func(
+                *args,
+                header_params={**header_params, "Content-Encoding": content_encoding},
+                body=compressed_body,
+                **kwargs,
+            )
+        except APIError as e:
+            if e.status_code != 415:
+                raise
+            endpoint_class = self.get_endpoint_class(method, endpoint)
+            self.compressed_endpoints.discard(endpoint_class)
+            logger.warning(
+                f"The API does not accept {content_encoding} bodies in the "
+                f"{endpoint_class} endpoints, sending them uncompressed"
+            )
+            return await a_func(*args, header_params=header_params, body=body, **kwargs)
+
+    async def coalesce_get(self, key: tuple, a_func: Callable, *args, **kwargs):
+        """Execute a GET sharing its result with the identical GETs that are executed at
+        the same time, only the first one goes to the API. The rest receive a copy of a
+        snapshot taken before the first caller gets the result, so that the callers can
+        not modify each other's data.
+        :param key: identifies the request, e.g. the endpoint and its parameters
+        :param a_func: the function that executes the request
+        """
+        loop = asyncio.get_running_loop()
+        # The futures are bound to the loop, so different loops do not share requests
+        key = (loop, key)
+        shared_result = self._in_flight_gets.get(key)
+        if shared_result is not None:
+            self.coalesced_calls_counter += 1
+            self._in_flight_get_followers[key] += 1
+            try:
+                return deepcopy(await asyncio.shield(shared_result))
+            except asyncio.CancelledError:
+                if not shared_result.cancelled():
+                    raise
+                # The first caller was cancelled, so the request has to be done again
+                return await self.coalesce_get(key[1], a_func, *args, **kwargs)
+
+        shared_result = loop.create_future()
+        self._in_flight_gets[key] = shared_result
+        self._in_flight_get_followers[key] = 0
+        try:
+            result = await a_func(*args, **kwargs)
+        except asyncio.CancelledError:
+            shared_result.cancel()
+            raise
+        except Exception as e:
+            shared_result.set_exception(e)
+            # Mark it as retrieved, it is raised here even if no one else is waiting
+            shared_result.exception()
+            raise
+        else:
+            # The caller can modify the result as soon as it is returned
+            shared_result.set_result(
+                deepcopy(result) if self._in_flight_get_followers[key] else result
+            )
+            return result
+        finally:
+            del self._in_flight_gets[key]
+            del self._in_flight_get_followers[key]
+
     @staticmethod
-    def raise_api_exception(response: str) -> None:
+    def raise_api_exception(
+        response: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
         """Raise an ApiClientError with the message changed to be more user friendly
         :param response: the response from the API
+        :param status_code: the http status of the response
+        :param retry_after: the seconds the API asks to wait before retrying
         """
         replace_words = {
             "report": "component",
@@ -403,10 +890,34 @@ class ApiClient(ClassWithLogging):
                 if isinstance(response, str)
                 else response
             )
-        log_error(logger, response, APIError)
+        log_error(
+            logger,
+            response,
+            partial(APIError, status_code=status_code, retry_after=retry_after),
+        )
 
     _request = get_request_function()
 
+    async def _send(self, method, url, query_params=None, headers=None, body=None):
+        """Make a single http request and record it in the metrics"""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        initial_time = perf_counter()
+        try:
+            data, bytes_sent, bytes_received = await self.transport.send(
+                self, method, url, query_params, headers, body
+            )
+        except Exception:
+            latency = perf_counter() - initial_time
+            self.metrics.record_request(method, url, latency, failed=True)
+            log_request(method, url, latency, failed=True)
+            raise
+        latency = perf_counter() - initial_time
+        self.metrics.record_request(method, url, latency, bytes_sent, bytes_received)
+        log_request(method, url, latency, bytes_sent, bytes_received)
+        self.call_counter += 1
+        return data
+
     async def request(
         self,
         method,
@@ -424,7 +935,7 @@ class ApiClient(ClassWithLogging):
             # TODO see how to handle from the browser
             # headers.update(
             #     {
-            #         SHIMOKU_VERSION_KEY: get_distribution("shimoku").version
+            #         SHIMOKU_VERSION_KEY: importlib.metadata.version("shimoku")
             #         if not IN_BROWSER
             #         else "2.0.0"
             #     }
@@ -437,10 +948,16 @@ class ApiClient(ClassWithLogging):
             )
         body_from = 0
         next_token = None
+        pages = 0
         data_res = {} if not elastic_supported else []
-        req_limit = limit if limit else 100
+        req_limit = limit if limit else self.page_size
         method = method if not elastic_supported else "POST"
 
+        if to_tazawa and self.requests_pages_concurrently(limit, elastic_supported):
+            return await self._request_elastic_pages_concurrently(
+                url, query_params, headers
+            )
+
         while True:  # loop until nextToken is None
             aux_url = url
             if to_tazawa:
@@ -458,17 +975,18 @@ class ApiClient(ClassWithLogging):
                 f"query params: {query_params}, body: {body}"
             )
 
-            data = await self._request(
+            data = await self._send(
                 method=method,
                 url=aux_url,
                 query_params=query_params,
                 headers=headers,
                 body=body,
             )
-            self.call_counter += 1
+            pages += 1
             logger.debug(data)
 
             if not to_tazawa:
+                self.metrics.record_call(method, url, pages)
                 return data
 
             if elastic_supported:
@@ -490,8 +1008,58 @@ class ApiClient(ClassWithLogging):
                 data_res = data
                 break
 
+        self.metrics.record_call(method, url, pages)
         return data_res
 
+    async def _request_elastic_pages_concurrently(
+        self, url, query_params=None, headers=None
+    ) -> list:
+        """Retrieve all the pages of an elastic supported endpoint requesting them in windows
+        of concurrent requests, as the offsets of the pages are known beforehand.
+        The total size is unknown, so the first window only probes one page and every
+        following window doubles its size until the pagination window is reached, this way
+        short listings cost a single request. The pagination stops at the first short page
+        and the pages are reassembled in order.
+        The size of the window is bounded by the current concurrency window of the client,
+        and each page takes its own slot of the concurrency limiter, so the pages of
+        concurrent listings share the window.
+        """
+        limiter = self.get_limiter(DEFAULT_ENDPOINTS)
+        max_window = max(1, min(self.pagination_window, limiter.window))
+        page_size = self.page_size
+        data_res = []
+        page = 0
+        window = 1
+
+        async def request_page(page_index: int) -> list:
+            body = {"from": page_index * page_size, "limit": page_size}
+            logger.debug(
+                f"method:POST, url: {url}, headers: {headers},"
+                f"query params: {query_params}, body: {body}"
+            )
+            async with limiter.slot():
+                data = await self._send(
+                    method="POST",
+                    url=url,
+                    query_params=query_params,
+                    headers=headers,
+                    body=body,
+                )
+            logger.debug(data)
+            return data
+
+        while True:
+            pages = await asyncio.gather(
+                *[request_page(page + i) for i in range(window)]
+            )
+            for page_data in pages:
+                data_res.extend(page_data)
+                if len(page_data) < page_size:
+                    self.metrics.record_call("POST", url, page + window)
+                    return data_res
+            page += window
+            window = min(window * 2, max_window)
+
     def sanitize_for_serialization(self, obj):
         """Builds a JSON POST object.
         If obj is None, return None.
@@ -0,0 +1,136 @@
+import json
+import math
+import datetime
+from decimal import Decimal
+from uuid import UUID
+from typing import Any, Optional, Callable, Type
+
+import logging
+from shimoku.execution_logger import log_error
+
+logger = logging.getLogger(__name__)
+
+JSON_CODECS = ("orjson", "ujson", "json")
+
+
+def default_serializer(obj: Any) -> Any:
+    """Convert the objects that the json libraries can not serialize natively, so that
+    numpy and pandas values can be sent without converting them beforehand
+    :param obj: the object to convert
+    """
+    if type(obj).__name__ in ("NaTType", "NAType"):
+        return None
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        # Includes the pandas timestamps
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):
+        # numpy arrays and scalars
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def replace_non_finite_floats(obj: Any) -> Any:
+    """NaN and infinity are not valid json, replace them with None as orjson does, so
+    that the bodies are the same whatever library is installed
+    :param obj: the object to convert
+    """
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: replace_non_finite_floats(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [replace_non_finite_floats(value) for value in obj]
+    return obj
+
+
+def finite_default_serializer(obj: Any) -> Any:
+    """The default_serializer for the libraries that do not convert NaN and infinity
+    :param obj: the object to convert
+    """
+    return replace_non_finite_floats(default_serializer(obj))
+
+
+def dumps_with_finite_floats(
+    dumps: Callable[[Any, Callable], bytes], obj: Any, nan_error: Type[Exception]
+) -> bytes:
+    """Encode with a library that rejects NaN and infinity, replacing them with None only
+    when it fails, so that the values are not walked in the usual case
+    :param dumps: encodes an object with a default serializer
+    :param obj: the object to encode
+    :param nan_error: the exception raised by the library for NaN and infinity
+    """
+    try:
+        return dumps(obj, default_serializer)
+    except nan_error:
+        return dumps(replace_non_finite_floats(obj), finite_default_serializer)
+
+
+class JsonCodec:
+    """
+    Encodes the bodies of the requests to bytes and decodes the responses, using the
+    fastest json library available. The bodies are encoded once, before any retry, and
+    numpy, pandas and datetime values are serialized without a previous conversion.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        """
+        :param name: the library to use ('orjson', 'ujson' or 'json'), by default the
+            first one that is installed
+        """
+        if name is not None and name not in JSON_CODECS:
+            log_error(
+                logger,
+                f"Unknown json codec '{name}', the available ones are {JSON_CODECS}",
+                ValueError,
+            )
+        self.name: str = "json"
+        self.dumps: Callable[[Any], bytes] = self._json_dumps
+        self.loads: Callable[[bytes], Any] = json.loads
+
+        for candidate in JSON_CODECS if name is None else (name,):
+            if candidate == "orjson":
+                try:
+                    import orjson
+                except ImportError:
+                    continue
+                options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                self.dumps = lambda obj: orjson.dumps(
+                    obj, default=default_serializer, option=options
+                )
+                self.loads = orjson.loads
+            elif candidate == "ujson":
+                try:
+                    import ujson
+                except ImportError:
+                    continue
+                ujson_dumps = lambda obj, default: ujson.dumps(
+                    obj, default=default, ensure_ascii=False, allow_nan=False
+                ).encode("utf-8")
+                self.dumps = lambda obj: dumps_with_finite_floats(
+                    ujson_dumps, obj, OverflowError
+                )
+                self.loads = ujson.loads
+            self.name = candidate
+            break
+        else:
+            logger.warning(f"The json codec '{name}' is not installed, using 'json'")
+
+    @staticmethod
+    def _json_dumps(obj: Any) -> bytes:
+        return dumps_with_finite_floats(
+            lambda obj, default: json.dumps(
+                obj,
+                default=default,
+                separators=(",", ":"),
+                ensure_ascii=False,
+                allow_nan=False,
+            ).encode("utf-8"),
+            obj,
+            ValueError,
+        )
@@ -0,0 +1,229 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import Optional, Deque, Dict, Any
+
+from shimoku.exceptions import APIError
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Whether an error means that the backend is overloaded
+    :param error: the error raised by the request
+    """
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if isinstance(error, APIError) and error.status_code is not None:
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of concurrent requests with an adaptive window, following the
+    additive increase / multiplicative decrease scheme of TCP congestion control.
+    While the latency stays close to the best latency observed the window grows by one
+    slot per window of successful requests, when the latency rises the window shrinks
+    slightly back towards its initial size, and when the backend answers with 429/5xx
+    or times out it is halved.
+    The window can be pinned to a fixed value, which disables the adaptation.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        pinned_limit: Optional[int] = None,
+        backoff_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+        latency_backoff_factor: float = 0.9,
+    ):
+        """
+        :param initial_limit: the window the limiter starts with
+        :param min_limit: the minimum size of the window
+        :param max_limit: the maximum size of the window
+        :param pinned_limit: if set, the window is fixed to this value
+        :param backoff_factor: the window is multiplied by it when the backend is overloaded
+        :param latency_tolerance: how many times the best latency the smoothed latency can
+            grow before the window starts to shrink
+        :param latency_backoff_factor: the window is multiplied by it when the latency rises
+        """
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError("The limits must satisfy 1 <= min_limit <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_factor = backoff_factor
+        self.latency_tolerance = latency_tolerance
+        self.latency_backoff_factor = latency_backoff_factor
+        self.pinned_limit = pinned_limit
+        self.initial_limit: int = min(max(initial_limit, min_limit), max_limit)
+        self.limit: float = float(
+            self.initial_limit if pinned_limit is None else pinned_limit
+        )
+
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._baseline_latency: Optional[float] = None
+        self._smoothed_latency: Optional[float] = None
+        self._last_decrease = 0.0
+
+        self.requests = 0
+        self.overloads = 0
+        self.latency_backoffs = 0
+        self.total_latency = 0.0
+        self.total_wait_time = 0.0
+        self.max_window_reached = self.window
+
+    @property
+    def window(self) -> int:
+        """The number of requests that can be executed at the same time"""
+        return max(self.min_limit, int(self.limit))
+
+    def pin(self, limit: Optional[int]):
+        """Fix the window to a value, or let it adapt again if None
+        :param limit: the fixed size of the window
+        """
+        self.pinned_limit = limit
+        if limit is not None:
+            self.limit = float(limit)
+        self._wake_waiters()
+
+    def _bind_to_running_loop(self):
+        """The waiters are bound to an event loop, when the loop changes (e.g. a new
+        asyncio.run) the state left by the previous one is discarded. The learned window is kept.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._waiters = deque()
+            self.in_flight = 0
+
+    def _wake_waiters(self):
+        """Grant the free slots of the window to the oldest waiters"""
+        while self._waiters and self.in_flight < self.window:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self):
+        """Wait until there is a free slot in the window"""
+        self._bind_to_running_loop()
+        if self.in_flight < self.window and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = self._loop.create_future()
+        self._waiters.append(waiter)
+        initial_time = perf_counter()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                # The slot was granted before the cancellation, give it to another waiter
+                self.in_flight -= 1
+                self._wake_waiters()
+            raise
+        finally:
+            self.total_wait_time += perf_counter() - initial_time
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        """Free a slot of the window and adapt the window to the outcome of the request
+        :param latency: the time spent by the request, None if it has no meaningful result
+        :param overloaded: whether the backend answered that it is overloaded
+        """
+        self.in_flight = max(0, self.in_flight - 1)
+        if latency is not None:
+            self._register_sample(latency, overloaded)
+        self._wake_waiters()
+
+    def _register_sample(self, latency: float, overloaded: bool):
+        """Update the statistics and the window with the result of a request"""
+        self.requests += 1
+        self.total_latency += latency
+        if self.pinned_limit is not None:
+            return
+
+        now = perf_counter()
+        # Decrease at most once per round trip, the requests of the same burst fail together
+        can_decrease = now - self._last_decrease > (self._smoothed_latency or 0)
+
+        if overloaded:
+            self.overloads += 1
+            if can_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff_factor)
+                self._last_decrease = now
+                logger.debug(f"Backend overloaded, concurrency window: {self.window}")
+            return
+
+        if self._baseline_latency is None:
+            self._baseline_latency = latency
+            self._smoothed_latency = latency
+        else:
+            # The baseline follows the best latency but slowly forgets it
+            self._baseline_latency = min(
+                latency,
+                self._baseline_latency + 0.01 * (latency - self._baseline_latency),
+            )
+            self._smoothed_latency += 0.1 * (latency - self._smoothed_latency)
+
+        if self._smoothed_latency <= self.latency_tolerance * self._baseline_latency:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.max_window_reached = max(self.max_window_reached, self.window)
+        elif can_decrease:
+            # A rising latency only takes back the growth, the overloads are the ones that
+            # can take the window under its initial size
+            self.latency_backoffs += 1
+            self.limit = max(
+                min(self.limit, self.initial_limit),
+                self.limit * self.latency_backoff_factor,
+            )
+            self._last_decrease = now
+
+    @asynccontextmanager
+    async def slot(self):
+        """Context manager that holds a slot of the window while the request is executed"""
+        await self.acquire()
+        initial_time = perf_counter()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception as error:
+            self.release(perf_counter() - initial_time, is_overload_error(error))
+            raise
+        else:
+            self.release(perf_counter() - initial_time)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Current window and statistics of the limiter"""
+        return {
+            "window": self.window,
+            "pinned": self.pinned_limit is not None,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "max_window_reached": self.max_window_reached,
+            "requests": self.requests,
+            "overloads": self.overloads,
+            "latency_backoffs": self.latency_backoffs,
+            "mean_latency_ms": (
+                1000 * self.total_latency / self.requests if self.requests else None
+            ),
+            "baseline_latency_ms": (
+                1000 * self._baseline_latency if self._baseline_latency else None
+            ),
+            "smoothed_latency_ms": (
+                1000 * self._smoothed_latency if self._smoothed_latency else None
+            ),
+            "total_wait_time_ms": 1000 * self.total_wait_time,
+        }
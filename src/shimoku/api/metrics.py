@@ -0,0 +1,271 @@
+import re
+import json
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple, List, Any
+from urllib.parse import urlsplit
+
+UUID_REGEX = re.compile(
+    r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+)
+# Upper bounds in seconds of the latency buckets, the last bucket is unbounded
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+
+
+class RequestCounter:
+    """Calls, requests and bytes made on behalf of a task of the task pool"""
+
+    def __init__(self):
+        self.calls = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+# Counter of the task being executed, the asyncio tasks it creates inherit it
+current_request_counter: ContextVar[Optional[RequestCounter]] = ContextVar(
+    "current_request_counter", default=None
+)
+
+
+def get_endpoint_template(url: str, host: str) -> str:
+    """Get the template of an endpoint from a url, the ids are replaced by '{id}'
+    e.g. 'business/{id}/app/{id}/report'. Urls that are not from the API keep their domain.
+    :param url: the url of the request
+    :param host: the host of the API
+    """
+    if url.startswith(host):
+        path = url[len(host) :]
+    else:
+        split_url = urlsplit(url)
+        path = split_url.netloc + split_url.path
+    path = path.split("?", 1)[0].strip("/")
+    return UUID_REGEX.sub("{id}", path)
+
+
+class LatencyHistogram:
+    """Histogram of latencies with fixed buckets, so that the memory used is constant"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Add a latency to the histogram
+        :param value: the latency in seconds
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate a percentile interpolating linearly inside its bucket
+        :param q: the percentile, between 0 and 100
+        """
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        accumulated = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and accumulated + bucket_count >= rank:
+                # The observed extremes narrow the first and last buckets
+                lower = max(self.buckets[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(
+                    self.buckets[i] if i < len(self.buckets) else self.max, self.max
+                )
+                fraction = (rank - accumulated) / bucket_count
+                return lower + (upper - lower) * fraction
+            accumulated += bucket_count
+        return self.max
+
+    def cumulative_counts(self) -> List[Tuple[str, int]]:
+        """Cumulative counts of each bucket, as the 'le' buckets of Prometheus"""
+        result = []
+        accumulated = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            accumulated += bucket_count
+            result.append((f"{bound:g}", accumulated))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class EndpointMetrics:
+    """Metrics of the requests made to an endpoint template with a method"""
+
+    def __init__(self):
+        self.calls = 0
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.pages = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self) -> Dict[str, Any]:
+        def to_ms(value: Optional[float]) -> Optional[float]:
+            return round(1000 * value, 3) if value is not None else None
+
+        return {
+            "calls": self.calls,
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "pages": self.pages,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "total_latency_ms": to_ms(self.latency.sum),
+            "mean_latency_ms": to_ms(
+                self.latency.sum / self.latency.count if self.latency.count else None
+            ),
+            "p50_latency_ms": to_ms(self.latency.percentile(50)),
+            "p95_latency_ms": to_ms(self.latency.percentile(95)),
+            "p99_latency_ms": to_ms(self.latency.percentile(99)),
+            "max_latency_ms": to_ms(self.latency.max),
+        }
+
+
+class ApiMetrics:
+    """
+    Records the activity of the api client per endpoint template and method.
+    A call is a query to the API as the resources see it, it can be made of many
+    requests, one per page and per retry.
+    """
+
+    def __init__(self, host: str):
+        """
+        :param host: the host of the API, it is removed from the urls
+        """
+        self.host = host
+        self.endpoints: Dict[Tuple[str, str], EndpointMetrics] = {}
+
+    def get_endpoint_metrics(self, method: str, url: str) -> EndpointMetrics:
+        """Get the metrics of an endpoint, creating them if needed
+        :param method: the http method
+        :param url: the url or the endpoint of the request
+        """
+        key = (method, get_endpoint_template(url, self.host))
+        if key not in self.endpoints:
+            self.endpoints[key] = EndpointMetrics()
+        return self.endpoints[key]
+
+    def record_request(
+        self,
+        method: str,
+        url: str,
+        latency: float,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        failed: bool = False,
+    ):
+        """Record a single http request
+        :param method: the http method
+        :param url: the url of the request
+        :param latency: the seconds spent in the request
+        :param bytes_sent: the size of the body sent
+        :param bytes_received: the size of the body received
+        :param failed: whether the request failed
+        """
+        metrics = self.get_endpoint_metrics(method, url)
+        metrics.requests += 1
+        metrics.errors += int(failed)
+        metrics.bytes_sent += bytes_sent
+        metrics.bytes_received += bytes_received
+        metrics.latency.observe(latency)
+        counter = current_request_counter.get()
+        if counter is not None:
+            counter.requests += 1
+            counter.bytes_sent += bytes_sent
+            counter.bytes_received += bytes_received
+
+    def record_call(self, method: str, url: str, pages: int = 1):
+        """Record a call that succeeded, with the pages that it needed
+        :param method: the http method
+        :param url: the url or the endpoint of the call
+        :param pages: the number of pages requested
+        """
+        metrics = self.get_endpoint_metrics(method, url)
+        metrics.calls += 1
+        metrics.pages += pages
+        counter = current_request_counter.get()
+        if counter is not None:
+            counter.calls += 1
+
+    def record_retries(self, method: str, url: str, retries: int):
+        """Record the retries needed by a call
+        :param method: the http method
+        :param url: the url or the endpoint of the call
+        :param retries: the number of retries
+        """
+        if retries > 0:
+            self.get_endpoint_metrics(method, url).retries += retries
+
+    def reset(self):
+        """Forget all the recorded metrics"""
+        self.endpoints = {}
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Metrics per '<METHOD> <endpoint template>', sorted by the total latency"""
+        sorted_endpoints = sorted(
+            self.endpoints.items(), key=lambda item: -item[1].latency.sum
+        )
+        return {
+            f"{method} {template}": metrics.to_dict()
+            for (method, template), metrics in sorted_endpoints
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """Metrics as a JSON document"""
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "shimoku_api") -> str:
+        """Metrics in the Prometheus text exposition format"""
+        counters = {
+            "calls_total": ("calls", "Calls made to the API"),
+            "requests_total": ("requests", "Http requests made to the API"),
+            "errors_total": ("errors", "Http requests that failed"),
+            "retries_total": ("retries", "Retries of failed requests"),
+            "pages_total": ("pages", "Pages requested by paginated calls"),
+            "sent_bytes_total": ("bytes_sent", "Bytes sent in request bodies"),
+            "received_bytes_total": ("bytes_received", "Bytes received in responses"),
+        }
+        lines = []
+        for name, (attribute, description) in counters.items():
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for (method, template), metrics in self.endpoints.items():
+                labels = f'method="{method}",endpoint="{template}"'
+                lines.append(
+                    f"{prefix}_{name}{{{labels}}} {getattr(metrics, attribute)}"
+                )
+
+        name = f"{prefix}_request_duration_seconds"
+        lines.append(f"# HELP {name} Latency of the http requests")
+        lines.append(f"# TYPE {name} histogram")
+        for (method, template), metrics in self.endpoints.items():
+            labels = f'method="{method}",endpoint="{template}"'
+            for bound, accumulated in metrics.latency.cumulative_counts():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {accumulated}')
+            lines.append(f"{name}_sum{{{labels}}} {metrics.latency.sum}")
+            lines.append(f"{name}_count{{{labels}}} {metrics.latency.count}")
+        return "\n".join(lines) + "\n"
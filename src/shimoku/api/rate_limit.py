@@ -0,0 +1,196 @@
+import asyncio
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from time import time
+from typing import Optional, Dict, Any, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tokens available and the time they were computed, as two doubles
+_FILE_STATE = struct.Struct("dd")
+
+
+class RateLimiter:
+    """
+    Token bucket that limits the number of requests per second. The bucket holds up to
+    'burst' tokens and is refilled at 'rate' tokens per second, every request takes one.
+    When the bucket is empty the token is reserved in advance and the request waits until
+    it is refilled, so the waits are granted in order of arrival.
+    The same limiter can be shared by any number of clients, also from different threads.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        :param rate: the requests per second allowed
+        :param burst: the requests that can be made at once, by default one second of rate
+        """
+        if rate <= 0:
+            raise ValueError("The rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated_at = time()
+
+        self.requests = 0
+        self.throttled_requests = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _take_token(
+        self, tokens: float, updated_at: float
+    ) -> Tuple[float, float, float]:
+        """Refill the bucket and take a token from it
+        :param tokens: the tokens of the bucket when it was last updated
+        :param updated_at: the time of the last update
+        :return: the tokens left, the time of this update and the seconds to wait
+        """
+        now = time()
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate) - 1
+        return tokens, now, max(0.0, -tokens / self.rate)
+
+    def _reserve(self) -> float:
+        """Reserve a token, returns the seconds to wait for it"""
+        with self._lock:
+            self._tokens, self._updated_at, wait = self._take_token(
+                self._tokens, self._updated_at
+            )
+        return wait
+
+    def _give_back(self):
+        """Return a reserved token that will not be used"""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    async def acquire(self):
+        """Wait until a request can be made"""
+        wait = self._reserve()
+        self.requests += 1
+        if wait <= 0:
+            return
+        self.throttled_requests += 1
+        self.total_wait_time += wait
+        self.max_wait_time = max(self.max_wait_time, wait)
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            self._give_back()
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Configuration and waits of the limiter"""
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "requests": self.requests,
+            "throttled_requests": self.throttled_requests,
+            "total_wait_time_ms": 1000 * self.total_wait_time,
+            "max_wait_time_ms": 1000 * self.max_wait_time,
+        }
+
+
+@contextmanager
+def _locked_file(path: str):
+    """Open a file with an exclusive lock, shared by all the processes of the machine"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        if os.name == "nt":
+            import msvcrt
+
+            msvcrt.locking(fd, msvcrt.LK_LOCK, _FILE_STATE.size)
+            try:
+                yield fd
+            finally:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, _FILE_STATE.size)
+        else:
+            import fcntl
+
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield fd
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+class FileRateLimiter(RateLimiter):
+    """
+    Token bucket shared by all the processes of a machine, the state of the bucket is
+    kept in a small file that is locked while a token is taken. The processes that
+    share a file should use the same rate and burst.
+    """
+
+    def __init__(self, path: str, rate: float, burst: Optional[float] = None):
+        """
+        :param path: the file of the bucket, it is created if it does not exist
+        :param rate: the requests per second allowed
+        :param burst: the requests that can be made at once, by default one second of rate
+        """
+        super().__init__(rate, burst)
+        self.path = path
+
+    def _read_state(self, fd: int) -> Tuple[float, float]:
+        os.lseek(fd, 0, os.SEEK_SET)
+        data = os.read(fd, _FILE_STATE.size)
+        if len(data) < _FILE_STATE.size:
+            # A new bucket starts full
+            return self.burst, time()
+        return _FILE_STATE.unpack(data)
+
+    def _write_state(self, fd: int, tokens: float, updated_at: float):
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, _FILE_STATE.pack(tokens, updated_at))
+
+    def _reserve(self) -> float:
+        with self._lock, _locked_file(self.path) as fd:
+            tokens, updated_at, wait = self._take_token(*self._read_state(fd))
+            self._write_state(fd, tokens, updated_at)
+        return wait
+
+    def _give_back(self):
+        with self._lock, _locked_file(self.path) as fd:
+            tokens, updated_at = self._read_state(fd)
+            self._write_state(fd, min(self.burst, tokens + 1), updated_at)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**super().get_stats(), "path": self.path}
+
+
+_shared_rate_limiters: Dict[str, RateLimiter] = {}
+_shared_rate_limiters_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(
+    name: str, rate: float, burst: Optional[float] = None, path: Optional[str] = None
+) -> RateLimiter:
+    """Get the rate limiter shared by the clients of this process that use the same name,
+    creating it if needed. If a path is provided the bucket is also shared with the other
+    processes that use that file.
+    :param name: the name of the shared limiter
+    :param rate: the requests per second allowed
+    :param burst: the requests that can be made at once
+    :param path: the file of a bucket shared between processes
+    """
+    with _shared_rate_limiters_lock:
+        rate_limiter = _shared_rate_limiters.get(name)
+        if rate_limiter is None:
+            rate_limiter = (
+                FileRateLimiter(path, rate, burst)
+                if path is not None
+                else RateLimiter(rate, burst)
+            )
+            _shared_rate_limiters[name] = rate_limiter
+        elif rate_limiter.rate != rate or (
+            burst is not None and rate_limiter.burst != burst
+        ):
+            logger.warning(
+                f"The shared rate limiter '{name}' already exists with a rate of "
+                f"{rate_limiter.rate} requests per second, using it"
+            )
+        return rate_limiter
@@ -203,18 +203,16 @@ class App(Resource):
 
     async def get_paths_in_order(self) -> List[str]:
         """Gets all the paths of the app. They are stored in the reports."""
-        reports = await self.get_reports()
-        path_orders = [
-            (report["path"], report["pathOrder"])
-            for report in reports
-            if report["pathOrder"] is not None
-        ]
-        path_orders.sort(key=lambda x: x[1])
-        result = []
-        for path_order in path_orders:
-            if path_order[0] not in result:
-                result.append(path_order[0])
-        return result
+        path_orders = []
+        for path, reports in (await self.get_reports_by_path()).items():
+            orders = [
+                report["pathOrder"]
+                for report in reports
+                if report["pathOrder"] is not None
+            ]
+            if orders:
+                path_orders.append((min(orders), path))
+        return [path for _, path in sorted(path_orders, key=lambda x: x[0])]
 
     async def create_report(
         self, report_class: Type[Report], r_hash: str, **params
@@ -245,18 +243,29 @@ class App(Resource):
         """Gets all the reports of the app."""
         return await self._base_resource.get_children(Report)
 
+    async def get_reports_in_path(self, path: Optional[str]) -> List[Report]:
+        """Gets the reports of a path of the app.
+        :param path: The path of the reports, None for the ones without path.
+        """
+        return await self._base_resource.find_children(Report, "path", path)
+
+    async def get_reports_by_path(self) -> Dict[Optional[str], List[Report]]:
+        """Gets the reports of the app grouped by their path, listing them once."""
+        return await self._base_resource.children[Report].group_by("path")
+
     async def update_report(
         self, uuid: Optional[str] = None, r_hash: Optional[str] = None, **params
-    ):
+    ) -> bool:
         """Updates a report.
         :param uuid: The UUID of the report to update.
         :param r_hash: The hash of the report to update.
         :param params: The parameters of the report to update.
+        :return: Whether the report changed and the update was sent.
         """
         report: Optional[Report] = await self.get_report(uuid, r_hash)
         if not report:
             logger.warning(f"Report {r_hash if r_hash else uuid} not found")
-            return
+            return False
         params = deepcopy(params)
         if "properties" in params:
             if "hash" in params["properties"]:
@@ -264,7 +273,7 @@ class App(Resource):
             report.set_properties(**params.pop("properties"))
 
         report.set_params(**params)
-        await report.update()
+        return await report.update()
 
     async def delete_report(
         self, uuid: Optional[str] = None, r_hash: Optional[str] = None
@@ -347,19 +356,18 @@ class App(Resource):
             return False
         reports = await self.get_reports()
         report_data_sets_lists = await asyncio.gather(
-            *[report.get_report_data_sets() for report in reports]
+            *[
+                report.get_report_data_sets_of_data_set(data_set["id"])
+                for report in reports
+            ]
+        )
+        await asyncio.gather(
+            *[
+                report.delete_report_dataset(rds["id"])
+                for report, report_data_sets in zip(reports, report_data_sets_lists)
+                for rds in report_data_sets
+            ]
         )
-        delete_tasks = []
-        for i, report_data_sets in enumerate(report_data_sets_lists):
-            await asyncio.gather(
-                *[
-                    reports[i].delete_report_dataset(rds["id"])
-                    for rds in report_data_sets
-                    if rds["dataSetId"] == data_set["id"]
-                ]
-            )
-
-        await asyncio.gather(*delete_tasks)
         await self.delete_data_set(uuid, name)
         return True
 
@@ -371,12 +379,12 @@ class App(Resource):
         :param data_set_ids: The ids of the datasets to delete.
         """
         all_reports = await self.get_reports()
-        all_rds = await asyncio.gather(
-            *[report.get_report_data_sets() for report in all_reports]
+        linked_data_set_ids = await asyncio.gather(
+            *[report.get_linked_data_set_ids() for report in all_reports]
         )
-        all_datasets_in_use = [
-            rds["dataSetId"] for _rds_list in all_rds for rds in _rds_list
-        ]
+        all_datasets_in_use = {
+            data_set_id for ids in linked_data_set_ids for data_set_id in ids
+        }
         all_datasets = await self.get_data_sets()
         dataset_ids_to_delete = [
             ds["id"]
@@ -35,6 +35,7 @@ class Dashboard(Resource):
 
         resource_type = "appDashboard"
         plural = "appDashboards"
+        indexed_fields = ("appId",)
 
         def __init__(
             self,
@@ -135,14 +136,14 @@ class Dashboard(Resource):
         """Removes an app from the dashboard
         :param app: The App to remove
         """
-        tasks = []
         cache: ResourceCache = self._base_resource.children[Dashboard.AppDashboard]
-        cache_list = await cache.list()
-        for app_dashboard in cache_list:
-            if app_dashboard["appId"] == app["id"]:
-                tasks.append(cache.delete(uuid=app_dashboard["id"]))
-
-        await asyncio.gather(*tasks)
+        app_dashboards = await cache.find("appId", app["id"])
+        await asyncio.gather(
+            *[
+                cache.delete(uuid=app_dashboard["id"])
+                for app_dashboard in app_dashboards
+            ]
+        )
         logger.info(f"Menu path {str(app)} removed from board {str(self)}")
 
     async def remove_all_apps(self):
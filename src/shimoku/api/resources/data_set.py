@@ -1,4 +1,5 @@
 import datetime as dt
+import json
 import pandas as pd
 import asyncio
 from copy import deepcopy
@@ -6,7 +7,7 @@ from typing import Optional, Union, TYPE_CHECKING, TypeVar
 from numbers import Number
 
 
-from ..base_resource import Resource
+from ..base_resource import Resource, SparseParams
 from shimoku.exceptions import DataError
 
 if TYPE_CHECKING:
@@ -19,6 +20,21 @@ logger = logging.getLogger(__name__)
 
 Mapping = TypeVar("Mapping", bound=Union[dict, list[str], str])
 
+# Schema of the data points, every field is None by default
+DATA_POINT_FIELDS = {
+    "dataSetId": None,
+    "orderField1": None,
+    "description": None,
+    "customField1": None,
+    **{f"dateField{i}": None for i in range(1, 6)},
+    **{
+        f"{field}{i}": None
+        for i in range(1, 51)
+        for field in ("stringField", "intField")
+    },
+}
+DATA_POINT_SERIALIZED_FIELDS = ["customField1"]
+
 
 def get_column_types(data_point: dict, sort: Optional[dict]) -> dict:
     """Given a data point, return a dictionary with the column names as keys and their types as values
@@ -219,24 +235,15 @@ class DataSet(Resource):
             uuid: Optional[str] = None,
             db_resource: Optional[dict] = None,
         ):
-            params = dict(
-                dataSetId=parent["id"],
-                orderField1=None,
-                description=None,
-                customField1=None,
-            )
-            for i in range(1, 6):
-                params.update({f"dateField{i}": None})
-            for i in range(1, 51):
-                params.update({f"stringField{i}": None})
-                params.update({f"intField{i}": None})
+            # A row only stores the fields it uses
+            params = SparseParams(DATA_POINT_FIELDS, {"dataSetId": parent["id"]})
 
             super().__init__(
                 parent=parent,
                 db_resource=db_resource,
                 uuid=uuid,
                 params=params,
-                params_to_serialize=["customField1"],
+                params_to_serialize=DATA_POINT_SERIALIZED_FIELDS,
             )
 
         async def delete(self):
@@ -410,6 +417,67 @@ class DataSet(Resource):
         self.clear()
         return await self._base_resource.get_children(self.DataPoint, limit=limit)
 
+    async def get_data_frame(
+        self, columns: Optional[list[str]] = None, limit: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Get the data points as a DataFrame, the items returned by the api are put
+        in columns directly, without creating a data point per row. The fields are
+        renamed back to the columns of the data set and the dates are parsed.
+        :param columns: the columns to get, by default all of them
+        :param limit: the maximum number of rows
+        """
+        items = await self._base_resource.children[self.DataPoint].fetch_items(limit)
+        # The limit is the size of the pages when the listing is paginated by token
+        items = (items or [])[:limit]
+        # Sorted before choosing the columns, the order column may not be requested
+        if any(item.get("orderField1") is not None for item in items):
+            items = sorted(
+                items,
+                key=lambda item: (
+                    item.get("orderField1") is None,
+                    item.get("orderField1") or 0,
+                ),
+            )
+
+        mapping = self["columns"]
+        if not isinstance(mapping, dict) or not mapping:
+            # Without metadata the fields used by the data points are returned
+            used_fields = set()
+            for item in items:
+                used_fields.update(k for k, v in item.items() if v is not None)
+            mapping = {
+                field: field
+                for field in DATA_POINT_FIELDS
+                if field in used_fields and field != "dataSetId"
+            }
+        if columns is not None:
+            unknown_columns = [column for column in columns if column not in mapping]
+            if unknown_columns:
+                log_error(
+                    logger,
+                    f"Columns {unknown_columns} are not in the data set {str(self)}",
+                    DataError,
+                )
+            mapping = {column: mapping[column] for column in columns}
+
+        data = {}
+        for column, field in mapping.items():
+            values = [item.get(field) for item in items]
+            if field.startswith("dateField"):
+                data[column] = pd.to_datetime(
+                    pd.Series(values, dtype=object), utc=True
+                ).dt.tz_localize(None)
+            elif field.startswith("intField") or field == "orderField1":
+                data[column] = pd.Series(values, dtype=float)
+            elif field == "customField1":
+                data[column] = pd.Series(
+                    [json.loads(v) if isinstance(v, str) else v for v in values],
+                    dtype=object,
+                )
+            else:
+                data[column] = pd.Series(values, dtype=object)
+        return pd.DataFrame(data)
+
     async def get_one_data_point(self) -> Optional["DataSet.DataPoint"]:
         """Get one data point"""
         self.clear()
@@ -21,6 +21,7 @@ class Report(Resource):
     resource_type = "report"
     plural = "reports"
     alias_field = "properties/hash"
+    indexed_fields = ("path",)
 
     report_type = None
     possible_values = {}
@@ -32,6 +33,7 @@ class Report(Resource):
         _module_logger = logger
         resource_type = "reportDataSet"
         plural = "reportDataSets"
+        indexed_fields = ("dataSetId",)
 
         def __init__(
             self,
@@ -205,7 +207,6 @@ class Report(Resource):
                 )
 
         self["properties"].update(properties)
-        self._base_resource.changed_params.add("properties")
 
     async def change_report_type(self, report_class: Type["Report"]):
         """change the report type of the report"""
@@ -259,6 +260,22 @@ class Report(Resource):
         """Get all the report datasets of the report"""
         return await self._base_resource.get_children(self.ReportDataSet)
 
+    async def get_report_data_sets_of_data_set(
+        self, data_set_id: str
+    ) -> list["ReportDataSet"]:
+        """Get the report datasets that link the report to a dataset
+        :param data_set_id: the id of the dataset
+        """
+        return await self._base_resource.find_children(
+            self.ReportDataSet, "dataSetId", data_set_id
+        )
+
+    async def get_linked_data_set_ids(self) -> list[str]:
+        """Get the ids of the datasets linked to the report"""
+        return await self._base_resource.children[self.ReportDataSet].get_index_values(
+            "dataSetId"
+        )
+
     async def delete_report_dataset(self, uuid: Optional[str] = None) -> bool:
         """Delete a report dataset
         :param uuid: the uuid of the report dataset to delete
@@ -0,0 +1,248 @@
+import asyncio
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Optional, Callable, Awaitable, Any, Tuple, Type
+
+from shimoku.utils import IN_BROWSER
+from shimoku.exceptions import APIError, CircuitOpenError
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+if not IN_BROWSER:
+    from aiohttp import ClientConnectionError
+
+    TRANSIENT_ERRORS: Tuple[Type[BaseException], ...] = (
+        asyncio.TimeoutError,
+        ClientConnectionError,
+    )
+else:
+    TRANSIENT_ERRORS = (asyncio.TimeoutError,)
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "PATCH")
+# Statuses that can be retried when the method is idempotent
+RETRYABLE_STATUS_CODES = (408, 425, 429, 500, 502, 503, 504)
+# Statuses that guarantee that the request was not processed, so even a POST can be retried
+NOT_PROCESSED_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Get the seconds to wait from a Retry-After header, which can be either
+    a number of seconds or an http date
+    :param value: the value of the header
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_date.tzinfo is None:
+        retry_date = retry_date.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_date - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests when the backend is down. After a number of consecutive
+    transient failures the circuit opens and every call fails fast, once the reset
+    timeout has passed one trial call is let through, if it succeeds the circuit
+    closes again, if it fails it stays open for another reset timeout.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        """
+        :param failure_threshold: consecutive failures needed to open the circuit
+        :param reset_timeout: seconds the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_progress = False
+        self.times_opened = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def before_call(self) -> bool:
+        """Raise if the circuit is open and the call can not be a trial call
+        :return: whether the call is the trial call
+        """
+        if self.opened_at is None:
+            return False
+        remaining = self.opened_at + self.reset_timeout - monotonic()
+        if remaining > 0 or self._trial_in_progress:
+            raise CircuitOpenError(
+                "The API is not responding, requests are paused for "
+                f"{max(remaining, 0):.1f} seconds",
+                retry_after=max(remaining, 0),
+            )
+        self._trial_in_progress = True
+        return True
+
+    def cancel_trial(self):
+        """The trial call was cancelled before it succeeded or failed, the next call
+        can be the trial"""
+        self._trial_in_progress = False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_progress = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self._trial_in_progress or (
+            self.opened_at is None
+            and self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.opened_at is None:
+                self.times_opened += 1
+                logger.warning(
+                    f"The API failed {self.consecutive_failures} times in a row, "
+                    f"pausing requests for {self.reset_timeout} seconds"
+                )
+            self.opened_at = monotonic()
+            self._trial_in_progress = False
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests are retried and how long to wait between attempts.
+    - The waits follow a decorrelated jitter, so that the retries of many workers
+      do not hit the API at the same time.
+    - The Retry-After header sent by the API is honoured.
+    - Only transient failures are retried, and requests that are not idempotent (POST)
+      only when the API guarantees that they were not processed, so that batches of
+      data points are not duplicated.
+    - All the attempts of a call share a time budget.
+    - A circuit breaker makes the calls fail fast while the API is down.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30,
+        time_budget: Optional[float] = 120,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        idempotent_methods: Tuple[str, ...] = IDEMPOTENT_METHODS,
+        retryable_status_codes: Tuple[int, ...] = RETRYABLE_STATUS_CODES,
+        seed: Optional[int] = None,
+    ):
+        """
+        :param max_attempts: maximum number of attempts of a call, including the first one
+        :param base_delay: minimum seconds to wait between attempts
+        :param max_delay: maximum seconds to wait between attempts
+        :param time_budget: maximum seconds spent in all the attempts of a call, None for no limit
+        :param circuit_breaker: the circuit breaker to use, one is created if not provided
+        :param idempotent_methods: http methods that can always be retried
+        :param retryable_status_codes: http statuses of the transient errors
+        :param seed: seed of the jitter, for reproducible waits
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.time_budget = time_budget
+        self.circuit_breaker = (
+            circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        )
+        self.idempotent_methods = idempotent_methods
+        self.retryable_status_codes = retryable_status_codes
+        self._random = random.Random(seed)
+        self.retries = 0
+
+    def is_transient(self, error: BaseException) -> bool:
+        """Whether the error can disappear by itself
+        :param error: the error raised by the request
+        """
+        if isinstance(error, CircuitOpenError):
+            return False
+        if isinstance(error, APIError):
+            return (
+                error.status_code is None
+                or error.status_code in self.retryable_status_codes
+            )
+        return isinstance(error, TRANSIENT_ERRORS)
+
+    def should_retry(self, method: str, error: BaseException) -> bool:
+        """Whether a failed request can be sent again
+        :param method: the http method of the request
+        :param error: the error raised by the request
+        """
+        if not self.is_transient(error):
+            return False
+        if method.upper() in self.idempotent_methods:
+            return True
+        return (
+            isinstance(error, APIError)
+            and error.status_code in NOT_PROCESSED_STATUS_CODES
+        )
+
+    def next_delay(self, previous_delay: float, error: BaseException) -> float:
+        """Seconds to wait before the next attempt, the Retry-After of the API
+        takes precedence over the decorrelated jitter
+        :param previous_delay: the previous wait, or 0 if it is the first retry
+        :param error: the error raised by the request
+        """
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return min(float(retry_after), self.max_delay)
+        upper = max(self.base_delay, previous_delay * 3)
+        return min(self.max_delay, self._random.uniform(self.base_delay, upper))
+
+    async def call(
+        self, method: str, a_func: Callable[..., Awaitable], *args, **kwargs
+    ) -> Any:
+        """Call a function retrying it according to the policy
+        :param method: the http method of the request made by the function
+        :param a_func: the async function to call
+        """
+        initial_time = monotonic()
+        delay = 0.0
+        attempt = 1
+        while True:
+            trial = self.circuit_breaker.before_call()
+            try:
+                result = await a_func(*args, **kwargs)
+            except Exception as e:
+                transient = self.is_transient(e)
+                if transient:
+                    self.circuit_breaker.record_failure()
+                elif not isinstance(e, CircuitOpenError):
+                    # The API answered, so it is up
+                    self.circuit_breaker.record_success()
+
+                if attempt >= self.max_attempts or not self.should_retry(method, e):
+                    raise e
+
+                delay = self.next_delay(delay, e)
+                elapsed = monotonic() - initial_time
+                if self.time_budget is not None and elapsed + delay > self.time_budget:
+                    logger.warning(
+                        f"Retry time budget of {self.time_budget}s exhausted, giving up"
+                    )
+                    raise e
+
+                logger.warning(f"Error: {e}, retrying in {delay:.2f}s")
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # e.g. a cancellation, the call neither succeeded nor failed
+                if trial:
+                    self.circuit_breaker.cancel_trial()
+                raise
+
+            self.circuit_breaker.record_success()
+            return result
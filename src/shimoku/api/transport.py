@@ -0,0 +1,244 @@
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+from collections import deque
+from time import perf_counter
+from typing import Optional, Any, Tuple, Dict, Deque, List, TYPE_CHECKING
+
+from shimoku.exceptions import APIError, CassetteError
+
+import logging
+from shimoku.execution_logger import log_error
+
+if TYPE_CHECKING:
+    from shimoku.api.client import ApiClient
+
+logger = logging.getLogger(__name__)
+
+# The decoded data, and the sizes in bytes of the bodies sent and received
+TransportResponse = Tuple[Any, int, int]
+
+
+def get_relative_url(url: str, host: str) -> str:
+    """Remove the host of the API from a url, so that cassettes recorded against one
+    environment can be replayed with any other
+    :param url: the url of the request
+    :param host: the host of the API
+    """
+    return url[len(host) :] if url.startswith(host) else url
+
+
+def get_body_hash(body: Any) -> Optional[str]:
+    """Hash of a request body, used to tell apart requests made to the same url
+    :param body: the body of the request
+    """
+    if not body:
+        return None
+    if not isinstance(body, bytes):
+        body = json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(body).hexdigest()
+
+
+def encode_data(data: Any) -> Dict[str, Any]:
+    """Encode the data of a response to be stored as JSON"""
+    if isinstance(data, bytes):
+        return {"data_base64": base64.b64encode(data).decode("ascii")}
+    return {"data": data}
+
+
+def decode_data(interaction: Dict[str, Any]) -> Any:
+    """Decode the data of a response stored by encode_data"""
+    if "data_base64" in interaction:
+        return base64.b64decode(interaction["data_base64"])
+    return interaction.get("data")
+
+
+class Transport:
+    """Sends the http requests of an api client, by default through ApiClient._request"""
+
+    async def send(
+        self,
+        api_client: "ApiClient",
+        method: str,
+        url: str,
+        query_params=None,
+        headers=None,
+        body=None,
+    ) -> TransportResponse:
+        """Send a request and return its decoded data and the sizes of the bodies
+        :param api_client: the api client that makes the request
+        :param method: the http method
+        :param url: the url of the request
+        :param query_params: the query parameters
+        :param headers: the headers
+        :param body: the body, either bytes or an object that can be serialized as JSON
+        """
+        return await api_client._request(
+            method=method,
+            url=url,
+            query_params=query_params,
+            headers=headers,
+            body=body,
+        )
+
+    def flush(self):
+        """Persist anything the transport keeps in memory"""
+        pass
+
+
+class RecordingTransport(Transport):
+    """
+    Sends the requests through another transport and records every interaction
+    (request, response and timing) in a cassette, a gzip compressed file of JSON lines.
+    The interactions are appended to the cassette every time the transport is flushed,
+    which the api client does when it closes its session.
+    """
+
+    def __init__(self, cassette_path: str, transport: Optional[Transport] = None):
+        """
+        :param cassette_path: the file where the interactions are recorded
+        :param transport: the transport that sends the requests, http by default
+        """
+        self.cassette_path = cassette_path
+        self.transport = transport if transport is not None else Transport()
+        self._pending: List[Dict[str, Any]] = []
+        self._initial_time: Optional[float] = None
+        # Overwrite any previous recording
+        with gzip.open(self.cassette_path, "wt", encoding="utf-8"):
+            pass
+
+    async def send(
+        self,
+        api_client: "ApiClient",
+        method: str,
+        url: str,
+        query_params=None,
+        headers=None,
+        body=None,
+    ) -> TransportResponse:
+        if self._initial_time is None:
+            self._initial_time = perf_counter()
+        interaction = {
+            "method": method,
+            "url": get_relative_url(url, api_client.host),
+            "query_params": query_params,
+            "body_hash": get_body_hash(body),
+            "started_at": perf_counter() - self._initial_time,
+        }
+        initial_time = perf_counter()
+        try:
+            data, bytes_sent, bytes_received = await self.transport.send(
+                api_client, method, url, query_params, headers, body
+            )
+        except APIError as e:
+            interaction.update(
+                latency=perf_counter() - initial_time,
+                status=e.status_code,
+                retry_after=e.retry_after,
+                **encode_data(e.text),
+            )
+            self._pending.append(interaction)
+            raise
+        interaction.update(
+            latency=perf_counter() - initial_time,
+            status=200,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+            **encode_data(data),
+        )
+        self._pending.append(interaction)
+        return data, bytes_sent, bytes_received
+
+    def flush(self):
+        """Append the pending interactions to the cassette"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        with gzip.open(self.cassette_path, "at", encoding="utf-8") as cassette:
+            for interaction in pending:
+                cassette.write(json.dumps(interaction) + "\n")
+        self.transport.flush()
+
+
+class ReplayTransport(Transport):
+    """
+    Serves the requests from a cassette recorded by the RecordingTransport, without
+    any network access. A request is answered with the first unused interaction with
+    the same method, url, query parameters and body, or if there is none, with the
+    same request but a different body (bodies can contain timestamps or tokens).
+    The recorded latencies are reproduced multiplied by the latency scale.
+    """
+
+    def __init__(self, cassette_path: str, latency_scale: float = 1.0):
+        """
+        :param cassette_path: the file with the recorded interactions
+        :param latency_scale: multiplies the recorded latencies, 0 answers immediately
+        """
+        self.cassette_path = cassette_path
+        self.latency_scale = latency_scale
+        with gzip.open(cassette_path, "rt", encoding="utf-8") as cassette:
+            self.interactions: List[Dict[str, Any]] = [
+                json.loads(line) for line in cassette if line.strip()
+            ]
+        self._used = [False] * len(self.interactions)
+        self._exact: Dict[tuple, Deque[int]] = {}
+        self._loose: Dict[tuple, Deque[int]] = {}
+        for i, interaction in enumerate(self.interactions):
+            key = self._get_key(
+                interaction["method"],
+                interaction["url"],
+                interaction["query_params"],
+            )
+            self._loose.setdefault(key, deque()).append(i)
+            self._exact.setdefault((*key, interaction["body_hash"]), deque()).append(i)
+
+    @staticmethod
+    def _get_key(method: str, url: str, query_params) -> tuple:
+        return method, url, json.dumps(query_params, default=str)
+
+    @property
+    def unused_interactions(self) -> int:
+        """Number of recorded interactions that have not been replayed"""
+        return self._used.count(False)
+
+    def _pop_unused(self, queue: Optional[Deque[int]]) -> Optional[int]:
+        while queue:
+            i = queue.popleft()
+            if not self._used[i]:
+                self._used[i] = True
+                return i
+        return None
+
+    async def send(
+        self,
+        api_client: "ApiClient",
+        method: str,
+        url: str,
+        query_params=None,
+        headers=None,
+        body=None,
+    ) -> TransportResponse:
+        key = self._get_key(
+            method, get_relative_url(url, api_client.host), query_params
+        )
+        i = self._pop_unused(self._exact.get((*key, get_body_hash(body))))
+        if i is None:
+            i = self._pop_unused(self._loose.get(key))
+        if i is None:
+            log_error(
+                logger,
+                f"The request {method} {key[1]} is not recorded in the cassette "
+                f"{self.cassette_path}",
+                CassetteError,
+            )
+
+        interaction = self.interactions[i]
+        await asyncio.sleep(interaction["latency"] * self.latency_scale)
+        data = decode_data(interaction)
+        if interaction["status"] != 200:
+            api_client.raise_api_exception(
+                data, interaction["status"], interaction["retry_after"]
+            )
+        return data, interaction["bytes_sent"], interaction["bytes_received"]
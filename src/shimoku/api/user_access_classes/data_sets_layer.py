@@ -208,6 +208,34 @@ class DataSetsLayer(ClassWithLogging):
             for dp in await data_set.get_data_points(limit)
         ]
 
+    async def get_data_frame_from_data_set(
+        self,
+        uuid: Optional[str] = None,
+        name: Optional[str] = None,
+        columns: Optional[list[str]] = None,
+        limit: Optional[int] = None,
+    ) -> DataFrame:
+        """Get the data in a dataset in the menu path as a DataFrame, with the original
+        column names and the dates parsed. It is faster than get_data_from_data_set for
+        big datasets.
+        :param name: name of the dataset
+        :param uuid: uuid of the dataset
+        :param columns: columns to be returned, by default all of them
+        :param limit: limit of the data points to be returned
+        :return: data in the dataset
+        """
+        data_set = await self._app.get_data_set(
+            uuid=uuid, name=name, create_if_not_exists=False
+        )
+        if not data_set:
+            logger.warning(f"Data set {name if name else uuid} does not exist.")
+            return DataFrame()
+        df = await data_set.get_data_frame(columns=columns, limit=limit)
+        if columns is None:
+            # The rows are sorted by the column added by append_to_data_set
+            df = df.drop(columns=["sort_values"], errors="ignore")
+        return df
+
     async def get_data_set_metadata(
         self,
         uuid: Optional[str] = None,
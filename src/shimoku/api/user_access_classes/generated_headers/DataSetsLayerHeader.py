@@ -89,6 +89,24 @@ class DataSetsLayerHeader:
         """
         pass
 
+    def get_data_frame_from_data_set(
+        self,
+        uuid: Optional[str] = None,
+        name: Optional[str] = None,
+        columns: Optional[list[str]] = None,
+        limit: Optional[int] = None,
+    ) -> DataFrame:
+        """Get the data in a dataset in the menu path as a DataFrame, with the original
+        column names and the dates parsed. It is faster than get_data_from_data_set for
+        big datasets.
+        :param name: name of the dataset
+        :param uuid: uuid of the dataset
+        :param columns: columns to be returned, by default all of them
+        :param limit: limit of the data points to be returned
+        :return: data in the dataset
+        """
+        pass
+
     def get_data_set_metadata(
         self,
         uuid: Optional[str] = None,
@@ -1,6 +1,6 @@
 from typing import Optional
 from shimoku.api.resources.universe import Universe
-from shimoku import ApiClient
+from shimoku.api.client import ApiClient
 from shimoku.exceptions import UniverseError
 
 import logging
@@ -0,0 +1,217 @@
+from typing import Any, Dict, Optional
+
+from shimoku.base_client import BaseClient
+from shimoku.async_execution_pool import decorate_class_to_await_directly
+from shimoku.api.retry import RetryPolicy
+from shimoku.api.transport import Transport
+from shimoku.api.rate_limit import RateLimiter
+from shimoku.api.user_access_classes.universes_layer import UniversesLayer
+from shimoku.api.user_access_classes.businesses_layer import WorkspacesLayer
+from shimoku.api.user_access_classes.activity_templates_layer import (
+    ActivityTemplatesLayer,
+)
+from shimoku.api.user_access_classes.dashboards_layer import BoardsLayer
+from shimoku.api.user_access_classes.apps_layer import MenuPathsLayer
+from shimoku.api.user_access_classes.reports_layer import ComponentsLayer
+from shimoku.api.user_access_classes.data_sets_layer import DataSetsLayer
+from shimoku.api.user_access_classes.files_layer import FilesLayer
+from shimoku.api.user_access_classes.activities_layer import ActivitiesLayer
+from shimoku.api.user_access_classes.actions_layer import ActionsLayer
+from shimoku.plt.plt_layer import PlotLayer
+from shimoku.plt.utils import create_normalized_name
+from shimoku.ai.ai_layer import AILayer
+
+from shimoku.exceptions import BoardError
+
+import logging
+from shimoku.execution_logger import log_error, logging_before_and_after
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncClient(BaseClient):
+    """
+    Client for asyncio applications. The methods of the layers are plain coroutines
+    that are awaited in the loop of the caller, without the task pool of the Client:
+
+        async with AsyncClient(access_token=..., universe_id=...) as s:
+            await s.set_workspace(uuid=...)
+            await s.set_menu_path("Sales")
+            await asyncio.gather(
+                s.plt.html(html="<h1>Sales</h1>", order=0),
+                s.plt.bar(data=df, x="month", order=1),
+            )
+            await s.run()
+
+    The calls made concurrently must not change the context (workspace, board, menu
+    path, tabs group, modal...) the others depend on. The charts keep the context in
+    use when they are called, and the methods that create several components, like
+    plt.indicator or the bentobox charts, return a coroutine that awaits all of them:
+
+        order = await s.plt.indicator(data=indicators, order=2)
+    """
+
+    universes: UniversesLayer
+    workspaces: WorkspacesLayer
+    activity_templates: ActivityTemplatesLayer
+    actions: ActionsLayer
+    boards: BoardsLayer
+    menu_paths: MenuPathsLayer
+    components: ComponentsLayer
+    data: DataSetsLayer
+    io: FilesLayer
+    activities: ActivitiesLayer
+    ai: AILayer
+    plt: PlotLayer
+
+    def __init__(
+        self,
+        universe_id: str = "local",
+        environment: str = "production",
+        access_token: Optional[str] = None,
+        config: Optional[Dict] = None,
+        verbosity: str = None,
+        local_port: int = 8000,
+        retry_attempts: int = 5,
+        retry_policy: Optional[RetryPolicy] = None,
+        transport: Optional[Transport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        super().__init__(
+            universe_id=universe_id,
+            environment=environment,
+            access_token=access_token,
+            config=config,
+            verbosity=verbosity,
+            local_port=local_port,
+            retry_attempts=retry_attempts,
+            retry_policy=retry_policy,
+            transport=transport,
+            rate_limiter=rate_limiter,
+        )
+        self._create_layers()
+
+    def _create_layer(self, layer_class: type, *args) -> Any:
+        return decorate_class_to_await_directly(layer_class)(*args)
+
+    async def __aenter__(self) -> "AsyncClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @logging_before_and_after(logging_level=logger.info)
+    async def set_workspace(
+        self, uuid: Optional[str] = None, name: Optional[str] = None
+    ) -> None:
+        """Set workspace id for the client.
+        :param uuid: Workspace uuid
+        :param name: Workspace name
+        """
+        if self._api_client.playground:
+            uuid, name = "local", None
+        await self._change_workspace(uuid, name)
+
+    @logging_before_and_after(logging_level=logger.info)
+    async def pop_out_of_menu_path(self) -> None:
+        """Pop out of the menu path."""
+        self._leave_app()
+
+    @logging_before_and_after(logging_level=logger.info)
+    async def set_board(self, name: str) -> None:
+        """Set the board in use for the following apps being called.
+        :param name: board name
+        """
+        if not self._business_object:
+            log_error(
+                logger,
+                "Workspace not set. Please use set_workspace() method first.",
+                AttributeError,
+            )
+        if self._app_object:
+            self._leave_app()
+        if self._dashboard_object:
+            self._dashboard_object.currently_in_use = False
+        await self._change_board(name)
+
+    @logging_before_and_after(logging_level=logger.info)
+    async def pop_out_of_board(self) -> None:
+        """Pop out of the dashboard."""
+        if not self._business_object:
+            log_error(
+                logger,
+                "Workspace not set. Please use set_workspace() method first.",
+                AttributeError,
+            )
+        if not self._dashboard_object:
+            log_error(
+                logger,
+                "Board not set. Please use set_board() method first.",
+                BoardError,
+            )
+        if self._app_object:
+            self._leave_app()
+        self._leave_board()
+
+    @logging_before_and_after(logging_level=logger.info)
+    async def set_menu_path(
+        self,
+        name: str,
+        sub_path: Optional[str] = None,
+        dont_add_to_dashboard: bool = False,
+    ) -> None:
+        """Set menu path for the client.
+        :param name: Menu path
+        :param sub_path: Sub path
+        :param dont_add_to_dashboard: Whether to add the menu path to the dashboard
+        """
+        if not self._business_object:
+            log_error(
+                logger,
+                "Workspace not set. Please use set_workspace() method first.",
+                AttributeError,
+            )
+        path = sub_path if sub_path else None
+        data_names = []
+        if self._app_object:
+            self.plt.raise_if_cant_change_path()
+            if self._app_object["normalizedName"] == create_normalized_name(name):
+                self.plt.change_path(path)
+                return
+            data_names = self.plt.get_shared_data_names()
+
+        await self._change_app(name, dont_add_to_dashboard)
+        self.plt.change_path(path)
+        if data_names:
+            logger.info(
+                f"Shared data entries will no longer be available: {data_names}, set them again if needed."
+            )
+
+    async def run(self) -> None:
+        """Execute the pending updates of the containers and notify the front end that
+        the contents of the workspace have changed."""
+        self._async_pool.ending_tasks[
+            "Business_contents_updated"
+        ] = self._create_business_contents_updated_event()
+        await self._async_pool.execute_tasks()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        query_params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        body: Optional[dict] = None,
+    ) -> any:
+        return await self._api_client.request(
+            method=method,
+            url=url,
+            query_params=query_params,
+            headers=headers,
+            body=body,
+            to_tazawa=False,
+        )
+
+    async def close(self):
+        """Close the HTTP connections."""
+        await self._api_client.close()
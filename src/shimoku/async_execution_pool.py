@@ -1,16 +1,23 @@
 import asyncio
 import uuid
-from typing import Optional, Callable, Dict, Union, Coroutine, Any, Type
+import weakref
+from contextvars import ContextVar
+from typing import Optional, Callable, Dict, Union, Coroutine, Any, Type, Iterable
+from typing import Hashable
 import logging
-from threading import Thread
+from threading import Thread, current_thread, Lock
 from shimoku.utils import IN_BROWSER
 from shimoku.api.client import ApiClient
+from shimoku.task_scheduler import TaskScheduler
 import inspect
 
 from copy import copy
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of queued tasks executed at the same time
+DEFAULT_MAX_WORKERS = 32
+
 
 def add_to_general_async_group(func: Callable):
     """
@@ -30,6 +37,30 @@ def add_to_individual_async_group(func: Callable):
     return func
 
 
+def _stop_background_loop(
+    loop: asyncio.AbstractEventLoop, thread: Thread, api_client: ApiClient
+):
+    """
+    Closes the HTTP session of the api client in the background event loop, then stops
+    the loop and waits for its thread to finish.
+    """
+    if loop.is_closed():
+        return
+    if current_thread() is thread:
+        # Can not wait for the loop from its own thread, just let it finish
+        loop.call_soon(loop.stop)
+        return
+    if loop.is_running():
+        try:
+            asyncio.run_coroutine_threadsafe(api_client.close(), loop).result(timeout=5)
+        except Exception as e:
+            logger.debug(f"Error closing the HTTP session: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+    if not loop.is_running():
+        loop.close()
+
+
 class AutoAsyncExecutionPool:
     """
     This class stores the arguments needed to execute
@@ -45,7 +76,10 @@ class AutoAsyncExecutionPool:
     ):
         self.api_client = api_client
         self.ending_tasks: Dict[str, Coroutine] = {}
-        self.task_pool = []
+        self.task_scheduler = TaskScheduler()
+        self.max_workers: Optional[int] = DEFAULT_MAX_WORKERS
+        # Count the api calls, requests and bytes of each task
+        self.profile = False
         self.free_context = {}
         # By default, set to true, to make the user aware that it is using the async configuration
         # (they will have to explicitly state it in their code)
@@ -54,23 +88,77 @@ class AutoAsyncExecutionPool:
         self.in_async = False
         self._current_groups: list[Optional[str]] = []
 
+        # Event loop that executes the sequential calls, it lives in its own thread so that
+        # the HTTP session, the caches and the locks survive between calls
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[Thread] = None
+        self._loop_lock = Lock()
+        self._loop_finalizer: Optional[weakref.finalize] = None
+
+    def _get_background_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Returns the event loop of the pool, starting its thread if it is not running.
+        """
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = Thread(
+                    target=loop.run_forever, name="shimoku-event-loop", daemon=True
+                )
+                thread.start()
+                self._loop, self._loop_thread = loop, thread
+                # Stop the loop when the pool is garbage collected or the interpreter exits
+                self._loop_finalizer = weakref.finalize(
+                    self, _stop_background_loop, loop, thread, self.api_client
+                )
+            return self._loop
+
+    def close(self):
+        """
+        Closes the HTTP session and stops the background event loop, a new one is started
+        if the pool is used again.
+        """
+        with self._loop_lock:
+            finalizer, self._loop_finalizer = self._loop_finalizer, None
+            self._loop, self._loop_thread = None, None
+        if finalizer is not None:
+            finalizer()
+
+    def _run_in_background_loop(self, coroutine: Coroutine) -> Any:
+        """
+        Executes a coroutine in the background event loop and waits for its result.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            coroutine, self._get_background_loop()
+        )
+        try:
+            return future.result()
+        except BaseException:
+            # e.g. a KeyboardInterrupt, the execution can not continue without the caller
+            future.cancel()
+            raise
+
+    def has_pending_writer(self, resource: Hashable) -> bool:
+        """
+        Returns whether a task waiting in the pool writes the resource.
+        """
+        return self.task_scheduler.has_pending_writer(resource)
+
     def clear(self):
         self.ending_tasks = {}
-        self.task_pool = []
+        self.task_scheduler.clear()
         self.free_context = {}
         self._current_groups = []
 
     async def execute_tasks(self) -> list:
         """
         This function executes the tasks in the task pool, and the ending tasks, if any.
-        Lastly, it executes the last task in the task pool, and returns its result.
+        The tasks are executed concurrently, in the order required by the resources they
+        declare, with at most max_workers tasks at the same time.
         """
         # IMPORTANT!! Nothing has to be dependent on this code as the sequential execution needs to keep working
-        self.api_client.semaphore = asyncio.Semaphore(self.api_client.semaphore_limit)
         # To solve race conditions
-        task_pool = copy(self.task_pool)
-        self.task_pool.clear()
-        results = await asyncio.gather(*task_pool)
+        results = await self.task_scheduler.run(self.max_workers, profile=self.profile)
         if self.ending_tasks:
             await asyncio.gather(*self.ending_tasks.values())
         self.clear()
@@ -84,57 +172,80 @@ class AutoAsyncExecutionPool:
         kwargs: Optional[dict] = None,
         async_group: Optional[str] = None,
         name: Optional[str] = None,
+        reads: Optional[Iterable[Hashable]] = None,
+        writes: Optional[Iterable[Hashable]] = None,
     ) -> Union[Any, Coroutine]:
         """
         This function adds the function to the task pool, and executes it if the sequential execution is set to True.
+        The tasks that declare the resources they read and write only wait for the tasks
+        of the pool they depend on, the rest wait for the whole pool.
         """
         if args is None:
             args = ()
         if kwargs is None:
             kwargs = {}
+        name = func.__name__ if not name else name
+        declared = reads is not None or writes is not None
+        labels = {}
+        if "order" in kwargs:
+            labels["order"] = kwargs["order"]
+        app = getattr(func_self, "_app", None)
+        if app is not None:
+            labels["menu_path"] = app["name"]
 
-        async def separate_final_execute(return_result: Optional[Any] = None):
+        needs_result = not async_group
+        # The ending tasks can depend on anything in the pool
+        run_dependencies_only = (
+            declared and needs_result and not self.sequential and not self.ending_tasks
+        )
+
+        async def separate_final_execute():
             """
             This function executes the last task in the task pool, and returns its result.
             """
-            if len(self.task_pool) > 0:
-                await self.execute_tasks()
-            self.task_pool.append(func(func_self, *args, **kwargs))
-            task_result = (await self.execute_tasks())[0]
-            if return_result is not None:
-                return_result.append(task_result)
+            if run_dependencies_only:
+                task = self.task_scheduler.add(
+                    func(func_self, *args, **kwargs), name, reads, writes, labels
+                )
+                results = await self.task_scheduler.run(
+                    self.max_workers, targets=[task], profile=self.profile
+                )
+                task_result = results[-1]
+            else:
+                if len(self.task_scheduler) > 0:
+                    await self.execute_tasks()
+                self.task_scheduler.add(
+                    func(func_self, *args, **kwargs), name, labels=labels
+                )
+                task_result = (await self.execute_tasks())[0]
             return task_result
 
-        needs_result = not async_group
         conflict = needs_result or (
-            self._current_groups and async_group not in self._current_groups
+            not declared
+            and self._current_groups
+            and async_group not in self._current_groups
         )
 
         if self.sequential or conflict:
             if IN_BROWSER or self.ACTIONS_TEST:
                 # If in pyodide return the coroutine
                 return separate_final_execute()
-            # Try to retrieve the event loop, if it is not possible, create a new one
-            try:
-                # If the function is called from a coroutine, it will raise a RuntimeError
-                # This is a workaround to avoid it
-                asyncio.get_running_loop()
-                return_result = []
-                thread = Thread(
-                    target=lambda result: asyncio.run(separate_final_execute(result)),
-                    args=(return_result,),
-                )
-                thread.start()
-                thread.join()
-                return return_result[0] if return_result else None
-            except RuntimeError:
-                # If the function is called from the main synchronous thread, it will raise a RuntimeError
-                return asyncio.run(separate_final_execute())
+            if current_thread() is not self._loop_thread:
+                # Works the same from synchronous code and from a running loop (Jupyter),
+                # as the caller only waits for the background loop
+                return self._run_in_background_loop(separate_final_execute())
+
+            # Called from a task of the background loop, which can not wait for itself.
+            # It runs as another task of the loop, sharing its HTTP session and limiters,
+            # and the caller awaits it
+            return asyncio.ensure_future(separate_final_execute())
 
         # Copy the current context to make the execution independent and avoid the modification of the original context
-        self.task_pool.append(func(copy(func_self), *args, **kwargs))
+        self.task_scheduler.add(
+            func(copy(func_self), *args, **kwargs), name, reads, writes, labels
+        )
         self._current_groups.append(async_group)
-        logger.info(f"{func.__name__ if not name else name} added to the task pool")
+        logger.info(f"{name} added to the task pool")
 
         if IN_BROWSER or self.ACTIONS_TEST:
             # If in pyodide return the coroutine
@@ -145,6 +256,8 @@ def decorate_class_to_auto_async(cls: type, async_pool: AutoAsyncExecutionPool)
     """
     This function returns the class with all the methods decorated to be handled by the AutoAsyncExecutionPool.
     If the class has a method called _check_before_async_execution, it will be called before the async execution.
+    If the class has a method called _get_task_resources, it will be called to get the resources that each call
+    reads and writes.
     If in PYODIDE execution all the methods will return a coroutine.
     """
 
@@ -161,6 +274,9 @@ def decorate_class_to_auto_async(cls: type, async_pool: AutoAsyncExecutionPool)
                     self._check_before_async_execution(
                         async_pool, func, *args, **kwargs
                     )
+                reads, writes = None, None
+                if hasattr(self, "_get_task_resources"):
+                    reads, writes = self._get_task_resources(func, *args, **kwargs)
                 return async_pool.auto_async_func_call(
                     func=func,
                     args=args,
@@ -169,6 +285,8 @@ def decorate_class_to_auto_async(cls: type, async_pool: AutoAsyncExecutionPool)
                     async_group=func.async_group
                     if hasattr(func, "async_group")
                     else None,
+                    reads=reads,
+                    writes=writes,
                 )
             result = func(self, *args, **kwargs)
             if IN_BROWSER or async_pool.ACTIONS_TEST:
@@ -185,10 +303,75 @@ def decorate_class_to_auto_async(cls: type, async_pool: AutoAsyncExecutionPool)
     for attr_name in dir(cls):
         attr = getattr(cls, attr_name)
         if (
-            callable(attr) and
-            not attr_name.startswith("_") and
-            not hasattr(attr, "__dataclass_fields__")
+            callable(attr)
+            and not attr_name.startswith("_")
+            and not hasattr(attr, "__dataclass_fields__")
         ):
             setattr(new_class, attr_name, decorate_to_auto_async(attr))
 
     return new_class
+
+
+# The coroutines created while a synchronous method of an async group is executed,
+# they are awaited when the coroutine returned by that method is awaited
+_created_coroutines: ContextVar[Optional[list]] = ContextVar(
+    "created_coroutines", default=None
+)
+
+
+def decorate_class_to_await_directly(cls: type) -> Type:
+    """
+    This function returns the class with the methods of the async groups decorated to be awaited by the caller,
+    as the AsyncClient does.
+    The coroutines are created with a copy of the object, like the tasks of the AutoAsyncExecutionPool, so the
+    context in use when they are called (bentobox, tabs group, modal...) is kept until they are awaited.
+    The synchronous methods create several components calling other methods of the object, they return a
+    coroutine that awaits all of those components and returns the result of the method.
+    """
+
+    def decorate_to_await_directly(func: Callable):
+        if inspect.iscoroutinefunction(func):
+
+            def wrapper(self, *args, **kwargs):
+                coroutine = func(copy(self), *args, **kwargs)
+                created = _created_coroutines.get()
+                if created is not None:
+                    created.append(coroutine)
+                return coroutine
+
+            return wrapper
+
+        def wrapper(self, *args, **kwargs):
+            if _created_coroutines.get() is not None:
+                # The method that called this one awaits the components
+                return func(self, *args, **kwargs)
+            created = []
+            token = _created_coroutines.set(created)
+            try:
+                result = func(self, *args, **kwargs)
+            except BaseException:
+                for coroutine in created:
+                    coroutine.close()
+                raise
+            finally:
+                _created_coroutines.reset(token)
+
+            async def await_created():
+                await asyncio.gather(*created)
+                return result
+
+            return await_created()
+
+        return wrapper
+
+    new_class = type(cls.__name__, (cls,), {})
+    for attr_name in dir(cls):
+        attr = getattr(cls, attr_name)
+        if (
+            callable(attr)
+            and not attr_name.startswith("_")
+            and hasattr(attr, "async_group")
+        ):
+            setattr(new_class, attr_name, decorate_to_await_directly(attr))
+
+    return new_class
@@ -0,0 +1,326 @@
+from typing import Dict, Optional, Union, Any
+
+from shimoku.async_execution_pool import AutoAsyncExecutionPool
+
+from shimoku.api.client import ApiClient
+from shimoku.api.retry import RetryPolicy
+from shimoku.api.transport import Transport
+from shimoku.api.rate_limit import RateLimiter
+from shimoku.api.cache_policy import CachePolicy
+from shimoku.api.user_access_classes.universes_layer import UniversesLayer, Universe
+from shimoku.api.user_access_classes.businesses_layer import WorkspacesLayer, Business
+from shimoku.api.user_access_classes.activity_templates_layer import (
+    ActivityTemplatesLayer,
+)
+from shimoku.api.user_access_classes.dashboards_layer import BoardsLayer, Dashboard
+from shimoku.api.user_access_classes.apps_layer import MenuPathsLayer, App
+from shimoku.api.user_access_classes.reports_layer import ComponentsLayer
+from shimoku.api.user_access_classes.data_sets_layer import DataSetsLayer
+from shimoku.api.user_access_classes.files_layer import FilesLayer
+from shimoku.api.user_access_classes.activities_layer import ActivitiesLayer
+from shimoku.api.user_access_classes.actions_layer import ActionsLayer
+from shimoku.plt.plt_layer import PlotLayer
+
+from shimoku.ai.ai_layer import AILayer
+
+from shimoku.utils import EventType
+
+from shimoku.exceptions import WorkspaceError
+
+import logging
+from shimoku.execution_logger import log_error, configure_logging
+
+logger = logging.getLogger(__name__)
+
+
+class BaseClient:
+    """
+    Connection to the API and context in use (workspace, board and menu path), shared
+    by the synchronous Client and the AsyncClient. The clients only differ in how the
+    methods of the layers are executed.
+    """
+
+    def __init__(
+        self,
+        universe_id: str = "local",
+        environment: str = "production",
+        access_token: Optional[str] = None,
+        config: Optional[Dict] = None,
+        verbosity: str = None,
+        local_port: int = 8000,
+        retry_attempts: int = 5,
+        retry_policy: Optional[RetryPolicy] = None,
+        transport: Optional[Transport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.playground: bool = universe_id == "local" and not access_token
+        if self.playground:
+            access_token = "local"
+        if universe_id == "local" and not self.playground:
+            log_error(
+                logger,
+                "Local universe can only be used in playground mode.",
+                AttributeError,
+            )
+        self.access_token = access_token
+        self.environment = environment
+        self._access_token = access_token
+        self.universe_id = universe_id
+        self.workspace_id = None
+        self.board_id = None
+        self.menu_path_id = None
+        if not config:
+            config = {}
+
+        self.server_host = "127.0.0.1"
+        self.local_port = local_port
+
+        self.configure_logging = configure_logging
+        if verbosity:
+            self.configure_logging(verbosity)
+
+        if access_token and access_token != "":
+            config = {**config, "access_token": access_token}
+
+        self._api_client = ApiClient(
+            config=config,
+            environment=environment,
+            playground=self.playground,
+            server_host=self.server_host,
+            server_port=local_port,
+            retry_attempts=retry_attempts,
+            retry_policy=retry_policy,
+            transport=transport,
+            rate_limiter=rate_limiter,
+        )
+        self._universe_object = Universe(self._api_client, uuid=universe_id)
+        self._business_object: Optional[Business] = None
+        self._app_object: Optional[App] = None
+        self._dashboard_object: Optional[Dashboard] = None
+
+        # Also keeps the tasks that have to be executed at the end, e.g. the update of
+        # the containers
+        self._async_pool = AutoAsyncExecutionPool(api_client=self._api_client)
+
+    def _create_layer(self, layer_class: type, *args) -> Any:
+        """Create the object of a layer, the clients decide how its methods are executed
+        :param layer_class: the class of the layer
+        :param args: the arguments of the layer
+        """
+        return layer_class(*args)
+
+    def _create_layers(self):
+        """Create the layers that give access to the API"""
+        self.universes = self._create_layer(UniversesLayer, self._api_client)
+        self.workspaces = self._create_layer(WorkspacesLayer, self._universe_object)
+        self.activity_templates = self._create_layer(
+            ActivityTemplatesLayer, self._universe_object
+        )
+        self.actions = self._create_layer(ActionsLayer, self._universe_object)
+        self.boards = self._create_layer(BoardsLayer, self._business_object)
+        self.menu_paths = self._create_layer(MenuPathsLayer, self._business_object)
+        self.components = self._create_layer(ComponentsLayer, self._app_object)
+        self.data = self._create_layer(DataSetsLayer, self._app_object)
+        self.io = self._create_layer(FilesLayer, self._app_object)
+        self.activities = self._create_layer(ActivitiesLayer, self._app_object)
+        self.ai = self._create_layer(
+            AILayer, self.access_token, self._universe_object, self._app_object
+        )
+
+        self._reuse_data_sets = False
+        self._shared_dfs = {}
+        self._shared_custom_data = {}
+        self.plt = self._create_layer(
+            PlotLayer, self._async_pool, self._app_object, self._reuse_data_sets
+        )
+
+        self._async_pool.current_app = self._app_object
+        self._async_pool.universe = self._universe_object
+
+    @property
+    def html_components(self):
+        """The html components of the catalog, imported the first time they are used"""
+        import shimoku_components_catalog.html_components
+
+        return shimoku_components_catalog.html_components
+
+    def _init_app_layers(self):
+        """Point the layers of the menu path level to the app in use"""
+        self.components.__init__(self._app_object)
+        self.activities.__init__(self._app_object)
+        self.plt.__init__(self._async_pool, self._app_object, self._reuse_data_sets)
+        self.data.__init__(self._app_object)
+        self.io.__init__(self._app_object)
+        self.ai.__init__(self.access_token, self._universe_object, self._app_object)
+
+    async def _change_workspace(self, uuid: Optional[str], name: Optional[str]):
+        """Change the workspace in use, leaving the board and the menu path
+        :param uuid: Workspace uuid
+        :param name: Workspace name
+        """
+        if self._business_object:
+            self._business_object.currently_in_use = False
+        business: Optional[Business] = await self._universe_object.get_business(
+            uuid=uuid, name=name
+        )
+        if not business:
+            log_error(
+                logger,
+                f"Workspace {name if name else uuid} not found.",
+                WorkspaceError,
+            )
+        self._business_object = business
+        self._business_object.currently_in_use = True
+        self.workspace_id = self._business_object["id"]
+
+        if self._app_object:
+            self.plt.raise_if_cant_change_path()
+            self._app_object.currently_in_use = False
+        self._app_object = None
+        self.menu_path_id = None
+        if self._dashboard_object:
+            self._dashboard_object.currently_in_use = False
+        self._dashboard_object = None
+        self.board_id = None
+
+        self.boards.__init__(self._business_object)
+        self.menu_paths.__init__(self._business_object)
+        self._init_app_layers()
+
+    def _leave_app(self):
+        """Stop using the current app"""
+        data_names = self.plt.get_shared_data_names()
+        if data_names:
+            logger.info(
+                f"Shared data entries will no longer be available: {data_names}, set them again if needed."
+            )
+        self.plt.clear_context()
+        self._app_object.currently_in_use = False
+        self._app_object = None
+        self.menu_path_id = None
+
+    async def _change_board(self, name: str):
+        """Change the board in use
+        :param name: board name
+        """
+        self._dashboard_object = await self._business_object.get_dashboard(name=name)
+        self._dashboard_object.currently_in_use = True
+        self.board_id = self._dashboard_object["id"]
+
+    def _leave_board(self):
+        """Stop using the current board"""
+        self._dashboard_object.currently_in_use = False
+        self._dashboard_object = None
+        self.board_id = None
+
+    async def _change_app(self, menu_path: str, dont_add_to_dashboard: bool):
+        """Change app in use for the following calls.
+        :param menu_path: Menu path of the app
+        :param dont_add_to_dashboard: Whether to add the menu path to the dashboard
+        """
+        if self._app_object:
+            self._app_object.currently_in_use = False
+
+        app: App = await self._business_object.get_app(name=menu_path)
+        self._app_object = app
+        app.currently_in_use = True
+        self._init_app_layers()
+
+        self.menu_path_id = self._app_object["id"]
+
+        if dont_add_to_dashboard:
+            return
+
+        if not self._dashboard_object:
+            self._dashboard_object = await self._business_object.get_dashboard(
+                name="Default Name"
+            )
+
+        if self._app_object["id"] not in await self._dashboard_object.list_app_ids():
+            await self._dashboard_object.insert_app(self._app_object)
+
+        self.menu_path_id = self._app_object["id"]
+
+    async def _create_business_contents_updated_event(self):
+        """Create a business contents updated event."""
+        if not self._business_object:
+            return
+        await self._business_object.create_event(
+            EventType.BUSINESS_CONTENTS_UPDATED, {}, self._business_object["id"]
+        )
+        self.plt.clear_events_for_components()
+        logger.info("Business contents updated event created")
+
+    def enable_caching(self):
+        """Enable caching."""
+        self._api_client.cache_enabled = True
+
+    def disable_caching(self):
+        """Disable caching."""
+        self._api_client.cache_enabled = False
+
+    def set_cache_policy(
+        self, policy: Optional[CachePolicy], resource_plural: Optional[str] = None
+    ):
+        """Set the eviction and staleness of the cached resources, e.g.
+        CachePolicy(ttl=300, max_entries=1000) refreshes the listings older than five
+        minutes and keeps at most a thousand resources of each kind per parent.
+        :param policy: the policy, None to remove it
+        :param resource_plural: the resources it applies to, e.g. 'reports' or
+            'dataSets', by default all the ones without their own policy
+        """
+        if policy is None:
+            self._api_client.cache_policies.pop(resource_plural, None)
+        else:
+            self._api_client.cache_policies[resource_plural] = policy
+
+    def reuse_data_sets(self):
+        """Reuse data sets from the api."""
+        self._reuse_data_sets = True
+        if self._app_object:
+            self.plt.reuse_data_sets = True
+
+    def update_data_sets(self):
+        """Update data sets in the api."""
+        self._reuse_data_sets = False
+        if self._app_object:
+            self.plt.reuse_data_sets = False
+
+    def get_api_calls_counter(self):
+        """Get the number of api calls made."""
+        return self._api_client.call_counter
+
+    def get_coalesced_api_calls_counter(self):
+        """Get the number of api calls saved by sharing identical concurrent GETs."""
+        return self._api_client.coalesced_calls_counter
+
+    def get_avoided_patches_counter(self):
+        """Get the number of updates not sent because the params had not changed."""
+        return self._api_client.avoided_patches_counter
+
+    def get_concurrency_stats(self) -> Dict[str, Dict]:
+        """Get the current concurrency window and statistics of each class of endpoints."""
+        return self._api_client.get_concurrency_stats()
+
+    def get_rate_limit_stats(self) -> Optional[Dict]:
+        """Get the configuration and the waits of the rate limiter, None if there is none."""
+        rate_limiter = self._api_client.rate_limiter
+        return rate_limiter.get_stats() if rate_limiter is not None else None
+
+    def get_api_metrics(self, output_format: Optional[str] = None) -> Union[Dict, str]:
+        """Get the latency, throughput, retries and pages of the api calls made, per
+        method and endpoint template.
+        :param output_format: None for a dict, 'json' or 'prometheus' for a text export
+        """
+        metrics = self._api_client.metrics
+        if output_format is None:
+            return metrics.to_dict()
+        if output_format == "json":
+            return metrics.to_json()
+        if output_format == "prometheus":
+            return metrics.to_prometheus()
+        log_error(
+            logger,
+            f"Unknown metrics format '{output_format}', use 'json' or 'prometheus'",
+            ValueError,
+        )
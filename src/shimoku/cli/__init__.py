@@ -1,12 +1,12 @@
 import argparse
 import subprocess
+import sys
 from abc import ABC
+from importlib import import_module
 from typing import Optional
 import inspect
 import asyncio
 
-from aiohttp.client_exceptions import ClientConnectorError
-
 from prompt_toolkit import PromptSession
 from prompt_toolkit.completion import Completer, Completion
 
@@ -181,6 +181,8 @@ class CLIParser(ABC):
 
         self.command_names: list[str] = []
         self.commands: dict[str, CLIParser] = {}
+        # name: (description, 'module:function that adds the command to a parser')
+        self.lazy_commands: dict[str, tuple[str, str]] = {}
         self.arguments: list[CLIFuncParam] = []
         self.argument_groups = {}
         self.argument_groups_var_names = {}
@@ -345,6 +347,42 @@ class CLIParser(ABC):
         self.command_names.append(command.name)
         return command
 
+    def add_lazy_command(self, name: str, description: str, loader: str):
+        """Register a command whose module is only imported when the command is used
+        :param name: the name of the command
+        :param description: the description shown in the help before it is imported
+        :param loader: 'module:function', the function adds the command to a parser
+        """
+        if name in self.command_names or name in self.lazy_commands:
+            raise ValueError(f"The command {name} is already registered")
+        self.lazy_commands[name] = (description, loader)
+
+    def load_lazy_commands(self, argv: Optional[list[str]] = None):
+        """Import the modules of the lazy commands. With argv only the command selected
+        is imported, the others are added without arguments so that they are listed in
+        the help. Without argv all the commands are imported, e.g. for the interactive
+        mode.
+        :param argv: the arguments of the command line that follow this parser
+        """
+        selected = None
+        if argv is not None:
+            selected = next((arg for arg in argv if not arg.startswith("-")), None)
+        for name, (description, loader) in self.lazy_commands.items():
+            if argv is None or name == selected:
+                module_name, function_name = loader.split(":")
+                getattr(import_module(module_name), function_name)(self)
+            else:
+                self.subparsers.add_parser(
+                    name, description=description, help=description
+                )
+        self.lazy_commands = {}
+
+        if argv is None:
+            for command in self.commands.values():
+                command.load_lazy_commands()
+        elif selected in self.commands:
+            self.commands[selected].load_lazy_commands(argv[argv.index(selected) + 1 :])
+
     def add_argument(self, argument: CLIFuncParam):
         def add_prefix(name: str):
             return ("-" if len(name) == 1 else "--") + name
@@ -404,8 +442,16 @@ class CLIParser(ABC):
 
     async def parse_args(self):
         # argcomplete.autocomplete(self.parser)
+        argv = sys.argv[1:]
+        # The interactive mode can run any command
+        interactive = any(
+            arg == "--interactive"
+            or (arg[:1] == "-" and arg[1:2] != "-" and "i" in arg)
+            for arg in argv
+        )
+        self.load_lazy_commands(None if interactive else argv)
         try:
-            args = self.parser.parse_args()
+            args = self.parser.parse_args(argv)
         except SystemExit:
             return
         if hasattr(args, "interactive") and args.interactive:
@@ -428,6 +474,9 @@ class CLIParser(ABC):
         return commands_and_options
 
     async def parse_args_interactive(self):
+        # Only imported by the commands that use the API otherwise
+        from aiohttp.client_exceptions import ClientConnectorError
+
         # Dictionary to store user-defined variables
         variables = {}
 
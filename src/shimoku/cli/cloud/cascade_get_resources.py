@@ -1,7 +1,6 @@
 from typing import Optional
 from os import getenv
 from dataclasses import dataclass
-import asyncio
 from shimoku.cli.utils import get_profile_config
 from shimoku.exceptions import (
     WorkspaceError,
@@ -113,9 +112,6 @@ class ResourceGetter:
             server_port=self.init_opts.local_port,
             retry_attempts=1,
         )
-        api_client.semaphore = asyncio.Semaphore(
-            api_client.semaphore_limit
-        )  # need async for semaphore
         return api_client
 
     async def get_universes_layer(self) -> UniversesLayer:
@@ -126,7 +122,6 @@ class ResourceGetter:
         if self.universe:
             return self.universe
         api_client: ApiClient = await self.get_api_client()
-        api_client.semaphore = asyncio.Semaphore(api_client.semaphore_limit)
         return Universe(api_client, self.init_opts.universe_id)
 
     async def get_actions_layer(self) -> ActionsLayer:
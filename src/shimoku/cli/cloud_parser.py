@@ -1,9 +1,3 @@
-from shimoku.cli.cloud.list import add_list_parser
-from shimoku.cli.cloud.create import add_create_parser
-from shimoku.cli.cloud.delete import add_delete_parser
-from shimoku.cli.cloud.get import add_get_parser
-from shimoku.cli.cloud.update import add_update_parser
-from shimoku.cli.cloud.execute import add_execute_parser
 from shimoku.cli import CLIParser
 from typing import Optional
 
@@ -23,12 +17,20 @@ def add_cloud_parser(parser: Optional[CLIParser] = None):
     else:
         cloud_parser = CLIParser(**params)
 
-    add_list_parser(cloud_parser)
-    add_get_parser(cloud_parser)
-    add_create_parser(cloud_parser)
-    add_delete_parser(cloud_parser)
-    add_update_parser(cloud_parser)
-    add_execute_parser(cloud_parser)
+    # The modules of the commands are imported only when they are used
+    for name, description in [
+        ("list", "Commands to list resources"),
+        ("get", "Commands to get resources"),
+        ("create", "Commands to create resources"),
+        ("delete", "Commands to delete resources"),
+        ("update", "Commands to update existing resources"),
+        ("execute", "Commands to execute activities"),
+    ]:
+        cloud_parser.add_lazy_command(
+            name=name,
+            description=description,
+            loader=f"shimoku.cli.cloud.{name}:add_{name}_parser",
+        )
 
     return cloud_parser
 
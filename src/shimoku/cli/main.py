@@ -1,13 +1,9 @@
-from shimoku.cli.configuration import add_configuration_parser
-from shimoku.cli.cloud_parser import add_cloud_parser
-from shimoku.cli.playground import add_playground_parser
-from shimoku.cli.persistence import add_persistence_parser
-from shimoku.cli.listen import add_listener_parser
 from shimoku.cli import CLIParser, CLIFuncParam
 
 from shimoku.execution_logger import configure_logging
 
 import asyncio
+import sys
 
 main_parser = CLIParser(
     arguments=[
@@ -30,17 +26,50 @@ main_parser = CLIParser(
     ]
 )
 
-add_configuration_parser(main_parser)
-add_playground_parser(main_parser)
-add_cloud_parser(main_parser)
-add_persistence_parser(main_parser)
-add_listener_parser(main_parser)
+# The modules of the commands are imported only when they are used
+main_parser.add_lazy_command(
+    name="config",
+    description="Commands to configure the SDK access",
+    loader="shimoku.cli.configuration:add_configuration_parser",
+)
+main_parser.add_lazy_command(
+    name="playground",
+    description="Commands to interact with the playground",
+    loader="shimoku.cli.playground:add_playground_parser",
+)
+main_parser.add_lazy_command(
+    name="cloud",
+    description="Commands to interact with the cloud",
+    loader="shimoku.cli.cloud_parser:add_cloud_parser",
+)
+main_parser.add_lazy_command(
+    name="persist",
+    description="Commands to persist the contents of the current database",
+    loader="shimoku.cli.persistence:add_persistence_parser",
+)
+main_parser.add_lazy_command(
+    name="listen",
+    description="Commands to execute continuously a file by listening to changes",
+    loader="shimoku.cli.listen:add_listener_parser",
+)
+
+
+async def run_command():
+    """Run the selected command and close the HTTP sessions it opened"""
+    try:
+        await main_parser.parse_args()
+    finally:
+        # Only the commands that use the API import the client
+        if "shimoku.api.client" in sys.modules:
+            from shimoku.api.client import ApiClient
+
+            await ApiClient.close_all()
 
 
 def main():
     configure_logging("INFO")
     try:
-        asyncio.run(main_parser.parse_args())
+        asyncio.run(run_command())
     except KeyboardInterrupt:
         print("Interrupted by user")
     except asyncio.CancelledError:
@@ -0,0 +1,356 @@
+import json
+from typing import Any, Dict, List, Optional, Union
+
+from shimoku.base_client import BaseClient
+from shimoku.async_execution_pool import decorate_class_to_auto_async
+from shimoku.task_profile import summarize_tasks, to_chrome_trace
+from shimoku.api.retry import RetryPolicy
+from shimoku.api.transport import Transport
+from shimoku.api.rate_limit import RateLimiter
+from shimoku.api.user_access_classes.generated_headers.UniversesLayerHeader import (
+    UniversesLayerHeader,
+)
+from shimoku.api.user_access_classes.generated_headers.WorkspacesLayerHeader import (
+    WorkspacesLayerHeader,
+)
+from shimoku.api.user_access_classes.generated_headers.ActivityTemplatesLayerHeader import (
+    ActivityTemplatesLayerHeader,
+)
+from shimoku.api.user_access_classes.generated_headers.BoardsLayerHeader import (
+    BoardsLayerHeader,
+)
+from shimoku.api.user_access_classes.generated_headers.MenuPathsLayerHeader import (
+    MenuPathsLayerHeader,
+)
+from shimoku.api.user_access_classes.generated_headers.ComponentsLayerHeader import (
+    ComponentsLayerHeader,
+)
+from shimoku.api.user_access_classes.generated_headers.DataSetsLayerHeader import (
+    DataSetsLayerHeader,
+)
+from shimoku.api.user_access_classes.generated_headers.FilesLayerHeader import (
+    FilesLayerHeader,
+)
+from shimoku.api.user_access_classes.generated_headers.ActivitiesLayerHeader import (
+    ActivitiesLayerHeader,
+)
+from shimoku.api.user_access_classes.generated_headers.ActionsLayerHeader import (
+    ActionsLayerHeader,
+)
+from shimoku.plt.generated_headers.PlotLayerHeader import PlotLayerHeader
+from shimoku.plt.utils import create_normalized_name
+from shimoku.ai.generated_headers.AILayerHeader import AILayerHeader
+
+from shimoku.utils import IN_BROWSER
+
+from shimoku.exceptions import BoardError
+
+import logging
+from shimoku.execution_logger import log_error, logging_before_and_after
+
+logger = logging.getLogger(__name__)
+
+
+class Client(BaseClient):
+    universes: UniversesLayerHeader
+    workspaces: WorkspacesLayerHeader
+    activity_templates: ActivityTemplatesLayerHeader
+    actions: ActionsLayerHeader
+    boards: BoardsLayerHeader
+    menu_paths: MenuPathsLayerHeader
+    components: ComponentsLayerHeader
+    data: DataSetsLayerHeader
+    io: FilesLayerHeader
+    activities: ActivitiesLayerHeader
+    ai: AILayerHeader
+    plt: PlotLayerHeader
+
+    def __init__(
+        self,
+        universe_id: str = "local",
+        environment: str = "production",
+        access_token: Optional[str] = None,
+        config: Optional[Dict] = None,
+        verbosity: str = None,
+        async_execution: bool = False,
+        local_port: int = 8000,
+        retry_attempts: int = 5,
+        retry_policy: Optional[RetryPolicy] = None,
+        transport: Optional[Transport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        super().__init__(
+            universe_id=universe_id,
+            environment=environment,
+            access_token=access_token,
+            config=config,
+            verbosity=verbosity,
+            local_port=local_port,
+            retry_attempts=retry_attempts,
+            retry_policy=retry_policy,
+            transport=transport,
+            rate_limiter=rate_limiter,
+        )
+
+        if async_execution:
+            self.activate_async_execution()
+        else:
+            self.activate_sequential_execution()
+
+        self._create_layers()
+
+    def _create_layer(self, layer_class: type, *args) -> Any:
+        return decorate_class_to_auto_async(layer_class, self._async_pool)(*args)
+
+    def set_workspace(
+        self, uuid: Optional[str] = None, name: Optional[str] = None
+    ) -> None:
+        """Set workspace id for the client.
+        :param uuid: Workspace uuid
+        :param name: Workspace name
+        """
+        if self._api_client.playground:
+            uuid, name = "local", None
+
+        @logging_before_and_after(logging_level=logger.info, name="set_workspace")
+        async def a_set_workspace(_self):
+            await self._change_workspace(uuid, name)
+
+        return self._async_pool.auto_async_func_call(
+            name="set_workspace",
+            func_self=self,
+            func=a_set_workspace,
+        )
+
+    def pop_out_of_menu_path(self) -> None:
+        """Pop out of the menu path."""
+
+        @logging_before_and_after(
+            logging_level=logger.info, name="pop_out_of_menu_path"
+        )
+        async def a_pop_out_of_menu_path(_self):
+            self._leave_app()
+
+        return self._async_pool.auto_async_func_call(
+            name="pop_out_of_menu_path",
+            func_self=self,
+            func=a_pop_out_of_menu_path,
+        )
+
+    def set_board(self, name: str) -> None:
+        """Set the board in use for the following apps being called.
+        :param name: board name
+        """
+        if not self._business_object:
+            log_error(
+                logger,
+                "Workspace not set. Please use set_workspace() method first.",
+                AttributeError,
+            )
+        if self._app_object:
+            self.pop_out_of_menu_path()
+        if self._dashboard_object:
+            self._dashboard_object.currently_in_use = False
+
+        @logging_before_and_after(logging_level=logger.info, name="set_board")
+        async def a_set_board(_self):
+            await self._change_board(name)
+
+        return self._async_pool.auto_async_func_call(
+            name="set_board",
+            func_self=self,
+            func=a_set_board,
+        )
+
+    def pop_out_of_board(self) -> None:
+        """Pop out of the dashboard."""
+        if not self._business_object:
+            log_error(
+                logger,
+                "Workspace not set. Please use set_workspace() method first.",
+                AttributeError,
+            )
+        if not self._dashboard_object:
+            log_error(
+                logger,
+                "Board not set. Please use set_board() method first.",
+                BoardError,
+            )
+        if self._app_object:
+            self.pop_out_of_menu_path()
+
+        @logging_before_and_after(logging_level=logger.info, name="pop_out_of_board")
+        async def a_pop_out_of_board(_self):
+            self._leave_board()
+
+        return self._async_pool.auto_async_func_call(
+            name="pop_out_of_board",
+            func_self=self,
+            func=a_pop_out_of_board,
+        )
+
+    def set_menu_path(
+        self,
+        name: str,
+        sub_path: Optional[str] = None,
+        dont_add_to_dashboard: bool = False,
+    ) -> None:
+        """Set menu path for the client.
+        :param name: Menu path
+        :param sub_path: Sub path
+        :param dont_add_to_dashboard: Whether to add the menu path to the dashboard
+        """
+        if not self._business_object:
+            log_error(
+                logger,
+                "Workspace not set. Please use set_workspace() method first.",
+                AttributeError,
+            )
+        normalized_name = create_normalized_name(name)
+        path = sub_path if sub_path else None
+        data_names = []
+        if self._app_object:
+            self.plt.raise_if_cant_change_path()
+            if self._app_object["normalizedName"] == normalized_name:
+                self.plt.change_path(path)
+                return
+            data_names = self.plt.get_shared_data_names()
+
+        @logging_before_and_after(logging_level=logger.info, name="set_menu_path")
+        async def a_set_menu_path(_self):
+            await self._change_app(name, dont_add_to_dashboard)
+            self.plt.change_path(path)
+            if data_names:
+                logger.info(
+                    f"Shared data entries will no longer be available: {data_names}, set them again if needed."
+                )
+
+        # Waits only for the pending tasks of the same menu path, the tasks of the other
+        # menu paths keep waiting in the pool
+        return self._async_pool.auto_async_func_call(
+            name="set_menu_path",
+            func_self=self,
+            func=a_set_menu_path,
+            reads=[],
+            writes=[("menu_path", normalized_name)],
+        )
+
+    def run(self) -> None:
+        """Run the tasks in the execution pool."""
+
+        async def a_run(_self):
+            self._async_pool.ending_tasks[
+                "Business_contents_updated"
+            ] = self._create_business_contents_updated_event()
+
+        return self._async_pool.auto_async_func_call(
+            name="run",
+            func_self=self,
+            func=a_run,
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        query_params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        body: Optional[dict] = None,
+    ) -> any:
+        async def a_request(_self) -> any:
+            return await self._api_client.request(
+                method=method,
+                url=url,
+                query_params=query_params,
+                headers=headers,
+                body=body,
+                to_tazawa=False,
+            )
+
+        return self._async_pool.auto_async_func_call(
+            name="request",
+            func_self=self,
+            func=a_request,
+        )
+
+    def activate_async_execution(self, max_workers: Optional[int] = None):
+        """Activate async execution of the tasks.
+        :param max_workers: maximum number of tasks executed at the same time
+        """
+        self._async_pool.sequential = False
+        if max_workers is not None:
+            self._async_pool.max_workers = max_workers
+
+    def activate_sequential_execution(self):
+        """Activate sequential execution of the tasks."""
+        self._async_pool.sequential = True
+
+    def get_task_schedule(
+        self, output_format: Optional[str] = None
+    ) -> Union[List[Dict], str]:
+        """Get the schedule of the last executions of the task pool and the tasks that
+        are still waiting, with the resources they read and write and their dependencies.
+        :param output_format: None for a list of dictionaries or 'text'
+        """
+        scheduler = self._async_pool.task_scheduler
+        if output_format is None:
+            return scheduler.explain()
+        if output_format == "text":
+            return scheduler.format_schedule()
+        log_error(
+            logger,
+            f"Unknown output format '{output_format}', use None or 'text'",
+            ValueError,
+        )
+
+    def enable_task_profiling(self):
+        """Count the api calls, requests and bytes of each task executed from now on,
+        the tasks executed before are forgotten."""
+        self._async_pool.profile = True
+        self._async_pool.task_scheduler.clear_history()
+
+    def disable_task_profiling(self):
+        """Stop counting the api calls of each task."""
+        self._async_pool.profile = False
+
+    def get_task_profile(self, top: int = 10) -> Dict:
+        """Get a summary of the tasks executed: the slowest ones, the critical path, the
+        concurrency achieved, the time waited for a free worker and, if the profiling
+        is enabled, the api calls and bytes of each task.
+        :param top: the number of slowest tasks reported
+        """
+        return summarize_tasks(self._async_pool.task_scheduler.history, top)
+
+    def export_task_trace(self, file_path: str):
+        """Write the tasks executed as a Chrome trace, it can be opened with
+        chrome://tracing or https://ui.perfetto.dev
+        :param file_path: the path of the JSON file
+        """
+        with open(file_path, "w") as trace_file:
+            json.dump(
+                to_chrome_trace(self._async_pool.task_scheduler.history), trace_file
+            )
+
+    def close(self):
+        """Close the HTTP connections and stop the event loop of the sequential execution."""
+        self._async_pool.close()
+
+    def __getattribute__(self, item):
+        """Get attribute of the client."""
+        if False and not IN_BROWSER:
+            if item in ["boards", "menu_paths"] and not self._business_object:
+                log_error(
+                    logger,
+                    "Workspace not set. Please use set_workspace() method first.",
+                    AttributeError,
+                )
+            if (
+                item in ["activities", "plt", "components", "data", "io"]
+                and not self._app_object
+            ):
+                log_error(
+                    logger,
+                    "Menu path not set. Please use set_menu_path() method first.",
+                    AttributeError,
+                )
+        return object.__getattribute__(self, item)
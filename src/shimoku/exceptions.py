@@ -2,9 +2,22 @@
 
 
 class APIError(Exception):
-    def __init__(self, text, status_code=None):
+    def __init__(self, text, status_code=None, retry_after=None):
         self.text = text
         self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(APIError):
+    def __init__(self, text, status_code=None, retry_after=None):
+        super().__init__(text, status_code, retry_after)
+
+
+class BatchUploadError(APIError):
+    def __init__(self, text, status_code=None, failed_ranges=None):
+        super().__init__(text, status_code)
+        # (start, end) of the items that were not created, the end is excluded
+        self.failed_ranges = failed_ranges or []
 
 
 class ResourceIdMissing(Exception):
@@ -131,3 +144,15 @@ class WorkspaceUserError(Exception):
     def __init__(self, text, status_code=None):
         self.text = text
         self.status_code = status_code
+
+
+class CassetteError(Exception):
+    def __init__(self, text, status_code=None):
+        self.text = text
+        self.status_code = status_code
+
+
+class DependencyFailedError(Exception):
+    def __init__(self, text, status_code=None):
+        self.text = text
+        self.status_code = status_code
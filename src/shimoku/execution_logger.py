@@ -1,9 +1,15 @@
+import atexit
+import json
 import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
 from sys import stdout
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple, Dict, Any, List
 from io import TextIOWrapper
 from functools import wraps
-from inspect import stack, isclass
+from inspect import isfunction
+from contextvars import ContextVar, Token
 import asyncio
 from time import perf_counter
 from abc import ABC
@@ -12,28 +18,28 @@ from shimoku.actions_execution.front_connection import global_front_end_connecti
 logger = logging.getLogger(__name__)
 
 
-# Got this code from https://code.activestate.com/recipes/412603-stack-based-indentation-of-formatted-logging/
-class IndentFormatter(logging.Formatter):
-    """Formatter that adds indentation to logging messages based on the stack."""
+# Depth of the logged calls being executed, each asyncio task inherits the depth of
+# the call that created it and changes its own copy
+_call_depth: ContextVar[int] = ContextVar("call_depth", default=0)
+
 
-    def __init__(self, fmt=None, datefmt=None):
-        logging.Formatter.__init__(self, fmt, datefmt)
-        self.baseline = len(stack())
+class IndentFormatter(logging.Formatter):
+    """Formatter that adds indentation to logging messages based on the depth of the
+    logged calls."""
 
     def format(self, rec):
         """Format the specified record as text."""
-        _stack = stack()
-        # we eliminate the unnecessary indents
+        # The depth is stored in the records of the logged calls, the rest are
+        # formatted where they are created
+        depth = getattr(rec, "call_depth", None)
+        if depth is None:
+            depth = _call_depth.get()
         arrow = (
             "<- "
             if "Finished" in rec.msg
             else ("-> " if "Starting" in rec.msg else "| ")
         )
-        rec.indent = (
-            (" " if rec.levelname == "INFO" else "")
-            + "｜ " * (len(_stack) - self.baseline - 5)
-            + arrow
-        )
+        rec.indent = (" " if rec.levelname == "INFO" else "") + "｜ " * depth + arrow
         out = logging.Formatter.format(self, rec)
         del rec.indent
         return out
@@ -47,6 +53,40 @@ def log_error(logger, message, errorFunction):
     raise errorFunction(message)
 
 
+def _log_before_call(
+    logging_level: Callable, func_name: str, args: tuple, kwargs: dict
+) -> Tuple[float, str, Token]:
+    """Logs before the execution of a function and enters one level deeper."""
+    enabled_for_debug = logging.root.isEnabledFor(logging.DEBUG)
+    underlined_text = "\033[4m" + func_name + "\033[0m"
+    depth = _call_depth.get()
+    logging_level(
+        f"Starting execution: {underlined_text}"
+        + (f" with args: {args}, kwargs: {kwargs}" if enabled_for_debug else ""),
+        extra={"call_depth": depth},
+    )
+    return perf_counter(), underlined_text, _call_depth.set(depth + 1)
+
+
+def _log_after_call(
+    logging_level: Callable,
+    initial_time: float,
+    underlined_text: str,
+    depth_token: Token,
+    failed: bool = False,
+):
+    """Leaves the level of the function and logs after its execution, a failed
+    execution is not logged."""
+    _call_depth.reset(depth_token)
+    if failed:
+        return
+    time_spent = 1000 * (perf_counter() - initial_time)
+    logging_level(
+        f"Finished execution: {underlined_text}, elapsed time: {time_spent:.2f} ms",
+        extra={"call_depth": _call_depth.get()},
+    )
+
+
 def logging_before_and_after(
     logging_level: Callable, name: Optional[str] = None
 ) -> Callable:
@@ -55,62 +95,325 @@ def logging_before_and_after(
     def decorator(func: Callable) -> Callable:
         def before_call(*args, **kwargs):
             """Logs before the execution of the function."""
-            enabled_for_debug = logging.root.isEnabledFor(logging.DEBUG)
             func_name = name
             if func_name is None:
                 func_name = (
-                    func.__name__ if not enabled_for_debug else func.__qualname__
+                    func.__name__
+                    if not logging.root.isEnabledFor(logging.DEBUG)
+                    else func.__qualname__
                 )
             if "logging_func_name" in kwargs:
                 func_name = kwargs.pop("logging_func_name")
-
-            underlined_text = "\033[4m" + func_name + "\033[0m"
-            logging_level(
-                f"Starting execution: {underlined_text}"
-                + (f" with args: {args}, kwargs: {kwargs}" if enabled_for_debug else "")
-            )
-            initial_time = perf_counter()
-            return initial_time, underlined_text
-
-        def after_call(initial_time, underlined_text):
-            """Logs after the execution of the function."""
-            time_spent = 1000 * (perf_counter() - initial_time)
-            logging_level(
-                f"Finished execution: {underlined_text}, "
-                f"elapsed time: {time_spent:.2f} ms"
-            )
+            return _log_before_call(logging_level, func_name, args, kwargs)
 
         @wraps(func)
         async def awrapper(*args, **kwargs):
             """Async version of the wrapper."""
-            initial_time, underlined_text = before_call(*args, **kwargs)
+            call = before_call(*args, **kwargs)
             if "logging_func_name" in kwargs:
                 kwargs.pop("logging_func_name")
-            result = await func(*args, **kwargs)
-            after_call(initial_time, underlined_text)
-            return result
+            failed = True
+            try:
+                result = await func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                _log_after_call(logging_level, *call, failed=failed)
 
         @wraps(func)
         def wrapper(*args, **kwargs):
             """Normal version of the wrapper."""
-            initial_time, underlined_text = before_call(*args, **kwargs)
+            call = before_call(*args, **kwargs)
             if "logging_func_name" in kwargs:
                 kwargs.pop("logging_func_name")
-            result = func(*args, **kwargs)
-            after_call(initial_time, underlined_text)
-            return result
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                _log_after_call(logging_level, *call, failed=failed)
 
         return wrapper if not asyncio.iscoroutinefunction(func) else awrapper
 
     return decorator
 
 
+class MethodCall:
+    """Timing of a call to a method of a class with logging"""
+
+    def __init__(
+        self, name: str, module: str, duration: float, failed: bool, is_async: bool
+    ):
+        self.name = name
+        self.module = module
+        self.duration = duration
+        self.failed = failed
+        self.is_async = is_async
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "module": self.module,
+            "duration_ms": round(1000 * self.duration, 3),
+            "failed": self.failed,
+            "async": self.is_async,
+        }
+
+
+class MethodTimings:
+    """Sink of the method instrumentation that aggregates the calls of each method:
+
+    timings = MethodTimings()
+    add_instrumentation_sink(timings)
+    ...
+    timings.to_dict()["ApiClient.query_element"]["total_ms"]
+    """
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        self.total_time: Dict[str, float] = {}
+        self.max_time: Dict[str, float] = {}
+
+    def __call__(self, call: MethodCall):
+        self.counts[call.name] = self.counts.get(call.name, 0) + 1
+        if call.failed:
+            self.failures[call.name] = self.failures.get(call.name, 0) + 1
+        self.total_time[call.name] = self.total_time.get(call.name, 0.0) + call.duration
+        self.max_time[call.name] = max(self.max_time.get(call.name, 0.0), call.duration)
+
+    def clear(self):
+        self.counts.clear()
+        self.failures.clear()
+        self.total_time.clear()
+        self.max_time.clear()
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Calls, failures, total and maximum time of each method, the methods that
+        took the most time first"""
+        return {
+            name: {
+                "calls": self.counts[name],
+                "failures": self.failures.get(name, 0),
+                "total_ms": round(1000 * self.total_time[name], 3),
+                "max_ms": round(1000 * self.max_time[name], 3),
+            }
+            for name in sorted(self.total_time, key=lambda n: -self.total_time[n])
+        }
+
+
+class _MethodInstrumentation:
+    """Switches of the methods instrumented by ClassWithLogging, while both are off the
+    methods only check the value of active before being called"""
+
+    def __init__(self):
+        self.logging_enabled = False
+        self.sinks: List[Callable[[MethodCall], Any]] = []
+        self.active = False
+
+    def update(self):
+        self.active = self.logging_enabled or bool(self.sinks)
+
+
+_instrumentation = _MethodInstrumentation()
+
+
+def set_method_logging(enabled: bool):
+    """Log the start and the end of the methods of the classes with logging, the
+    logger of each class still has to be enabled for the level of the method.
+    configure_logging enables it for the 'INFO' and 'DEBUG' verbosities.
+    :param enabled: whether the methods are logged
+    """
+    _instrumentation.logging_enabled = enabled
+    _instrumentation.update()
+
+
+def add_instrumentation_sink(sink: Callable[[MethodCall], Any]):
+    """Send the timing of every call to a method of a class with logging to a sink
+    :param sink: a callable that receives a MethodCall, e.g. a MethodTimings
+    """
+    _instrumentation.sinks.append(sink)
+    _instrumentation.update()
+
+
+def remove_instrumentation_sink(sink: Callable[[MethodCall], Any]):
+    """Stop sending the timings of the calls to a sink
+    :param sink: a sink added with add_instrumentation_sink
+    """
+    _instrumentation.sinks.remove(sink)
+    _instrumentation.update()
+
+
+def _instrument_method(func: Callable, module_logger: logging.Logger, level: int):
+    """Wrap a method so that its calls are logged and timed while the instrumentation
+    is active, otherwise the method is called directly.
+    :param func: the function of the method
+    :param module_logger: the logger of the class
+    :param level: the logging level of the calls
+    """
+    is_async = asyncio.iscoroutinefunction(func)
+    logging_level = module_logger.info if level == logging.INFO else module_logger.debug
+
+    def before_call(
+        args: tuple, kwargs: dict
+    ) -> Tuple[float, Optional[str], Optional[Token]]:
+        func_name = kwargs.pop("logging_func_name", func.__name__)
+        if _instrumentation.logging_enabled and module_logger.isEnabledFor(level):
+            return _log_before_call(logging_level, func_name, args, kwargs)
+        return perf_counter(), None, None
+
+    def after_call(
+        initial_time: float,
+        underlined_text: Optional[str],
+        depth_token: Optional[Token],
+        failed: bool,
+    ):
+        if underlined_text is not None:
+            _log_after_call(
+                logging_level, initial_time, underlined_text, depth_token, failed
+            )
+        if _instrumentation.sinks:
+            call = MethodCall(
+                name=func.__qualname__,
+                module=func.__module__,
+                duration=perf_counter() - initial_time,
+                failed=failed,
+                is_async=is_async,
+            )
+            for sink in _instrumentation.sinks:
+                sink(call)
+
+    @wraps(func)
+    async def awrapper(*args, **kwargs):
+        if not _instrumentation.active:
+            return await func(*args, **kwargs)
+        call = before_call(args, kwargs)
+        failed = True
+        try:
+            result = await func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            after_call(*call, failed)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _instrumentation.active:
+            return func(*args, **kwargs)
+        call = before_call(args, kwargs)
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            after_call(*call, failed)
+
+    instrumented = awrapper if is_async else wrapper
+    instrumented._instrumented = True
+    return instrumented
+
+
+# Values that describe the work in progress, e.g. the task of the task pool, its menu
+# path and the order of its component. Each asyncio task has its own copy
+log_context: ContextVar[Dict[str, Any]] = ContextVar("log_context", default={})
+
+# Fields added to the JSON records when they are present
+JSON_LOG_FIELDS = (
+    "task_id",
+    "task",
+    "menu_path",
+    "order",
+    "call_depth",
+    "http_method",
+    "url",
+    "latency_ms",
+    "bytes_sent",
+    "bytes_received",
+    "failed",
+)
+
+
+class LogContextFilter(logging.Filter):
+    """Adds the log context and the depth of the logged calls to the records. The
+    handlers filter the records in the thread that creates them, so the values are
+    kept when the records are formatted in the thread of a queue listener."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        if not hasattr(record, "call_depth"):
+            record.call_depth = _call_depth.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatter that writes each record as a line of JSON, for log aggregators."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format the specified record as JSON."""
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+            .replace("\033[4m", "")
+            .replace("\033[0m", ""),
+        }
+        for field in JSON_LOG_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_queue_listener: Optional[QueueListener] = None
+
+
+def start_logging_queue():
+    """Move the handlers of the root logger to a background thread, the records are
+    put in a queue so that logging never blocks the event loop. The queue is flushed
+    with stop_logging_queue, which is also called at exit."""
+    global _queue_listener
+    if _queue_listener is not None:
+        return
+    root = logging.getLogger()
+    queue = SimpleQueue()
+    queue_handler = QueueHandler(queue)
+    queue_handler.addFilter(LogContextFilter())
+    _queue_listener = QueueListener(queue, *root.handlers, respect_handler_level=True)
+    root.handlers = [queue_handler]
+    _queue_listener.start()
+    atexit.register(stop_logging_queue)
+
+
+def stop_logging_queue():
+    """Write the records left in the queue and give the handlers back to the root
+    logger."""
+    global _queue_listener
+    if _queue_listener is None:
+        return
+    _queue_listener.stop()
+    logging.getLogger().handlers = list(_queue_listener.handlers)
+    _queue_listener = None
+    atexit.unregister(stop_logging_queue)
+
+
 def configure_logging(
-    verbosity: Optional[str] = None, channel: Optional[TextIOWrapper] = stdout
+    verbosity: Optional[str] = None,
+    channel: Optional[TextIOWrapper] = stdout,
+    json_format: bool = False,
+    queued: bool = False,
 ):
     """Configures the logging module to use the specified verbosity and channel.
     :param verbosity: The verbosity level to use, can be 'DEBUG', 'INFO' or 'WARNING'.
     :param channel: The channel to use, can be a file or a stream.
+    :param json_format: Write each record as a line of JSON with the task, menu path,
+        component order and timings of the API calls it belongs to.
+    :param queued: Write the records from a background thread, see start_logging_queue.
     """
 
     verbosity = verbosity.upper()
@@ -128,11 +431,12 @@ def configure_logging(
 
     _format = f'%(asctime)s | %(levelname)s {"| %(indent)s%(name)s " if verbosity == "DEBUG" else ""}| %(message)s'
     # create a formatter and set its format and date format
-    formatter = (
-        logging.Formatter(_format, datefmt="%Y-%m-%d %H:%M")
-        if verbosity != "DEBUG"
-        else IndentFormatter(_format, datefmt="%Y-%m-%d %H:%M")
-    )
+    if json_format:
+        formatter = JsonFormatter()
+    elif verbosity == "DEBUG":
+        formatter = IndentFormatter(_format, datefmt="%Y-%m-%d %H:%M")
+    else:
+        formatter = logging.Formatter(_format, datefmt="%Y-%m-%d %H:%M")
 
     level = (
         logging.DEBUG
@@ -147,28 +451,48 @@ def configure_logging(
     # change all the logger handlers
     logging.getLogger().setLevel(level)
 
+    stop_logging_queue()
     for handler in logging.root.handlers:
         handler.setFormatter(formatter)
         handler.stream = channel
+        if not any(isinstance(f, LogContextFilter) for f in handler.filters):
+            handler.addFilter(LogContextFilter())
+    if queued:
+        start_logging_queue()
+
+    set_method_logging(verbosity != "WARNING")
 
 
 class ClassWithLogging(ABC):
     """
-    This class is used to add logging to all the methods of a class.
+    This class is used to add logging to all the methods of a class. The methods are
+    instrumented once, when the class is defined, and they are only logged and timed
+    while the instrumentation is active, see set_method_logging and
+    add_instrumentation_sink. The public methods of the classes with _use_info_logging
+    are logged with the INFO level, the rest with the DEBUG level.
     """
 
     _module_logger = logger
     _use_info_logging = False
 
-    def __getattribute__(self, item):
-        attr = object.__getattribute__(self, item)
-        if callable(attr) and not isclass(attr) and logger.isEnabledFor(logging.INFO):
-            if not item.startswith("_") and self._use_info_logging:
-                return logging_before_and_after(
-                    logging_level=self._module_logger.info, name=item
-                )(attr)
-            if logger.isEnabledFor(logging.DEBUG):
-                return logging_before_and_after(
-                    logging_level=self._module_logger.debug, name=item
-                )(attr)
-        return attr
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name, attr in list(cls.__dict__.items()):
+            if name.startswith("__") and name.endswith("__"):
+                continue
+            wrapper_type = None
+            if isinstance(attr, (staticmethod, classmethod)):
+                wrapper_type, attr = type(attr), attr.__func__
+            if not isfunction(attr) or getattr(attr, "_instrumented", False):
+                continue
+            level = (
+                logging.INFO
+                if cls._use_info_logging and not name.startswith("_")
+                else logging.DEBUG
+            )
+            instrumented = _instrument_method(attr, cls._module_logger, level)
+            setattr(
+                cls,
+                name,
+                wrapper_type(instrumented) if wrapper_type else instrumented,
+            )
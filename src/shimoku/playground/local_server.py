@@ -1,10 +1,13 @@
 import inspect
 import json
+import gzip
+import zlib
 
 from shimoku.playground.websockets_server import Subscription, define_event_method
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import uvicorn
 
 import uuid
@@ -594,8 +597,17 @@ def define_list_method(
         return await list_elements(types, db, is_child_of, parent0Id, element_type)
 
     @fast_api_app.post(get_plural(parents_url))
-    async def list_elms(parent0Id: Optional[str] = None):
-        return await list_elements(types, db, is_child_of, parent0Id, element_type)
+    async def list_elms(request: Request, parent0Id: Optional[str] = None):
+        elements = await list_elements(types, db, is_child_of, parent0Id, element_type)
+        # Elastic search pagination, the body contains the offset and the page size
+        body = await request.body()
+        if body:
+            pagination = json.loads(body)
+            offset = pagination.get("from", 0)
+            elements = elements[offset:]
+            if pagination.get("limit") is not None:
+                elements = elements[: pagination["limit"]]
+        return elements
 
 
 def define_create_method(
@@ -629,6 +641,25 @@ def define_create_method(
             )
 
 
+async def get_decompressed_body(request: Request) -> bytes:
+    """
+    Get the body of a request, decompressing it if it has a content encoding
+    :param request: The request
+    """
+    body = await request.body()
+    content_encoding = request.headers.get("content-encoding", "identity").lower()
+    if content_encoding == "gzip":
+        return gzip.decompress(body)
+    if content_encoding == "deflate":
+        return zlib.decompress(body)
+    if content_encoding != "identity":
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported content encoding {content_encoding}",
+        )
+    return body
+
+
 def define_batch_create_method(
     fast_api_app: FastAPI,
     types: Dict[str, Any],
@@ -654,7 +685,7 @@ def define_batch_create_method(
 
         @fast_api_app.post(parents_url + "/batch")
         async def batch_create(parent0Id: Optional[str], request: Request):
-            items = await request.json()
+            items = json.loads(await get_decompressed_body(request))
             if not isinstance(items, list):
                 raise HTTPException(
                     status_code=400,
@@ -999,6 +1030,8 @@ def create_api() -> FastAPI:
 
 # Create the API
 app = create_api()
+# Compress the big responses when the client accepts it
+app.add_middleware(GZipMiddleware, minimum_size=1000)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -4,7 +4,6 @@ import pandas as pd
 
 from shimoku.exceptions import BentoboxError
 from shimoku.plt.utils import create_normalized_name, ShimokuPalette
-from shimoku_components_catalog.html_components import create_h1_title_with_modal
 
 if TYPE_CHECKING:
     from shimoku.plt.plt_layer import PlotLayer
@@ -274,6 +273,9 @@ def indicators_with_header(
     cols_size: int = 12,
     icon_url: str = "https://uploads-ssl.webflow.com/619f9fe98661d321dc3beec7/63e3615716d4435d29e0b82c_Acurracy.svg",
 ) -> int:
+    # The catalog is slow to import and only these charts use it
+    from shimoku_components_catalog.html_components import create_h1_title_with_modal
+
     if indicators_parameters is None:
         indicators_parameters = {}
     return chart_and_indicators(
@@ -377,6 +379,8 @@ def table_with_header(
     modal_icon_color: str = ShimokuPalette.CHART_C1.value,
     modal_icon_hover_color: str = ShimokuPalette.PRIMARY_DARK.value,
 ):
+    from shimoku_components_catalog.html_components import create_h1_title_with_modal
+
     check_for_bentobox(self)
     self.set_bentobox(cols_size=cols_size, rows_size=rows_size)
     self.html(
@@ -180,17 +180,26 @@ class PlotLayer(ClassWithLogging):
             self._current_modal = None
             logger.info("Popped out of modal")
 
+    def _get_menu_path_resource(self) -> tuple:
+        """The resource of the task scheduler that represents the menu path in use"""
+        return "menu_path", self._app["normalizedName"] if self._app else None
+
+    def _get_component_resource(self, order: int) -> tuple:
+        """The resource of the task scheduler that represents a component
+        :param order: the order of the component
+        """
+        return (
+            "component",
+            self._app["normalizedName"] if self._app else None,
+            self._get_component_hash(order),
+        )
+
     def _check_for_conflicts(self, async_pool: AutoAsyncExecutionPool, order: int):
         """
         Check if there are charts with the same order.
         :param order: the order of the chart
         """
-        r_hash = self._get_component_hash(order)
-        free_context: dict = async_pool.free_context
-        if "list_for_conflicts" not in free_context:
-            free_context["list_for_conflicts"] = []
-
-        if r_hash in free_context["list_for_conflicts"]:
+        if async_pool.has_pending_writer(self._get_component_resource(order)):
             async_pool.clear()
             self.clear_context()
             log_error(
@@ -200,8 +209,6 @@ class PlotLayer(ClassWithLogging):
                 RuntimeError,
             )
 
-        free_context["list_for_conflicts"].append(r_hash)
-
     def _check_before_async_execution(
         self, async_pool: AutoAsyncExecutionPool, func: callable, *args, **kwargs
     ):
@@ -209,6 +216,21 @@ class PlotLayer(ClassWithLogging):
         if "order" in kwargs:
             self._check_for_conflicts(async_pool, kwargs["order"])
 
+    def _get_task_resources(
+        self, func: callable, *args, **kwargs
+    ) -> tuple[Optional[list], Optional[list]]:
+        """Get the resources that a call reads and writes, so that the charts of
+        different orders and menu paths can be created at the same time. The rest of
+        the calls do not declare resources and wait for the whole task pool.
+        :param func: the function called
+        :return: the resources read and the resources written
+        """
+        if not hasattr(func, "async_group") or "order" not in kwargs:
+            return None, None
+        return [self._get_menu_path_resource()], [
+            self._get_component_resource(kwargs["order"])
+        ]
+
     def raise_if_cant_change_path(self):
         """Raise an error if a tabs group or a modal is already open."""
         if self._current_tabs_group:
@@ -241,16 +263,19 @@ class PlotLayer(ClassWithLogging):
         """
         Clear the current path or a subpath
         """
-        reports = await self._app.get_reports()
         touched_data_set_ids = []
         if self._current_path is not None:
             path = create_normalized_name(self._current_path)
             reports = [
                 report
-                for report in reports
-                if report["path"] and create_normalized_name(report["path"]) == path
+                for report_path, path_reports in (
+                    await self._app.get_reports_by_path()
+                ).items()
+                if report_path and create_normalized_name(report_path) == path
+                for report in path_reports
             ]
         else:
+            reports = await self._app.get_reports()
             touched_data_set_ids = [ds["id"] for ds in await self._app.get_data_sets()]
 
         containers: list = [
@@ -881,10 +906,8 @@ class PlotLayer(ClassWithLogging):
                 params["pathOrder"] = self._execution_path_orders.index(
                     self._current_path
                 )
-            if chart != self._app.mock_create_report(
-                chart_class, r_hash=r_hash, order=order, **params
-            ):
-                await self._app.update_report(r_hash=r_hash, **params)
+            # Only the params that change are sent
+            if await self._app.update_report(r_hash=r_hash, **params):
                 logger.info(f"Updated {chart_class.__name__} at {str(chart)}")
             else:
                 logger.info(
@@ -1140,6 +1163,7 @@ class PlotLayer(ClassWithLogging):
             properties=data,
         )
 
+    @add_to_general_async_group
     def indicator(
         self,
         data: Union[str, pd.DataFrame, list[dict], dict],
@@ -1806,6 +1830,7 @@ class PlotLayer(ClassWithLogging):
             properties={"events": {"onSubmit": on_submit_events}},
         )
 
+    @add_to_general_async_group
     def generate_input_form_groups(
         self,
         order: int,
@@ -0,0 +1,188 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from shimoku.task_scheduler import ScheduledTask
+
+
+def _get_executed_tasks(tasks: Iterable[ScheduledTask]) -> List[ScheduledTask]:
+    return [task for task in tasks if task.duration is not None]
+
+
+def _get_longest_chain(tasks: List[ScheduledTask]) -> List[ScheduledTask]:
+    """Get the chain of dependencies with the longest execution time
+    :param tasks: the calls executed in the same run
+    """
+    # The dependencies always have a lower index than the calls that depend on them
+    tasks = sorted(tasks, key=lambda task: task.index)
+    chain_duration: Dict[int, float] = {}
+    previous: Dict[int, Optional[ScheduledTask]] = {}
+    for task in tasks:
+        longest = None
+        for dependency in task.dependencies:
+            if dependency.index in chain_duration and (
+                longest is None
+                or chain_duration[dependency.index] > chain_duration[longest.index]
+            ):
+                longest = dependency
+        chain_duration[task.index] = task.duration + (
+            chain_duration[longest.index] if longest is not None else 0.0
+        )
+        previous[task.index] = longest
+
+    tasks_by_index = {task.index: task for task in tasks}
+    task = tasks_by_index[max(chain_duration, key=chain_duration.get)]
+    chain = []
+    while task is not None:
+        chain.append(task)
+        task = previous[task.index]
+    return chain[::-1]
+
+
+def get_critical_path(tasks: Iterable[ScheduledTask]) -> List[ScheduledTask]:
+    """Get the calls that determine the execution time, it is the shortest time in which
+    the calls could be executed with unlimited workers. Each run of the pool starts
+    when the previous one ends, so the path joins the longest chain of dependencies of
+    every run.
+    :param tasks: the executed calls
+    """
+    tasks_per_run: Dict[Optional[int], List[ScheduledTask]] = {}
+    for task in _get_executed_tasks(tasks):
+        tasks_per_run.setdefault(task.run_index, []).append(task)
+    return [
+        task
+        for run_index in sorted(tasks_per_run)
+        for task in _get_longest_chain(tasks_per_run[run_index])
+    ]
+
+
+def get_max_concurrency(tasks: Iterable[ScheduledTask]) -> int:
+    """Get the maximum number of calls that were executed at the same time
+    :param tasks: the executed calls
+    """
+    events = []
+    for task in _get_executed_tasks(tasks):
+        events.append((task.started_at, 1))
+        events.append((task.finished_at, -1))
+    max_concurrency = concurrency = 0
+    # At the same time the finished calls are counted before the started ones
+    for _, change in sorted(events):
+        concurrency += change
+        max_concurrency = max(max_concurrency, concurrency)
+    return max_concurrency
+
+
+def summarize_tasks(tasks: Iterable[ScheduledTask], top: int = 10) -> Dict[str, Any]:
+    """Summary of the execution of the calls: the slowest ones, the critical path, the
+    concurrency achieved and the api calls made
+    :param tasks: the calls of the task scheduler
+    :param top: the number of slowest calls reported
+    """
+    tasks = list(tasks)
+    executed = _get_executed_tasks(tasks)
+    if not executed:
+        return {"tasks": 0}
+    origin = min(task.started_at for task in executed)
+    wall_time = max(task.finished_at for task in executed) - origin
+    busy_time = sum(task.duration for task in executed)
+    critical_path = get_critical_path(executed)
+
+    def to_ms(value: float) -> float:
+        return round(1000 * value, 3)
+
+    summary = {
+        "tasks": len(executed),
+        "failed_tasks": sum(task.error is not None for task in tasks),
+        "skipped_tasks": sum(task.skipped for task in tasks),
+        "wall_time_ms": to_ms(wall_time),
+        "busy_time_ms": to_ms(busy_time),
+        "worker_wait_ms": to_ms(sum(task.worker_wait or 0.0 for task in executed)),
+        "achieved_concurrency": round(busy_time / wall_time, 2) if wall_time else 1.0,
+        "max_concurrency": get_max_concurrency(executed),
+        "slowest_tasks": [
+            task.to_dict(origin)
+            for task in sorted(executed, key=lambda task: -task.duration)[:top]
+        ],
+        "critical_path": {
+            "duration_ms": to_ms(sum(task.duration for task in critical_path)),
+            "tasks": [task.to_dict(origin) for task in critical_path],
+        },
+    }
+    profiled = [task for task in executed if task.request_counter is not None]
+    if profiled:
+        for attribute, key in [
+            ("calls", "api_calls"),
+            ("requests", "requests"),
+            ("bytes_sent", "bytes_sent"),
+            ("bytes_received", "bytes_received"),
+        ]:
+            summary[key] = sum(
+                getattr(task.request_counter, attribute) for task in profiled
+            )
+    return summary
+
+
+def to_chrome_trace(tasks: Iterable[ScheduledTask]) -> Dict[str, Any]:
+    """Trace event format of the calls, it can be opened with chrome://tracing or
+    https://ui.perfetto.dev to see the execution as a flame chart. Each call is placed
+    in the first lane that is free when it starts, so each lane is like a worker.
+    :param tasks: the executed calls
+    """
+    executed = sorted(_get_executed_tasks(tasks), key=lambda task: task.started_at)
+    if not executed:
+        return {"traceEvents": [], "displayTimeUnit": "ms"}
+    origin = executed[0].started_at
+
+    def to_us(value: float) -> float:
+        return round(1_000_000 * value, 3)
+
+    lanes_free_at: List[float] = []
+    events = []
+    for task in executed:
+        lane = next(
+            (
+                i
+                for i, free_at in enumerate(lanes_free_at)
+                if free_at <= task.started_at
+            ),
+            len(lanes_free_at),
+        )
+        if lane == len(lanes_free_at):
+            lanes_free_at.append(task.finished_at)
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": 1,
+                    "tid": lane,
+                    "args": {"name": f"worker {lane}"},
+                }
+            )
+        lanes_free_at[lane] = task.finished_at
+        task_dict = task.to_dict(origin)
+        events.append(
+            {
+                "name": task.name,
+                "cat": "error" if task.error is not None else "task",
+                "ph": "X",
+                "ts": to_us(task.started_at - origin),
+                "dur": to_us(task.duration),
+                "pid": 1,
+                "tid": lane,
+                "args": {
+                    key: task_dict[key]
+                    for key in [
+                        "index",
+                        "labels",
+                        "run",
+                        "wave",
+                        "depends_on",
+                        "worker_wait_ms",
+                        "api_calls",
+                        "requests",
+                        "bytes_sent",
+                        "bytes_received",
+                    ]
+                    if key in task_dict
+                },
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
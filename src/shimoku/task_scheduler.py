@@ -0,0 +1,311 @@
+import asyncio
+from collections import deque
+from time import perf_counter
+from typing import Optional, Coroutine, Any, Hashable, Iterable, List, Dict, Set, Deque
+
+from shimoku.api.metrics import RequestCounter, current_request_counter
+from shimoku.exceptions import DependencyFailedError
+from shimoku.execution_logger import log_context
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Number of executed tasks kept to explain the schedule
+SCHEDULE_HISTORY_SIZE = 10000
+
+
+class ScheduledTask:
+    """A call queued in the task scheduler, with the resources it reads and writes"""
+
+    def __init__(
+        self,
+        index: int,
+        name: str,
+        coroutine: Coroutine,
+        reads: Optional[Iterable[Hashable]],
+        writes: Optional[Iterable[Hashable]],
+        dependencies: List["ScheduledTask"],
+        labels: Optional[Dict[str, Any]] = None,
+    ):
+        self.index = index
+        self.name = name
+        # Describe the call in the reports, e.g. the order and the menu path of a chart
+        self.labels: Dict[str, Any] = labels or {}
+        self.coroutine = coroutine
+        self.declared = reads is not None or writes is not None
+        self.reads: Set[Hashable] = set(reads or ())
+        self.writes: Set[Hashable] = set(writes or ())
+        self.dependencies = dependencies
+        # Length of the longest chain of dependencies that leads to the task
+        self.wave = 1 + max(
+            (dependency.wave for dependency in dependencies), default=-1
+        )
+
+        self.run_index: Optional[int] = None
+        # When its dependencies finished, it can wait longer for a free worker
+        self.ready_at: Optional[float] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self.skipped = False
+        self.done = False
+        # Only when the execution is profiled
+        self.request_counter: Optional[RequestCounter] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds spent executing the call"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def worker_wait(self) -> Optional[float]:
+        """Seconds waited for a free worker once the dependencies finished"""
+        if self.ready_at is None or self.started_at is None:
+            return None
+        return self.started_at - self.ready_at
+
+    def to_dict(self, origin: float = 0.0) -> Dict[str, Any]:
+        """
+        :param origin: the time from which the start and finish times are measured
+        """
+
+        def to_ms(value: Optional[float], since: float = origin) -> Optional[float]:
+            return round(1000 * (value - since), 3) if value is not None else None
+
+        result = {
+            "index": self.index,
+            "name": self.name,
+            "labels": self.labels,
+            "run": self.run_index,
+            "wave": self.wave,
+            "depends_on": [dependency.index for dependency in self.dependencies],
+            "reads": sorted(str(resource) for resource in self.reads),
+            "writes": sorted(str(resource) for resource in self.writes),
+            "declared": self.declared,
+            "started_at_ms": to_ms(self.started_at),
+            "finished_at_ms": to_ms(self.finished_at),
+            "duration_ms": to_ms(self.duration, 0.0),
+            "worker_wait_ms": to_ms(self.worker_wait, 0.0),
+            "status": (
+                "skipped"
+                if self.skipped
+                else "failed"
+                if self.error is not None
+                else "done"
+                if self.done
+                else "pending"
+            ),
+        }
+        if self.request_counter is not None:
+            result.update(
+                api_calls=self.request_counter.calls,
+                requests=self.request_counter.requests,
+                bytes_sent=self.request_counter.bytes_sent,
+                bytes_received=self.request_counter.bytes_received,
+            )
+        return result
+
+
+class TaskScheduler:
+    """
+    Dependency graph of the queued calls. Each call can declare the resources it reads
+    and writes (e.g. a menu path, a component or a data set), a call depends on the
+    previous calls that write what it reads or writes, and on the previous calls that
+    read what it writes. Calls that do not declare resources have no dependencies, the
+    execution pool keeps them apart from the rest with its async groups.
+    The independent calls are executed concurrently, with a bounded number of workers.
+    """
+
+    def __init__(self):
+        self.pending: List[ScheduledTask] = []
+        self.history: Deque[ScheduledTask] = deque(maxlen=SCHEDULE_HISTORY_SIZE)
+        self._added = 0
+        self._runs = 0
+        self._last_writer: Dict[Hashable, ScheduledTask] = {}
+        self._readers: Dict[Hashable, List[ScheduledTask]] = {}
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def add(
+        self,
+        coroutine: Coroutine,
+        name: str,
+        reads: Optional[Iterable[Hashable]] = None,
+        writes: Optional[Iterable[Hashable]] = None,
+        labels: Optional[Dict[str, Any]] = None,
+    ) -> ScheduledTask:
+        """Queue a call, its dependencies are computed from the resources it declares
+        :param coroutine: the coroutine of the call
+        :param name: the name of the call
+        :param reads: the resources it reads, None if it does not declare them
+        :param writes: the resources it writes, None if it does not declare them
+        :param labels: values that describe the call in the reports
+        """
+        reads = set(reads) if reads is not None else None
+        writes = set(writes) if writes is not None else None
+        dependencies: Dict[int, ScheduledTask] = {}
+        for resource in (reads or set()) | (writes or set()):
+            writer = self._last_writer.get(resource)
+            if writer is not None and not writer.done:
+                dependencies[writer.index] = writer
+        for resource in writes or ():
+            for reader in self._readers.get(resource, []):
+                if not reader.done:
+                    dependencies[reader.index] = reader
+
+        task = ScheduledTask(
+            index=self._added,
+            name=name,
+            coroutine=coroutine,
+            reads=reads,
+            writes=writes,
+            dependencies=[dependencies[i] for i in sorted(dependencies)],
+            labels=labels,
+        )
+        self._added += 1
+        for resource in reads or ():
+            self._readers.setdefault(resource, []).append(task)
+        for resource in writes or ():
+            self._last_writer[resource] = task
+            self._readers[resource] = []
+        self.pending.append(task)
+        return task
+
+    def has_pending_writer(self, resource: Hashable) -> bool:
+        """Whether a pending call writes the resource
+        :param resource: the resource
+        """
+        writer = self._last_writer.get(resource)
+        return writer is not None and not writer.done
+
+    def clear(self):
+        """Discard the pending calls"""
+        for task in self.pending:
+            task.coroutine.close()
+        self.pending = []
+        self._last_writer = {}
+        self._readers = {}
+
+    def clear_history(self):
+        """Forget the executed calls"""
+        self.history.clear()
+
+    @staticmethod
+    def _get_ancestors(targets: List[ScheduledTask]) -> Set[int]:
+        """Indexes of the targets and every pending task they depend on"""
+        selected: Set[int] = set()
+        stack = list(targets)
+        while stack:
+            task = stack.pop()
+            if task.index in selected or task.done:
+                continue
+            selected.add(task.index)
+            stack.extend(task.dependencies)
+        return selected
+
+    async def run(
+        self,
+        max_workers: Optional[int] = None,
+        targets: Optional[List[ScheduledTask]] = None,
+        profile: bool = False,
+    ) -> List[Any]:
+        """Execute the pending calls respecting their dependencies. If a call fails the
+        calls that depend on it are skipped, the rest are executed and then the error of
+        the first failed call is raised.
+        :param max_workers: the maximum number of calls executed at the same time
+        :param targets: execute only these calls and the ones they depend on, by default
+            all the pending calls
+        :param profile: count the api calls, requests and bytes of each call
+        :return: the results of the executed calls, in the order they were queued
+        """
+        if targets is None:
+            selected_tasks = self.pending
+        else:
+            selected = self._get_ancestors(targets)
+            selected_tasks = [task for task in self.pending if task.index in selected]
+        self.pending = [task for task in self.pending if task not in selected_tasks]
+        if not selected_tasks:
+            return []
+        self.history.extend(selected_tasks)
+        self._runs += 1
+
+        workers = asyncio.Semaphore(max_workers) if max_workers else None
+        executions: Dict[int, asyncio.Future] = {}
+
+        async def execute(task: ScheduledTask) -> Any:
+            try:
+                for dependency in task.dependencies:
+                    if dependency.index in executions:
+                        await asyncio.wait([executions[dependency.index]])
+                    if dependency.error is not None or dependency.skipped:
+                        task.skipped = True
+                        task.coroutine.close()
+                        raise DependencyFailedError(
+                            f"{task.name} was not executed because "
+                            f"{dependency.name} failed"
+                        )
+                task.ready_at = perf_counter()
+                if workers is not None:
+                    await workers.acquire()
+                log_context.set(
+                    {"task_id": task.index, "task": task.name, **task.labels}
+                )
+                if profile:
+                    task.request_counter = RequestCounter()
+                    current_request_counter.set(task.request_counter)
+                try:
+                    task.started_at = perf_counter()
+                    return await task.coroutine
+                except BaseException as e:
+                    task.error = e
+                    raise
+                finally:
+                    task.finished_at = perf_counter()
+                    if workers is not None:
+                        workers.release()
+            finally:
+                task.done = True
+                # Free the frame of the coroutine, the task is kept in the history
+                task.coroutine = None
+
+        for task in selected_tasks:
+            task.run_index = self._runs
+            executions[task.index] = asyncio.ensure_future(execute(task))
+        results = await asyncio.gather(*executions.values(), return_exceptions=True)
+
+        for task in selected_tasks:
+            if task.error is not None:
+                raise task.error
+        return list(results)
+
+    def explain(self) -> List[Dict[str, Any]]:
+        """The last executed calls followed by the pending ones, with the execution they
+        belong to, their dependencies, waves, timings and status. The times are measured
+        from the start of the first call listed."""
+        tasks = list(self.history) + self.pending
+        origin = min(
+            (task.started_at for task in tasks if task.started_at is not None),
+            default=0.0,
+        )
+        return [task.to_dict(origin) for task in tasks]
+
+    def format_schedule(self) -> str:
+        """Human readable version of explain"""
+        lines = []
+        for task in self.explain():
+            line = (
+                f"#{task['index']} {task['name']} "
+                f"(run {task['run']}, wave {task['wave']}, {task['status']})"
+            )
+            if task["depends_on"]:
+                line += " after " + ", ".join(f"#{i}" for i in task["depends_on"])
+            if task["started_at_ms"] is not None:
+                line += f" | {task['started_at_ms']} ms -> {task['finished_at_ms']} ms"
+            if task["writes"]:
+                line += " | writes " + ", ".join(task["writes"])
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,845 @@
+import asyncio
+import datetime
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from uuid import uuid4
+import numpy as np
+import pandas as pd
+from os import getenv
+from utils import initiate_shimoku
+from shimoku import Client, AsyncClient
+from shimoku.api.client import ApiClient
+from shimoku.api.codec import JsonCodec, JSON_CODECS
+from shimoku.api.concurrency import AdaptiveConcurrencyLimiter
+from shimoku.api.retry import RetryPolicy, CircuitBreaker
+from shimoku.api.transport import RecordingTransport, ReplayTransport, Transport
+from shimoku.api.rate_limit import FileRateLimiter
+from shimoku.async_execution_pool import DEFAULT_MAX_WORKERS
+from shimoku.task_scheduler import TaskScheduler
+from shimoku.execution_logger import (
+    configure_logging,
+    stop_logging_queue,
+    IndentFormatter,
+    logging_before_and_after,
+    MethodTimings,
+    add_instrumentation_sink,
+    remove_instrumentation_sink,
+)
+from shimoku.exceptions import (
+    APIError,
+    CircuitOpenError,
+    CassetteError,
+)
+from shimoku.api.resources.file import File
+
+s = initiate_shimoku()
+business_id: str = getenv("BUSINESS_ID")
+
+API_CLIENT_TEST_PATH = "Api client test path"
+
+
+class TestApiClient(unittest.TestCase):
+    def setUp(self):
+        s.set_workspace(uuid=business_id)
+        s.set_menu_path(API_CLIENT_TEST_PATH)
+        s.plt.clear_menu_path()
+
+    def test_session_is_shared_between_requests(self):
+        api_client: ApiClient = s._api_client
+        app = s._app_object
+
+        async def list_twice():
+            await app.get_reports()
+            first_session = api_client.get_session()
+            app.clear()
+            await app.get_reports()
+            return first_session, api_client.get_session()
+
+        async def run():
+            async with api_client:
+                first_session, second_session = await list_twice()
+            return first_session, second_session
+
+        first_session, second_session = asyncio.run(run())
+        assert first_session is second_session
+        assert first_session.closed
+        assert api_client not in ApiClient._clients_with_session
+
+    def test_session_is_reused_between_sequential_calls(self):
+        s.activate_sequential_execution()
+        s.plt.html(html="<h1>test</h1>", order=0)
+        session = s._api_client._session
+        assert session is not None and not session.closed
+        s.plt.html(html="<h1>test</h1>", order=1)
+        assert s._api_client._session is session
+        assert s._api_client._session_loop is s._async_pool._loop
+
+        s.close()
+        assert session.closed
+        assert s._api_client._session is None
+        # The pool starts a new loop if it is used again
+        s.plt.html(html="<h1>test</h1>", order=2)
+        assert not s._api_client._session.closed
+
+    def test_calls_from_the_background_loop_run_in_it(self):
+        s.activate_sequential_execution()
+        s.plt.html(html="<h1>test</h1>", order=0)
+        session = s._api_client._session
+        menu_path_name = s._app_object["name"]
+
+        async def nested_call():
+            # e.g. a layer method that calls another one
+            return await s.menu_paths.get_menu_path(name=menu_path_name)
+
+        menu_path = s._async_pool._run_in_background_loop(nested_call())
+        assert menu_path["name"] == menu_path_name
+        assert s._api_client._session is session
+        assert not session.closed
+
+    def test_elastic_pages_are_requested_concurrently(self):
+        # A menu path of its own so that no other files are listed
+        s.set_menu_path(f"{API_CLIENT_TEST_PATH} {uuid4()}")
+        api_client: ApiClient = s._api_client
+        app = s._app_object
+        file_names = [f"file_{i}" for i in range(23)]
+
+        async def run(coroutine):
+            async with api_client:
+                return await coroutine
+
+        async def create_files():
+            await asyncio.gather(
+                *[
+                    app._base_resource.create_child(File, alias=file_name)
+                    for file_name in file_names
+                ]
+            )
+
+        async def delete_files():
+            await asyncio.gather(
+                *[app.delete_file(name=file_name) for file_name in file_names]
+            )
+
+        asyncio.run(run(create_files()))
+
+        page_size = api_client.page_size
+        api_client.page_size = 5
+        try:
+            app.clear()
+            calls_before = api_client.call_counter
+            files = asyncio.run(run(app.get_files()))
+            # Windows of 1, 2 and 4 pages are needed to reach the short page
+            assert api_client.call_counter - calls_before == 7
+            assert sorted(file["name"] for file in files) == sorted(file_names)
+
+            api_client.parallel_pagination = False
+            app.clear()
+            assert len(asyncio.run(run(app.get_files()))) == len(file_names)
+        finally:
+            api_client.page_size = page_size
+            api_client.parallel_pagination = True
+            asyncio.run(run(delete_files()))
+            s.pop_out_of_menu_path()
+            s.menu_paths.delete_menu_path(name=app["name"])
+
+    def test_concurrent_listings_share_the_concurrency_window(self):
+        s.set_menu_path(f"{API_CLIENT_TEST_PATH} {uuid4()}")
+        api_client: ApiClient = s._api_client
+        app = s._app_object
+        file_names = [f"file_{i}" for i in range(12)]
+        in_flight = [0, 0]
+
+        class CountingTransport(Transport):
+            async def send(self, api_client, method, url, *args, **kwargs):
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+                try:
+                    await asyncio.sleep(0.01)
+                    return await super().send(api_client, method, url, *args, **kwargs)
+                finally:
+                    in_flight[0] -= 1
+
+        async def run(coroutine):
+            async with api_client:
+                return await coroutine
+
+        async def list_concurrently():
+            return await asyncio.gather(
+                *[app.children[File].fetch_items() for _ in range(4)]
+            )
+
+        async def create_files():
+            await asyncio.gather(
+                *[
+                    app._base_resource.create_child(File, alias=file_name)
+                    for file_name in file_names
+                ]
+            )
+
+        asyncio.run(run(create_files()))
+
+        page_size, transport = api_client.page_size, api_client.transport
+        api_client.page_size = 2
+        api_client.single_flight = False
+        api_client.transport = CountingTransport()
+        limiter = api_client.get_limiter("default")
+        limit = limiter.limit
+        api_client.pin_concurrency("default", 3)
+        try:
+            listings = asyncio.run(run(list_concurrently()))
+            assert all(len(files) == len(file_names) for files in listings)
+            assert in_flight[1] == 3
+            assert s.get_concurrency_stats()["default"]["in_flight"] == 0
+        finally:
+            api_client.pin_concurrency("default", None)
+            limiter.limit = limit
+            api_client.page_size, api_client.transport = page_size, transport
+            api_client.single_flight = True
+            s.pop_out_of_menu_path()
+            s.menu_paths.delete_menu_path(name=app["name"])
+
+    def test_concurrency_window_adapts_to_the_backend(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=10, max_limit=20)
+
+        async def request(error=None):
+            async with limiter.slot():
+                if error:
+                    raise error
+
+        async def run():
+            for _ in range(100):
+                await request()
+            grown_window = limiter.window
+            try:
+                await request(APIError("Too many requests", status_code=429))
+            except APIError:
+                pass
+            return grown_window
+
+        grown_window = asyncio.run(run())
+        assert grown_window > 10
+        assert limiter.window == grown_window // 2
+        stats = limiter.get_stats()
+        assert stats["overloads"] == 1
+        assert stats["requests"] == 101
+        assert stats["in_flight"] == 0
+
+    def test_concurrency_can_be_pinned(self):
+        api_client: ApiClient = s._api_client
+        api_client.pin_concurrency("batch", 3)
+        try:
+            s.data.append_to_data_set(
+                name="pinned concurrency", data=[{"a": i} for i in range(1000)]
+            )
+            stats = s.get_concurrency_stats()
+            assert stats["batch"]["pinned"]
+            assert stats["batch"]["window"] == 3
+            assert stats["batch"]["requests"] >= 10
+            assert not stats["default"]["pinned"]
+        finally:
+            api_client.pin_concurrency("batch", None)
+
+    def test_retry_policy(self):
+        policy = RetryPolicy(
+            max_attempts=3,
+            base_delay=0,
+            max_delay=0,
+            circuit_breaker=CircuitBreaker(failure_threshold=100),
+        )
+        calls = []
+
+        async def failing_request(status_code: int, retry_after=None):
+            calls.append(status_code)
+            raise APIError("error", status_code=status_code, retry_after=retry_after)
+
+        def call(method: str, status_code: int, retry_after=None):
+            calls.clear()
+            with self.assertRaises(APIError):
+                asyncio.run(
+                    policy.call(method, failing_request, status_code, retry_after)
+                )
+            return len(calls)
+
+        # Fatal statuses are not retried
+        assert call("GET", 404) == 1
+        # Transient statuses are retried for idempotent methods
+        assert call("GET", 500) == 3
+        # Batch POSTs are not retried if they could have been processed
+        assert call("POST", 500) == 1
+        assert call("POST", 429, retry_after=0) == 3
+        assert policy.next_delay(0, APIError("", 429, retry_after=7)) == 0
+
+    def test_circuit_breaker_fails_fast(self):
+        policy = RetryPolicy(
+            max_attempts=1,
+            circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60),
+        )
+        calls = []
+
+        async def failing_request():
+            calls.append(1)
+            raise APIError("Service unavailable", status_code=503)
+
+        async def run():
+            for _ in range(2):
+                with self.assertRaises(APIError):
+                    await policy.call("GET", failing_request)
+            with self.assertRaises(CircuitOpenError):
+                await policy.call("GET", failing_request)
+
+        asyncio.run(run())
+        assert len(calls) == 2
+        assert policy.circuit_breaker.is_open
+
+    def test_cancelled_trial_call_does_not_keep_the_circuit_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        policy = RetryPolicy(max_attempts=1, circuit_breaker=breaker)
+
+        async def failing_request():
+            raise APIError("Service unavailable", status_code=503)
+
+        async def slow_request():
+            await asyncio.sleep(10)
+
+        async def successful_request():
+            return "ok"
+
+        async def run():
+            with self.assertRaises(APIError):
+                await policy.call("GET", failing_request)
+            assert breaker.is_open
+            # The trial call is cancelled before the API answers
+            trial = asyncio.ensure_future(policy.call("GET", slow_request))
+            await asyncio.sleep(0)
+            trial.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await trial
+            return await policy.call("GET", successful_request)
+
+        assert asyncio.run(run()) == "ok"
+        assert not breaker.is_open
+
+    def test_identical_gets_share_one_request(self):
+        api_client: ApiClient = s._api_client
+        app = s._app_object
+
+        async def get_app_many_times():
+            async with api_client:
+                return await asyncio.gather(*[app.get() for _ in range(5)])
+
+        calls_before = api_client.call_counter
+        coalesced_before = s.get_coalesced_api_calls_counter()
+        results = asyncio.run(get_app_many_times())
+        assert api_client.call_counter - calls_before == 1
+        assert s.get_coalesced_api_calls_counter() - coalesced_before == 4
+        assert all(result == results[0] for result in results)
+        assert all(result is not results[0] for result in results[1:])
+
+    def test_coalesced_gets_do_not_see_the_changes_of_the_first_caller(self):
+        api_client: ApiClient = s._api_client
+
+        async def get_items():
+            await asyncio.sleep(0.01)
+            return {"items": [1, 2]}
+
+        async def get_and_clear():
+            result = await api_client.coalesce_get(("items",), get_items)
+            result["items"].clear()
+            return result
+
+        async def run():
+            return await asyncio.gather(
+                get_and_clear(), api_client.coalesce_get(("items",), get_items)
+            )
+
+        first_result, follower_result = asyncio.run(run())
+        assert first_result == {"items": []}
+        assert follower_result == {"items": [1, 2]}
+
+    def test_api_metrics_per_endpoint(self):
+        s._api_client.metrics.reset()
+        s.plt.html(html="<h1>metrics</h1>", order=0)
+
+        metrics = s.get_api_metrics()
+        assert metrics
+        assert all(
+            "{id}" in endpoint or "/" not in endpoint for endpoint in metrics.keys()
+        )
+        requests = sum(endpoint["requests"] for endpoint in metrics.values())
+        assert requests > 0
+        for endpoint_metrics in metrics.values():
+            if endpoint_metrics["requests"]:
+                assert endpoint_metrics["bytes_received"] > 0
+                assert (
+                    endpoint_metrics["p50_latency_ms"]
+                    <= endpoint_metrics["p99_latency_ms"]
+                    <= endpoint_metrics["max_latency_ms"]
+                )
+
+        assert json.loads(s.get_api_metrics("json")) == metrics
+        prometheus = s.get_api_metrics("prometheus")
+        assert "shimoku_api_requests_total" in prometheus
+        assert 'le="+Inf"' in prometheus
+        with self.assertRaises(ValueError):
+            s.get_api_metrics("xml")
+
+    def test_record_and_replay_a_dashboard_build(self):
+        menu_path = f"{API_CLIENT_TEST_PATH} {uuid4()}"
+
+        def build(client: Client):
+            client.set_workspace(uuid=business_id)
+            client.set_menu_path(menu_path)
+            client.plt.html(html="<h1>recorded</h1>", order=0)
+            client.plt.indicator(
+                data={"title": "recorded", "value": 1}, order=1, cols_size=4
+            )
+            return client.components.get_components_in_sub_path(path=None)
+
+        with tempfile.TemporaryDirectory() as directory:
+            cassette_path = os.path.join(directory, "build.jsonl.gz")
+            recording_client = Client(
+                local_port=int(getenv("LOCAL_PORT")),
+                transport=RecordingTransport(cassette_path),
+            )
+            recorded_components = build(recording_client)
+            recorded_metrics = recording_client.get_api_metrics()
+            # Closing the client writes the pending interactions
+            recording_client.close()
+
+            # No server listens in this port, every response comes from the cassette
+            replay_transport = ReplayTransport(cassette_path, latency_scale=0)
+            replaying_client = Client(local_port=1, transport=replay_transport)
+            replayed_components = build(replaying_client)
+
+            assert len(recorded_components) == 2
+            assert replayed_components == recorded_components
+            assert replay_transport.unused_interactions == 0
+            replayed_metrics = replaying_client.get_api_metrics()
+            assert replayed_metrics.keys() == recorded_metrics.keys()
+            for endpoint, metrics in replayed_metrics.items():
+                assert metrics["requests"] == recorded_metrics[endpoint]["requests"]
+                assert (
+                    metrics["bytes_received"]
+                    == recorded_metrics[endpoint]["bytes_received"]
+                )
+            with self.assertRaises(CassetteError):
+                replaying_client.plt.html(html="<h1>not recorded</h1>", order=2)
+
+        s.set_menu_path(menu_path)
+        s.pop_out_of_menu_path()
+        s.menu_paths.delete_menu_path(name=menu_path)
+
+    def test_json_codecs_serialize_numpy_pandas_and_dates(self):
+        payload = {
+            "int": np.int64(3),
+            "float": np.float32(0.5),
+            "array": np.array([1, 2]),
+            "timestamp": pd.Timestamp("2023-01-02T03:04:05"),
+            "date": datetime.date(2023, 1, 2),
+            "missing": pd.NaT,
+            "nested": [{"value": np.bool_(True)}],
+        }
+        expected = {
+            "int": 3,
+            "float": 0.5,
+            "array": [1, 2],
+            "timestamp": "2023-01-02T03:04:05",
+            "date": "2023-01-02",
+            "missing": None,
+            "nested": [{"value": True}],
+        }
+        for name in JSON_CODECS:
+            codec = JsonCodec(name)
+            if codec.name != name:
+                continue
+            encoded = codec.dumps(payload)
+            assert isinstance(encoded, bytes)
+            assert codec.loads(encoded) == expected
+        with self.assertRaises(ValueError):
+            JsonCodec("yaml")
+
+    def test_codecs_encode_non_finite_floats_as_null(self):
+        payload = {
+            "nan": float("nan"),
+            "inf": np.float64("inf"),
+            "array": np.array([1.5, np.nan]),
+            "nested": [{"value": -float("inf")}, (np.float32("nan"), 2.0)],
+        }
+        expected = {
+            "nan": None,
+            "inf": None,
+            "array": [1.5, None],
+            "nested": [{"value": None}, [None, 2.0]],
+        }
+        encoded_bodies = set()
+        for name in JSON_CODECS:
+            codec = JsonCodec(name)
+            if codec.name != name:
+                continue
+            encoded = codec.dumps(payload)
+            assert codec.loads(encoded) == expected
+            encoded_bodies.add(encoded)
+        assert len(encoded_bodies) == 1
+
+    def test_batch_bodies_are_compressed(self):
+        api_client: ApiClient = s._api_client
+        data = [{"a": i, "b": f"value {i}"} for i in range(300)]
+        batch_metrics_key = None
+
+        def upload(name: str) -> int:
+            nonlocal batch_metrics_key
+            api_client.metrics.reset()
+            s.data.append_to_data_set(name=name, data=data)
+            assert len(s.data.get_data_from_data_set(name=name)) == len(data)
+            s.data.delete_data_set(name=name)
+            metrics = s.get_api_metrics()
+            batch_metrics_key = next(key for key in metrics if key.endswith("/batch"))
+            return metrics[batch_metrics_key]["bytes_sent"]
+
+        uncompressed_size = upload("uncompressed data")
+        api_client.request_compression = "gzip"
+        try:
+            compressed_size = upload("compressed data")
+        finally:
+            api_client.request_compression = None
+        assert compressed_size * 5 < uncompressed_size
+
+    def test_compression_is_disabled_if_not_accepted(self):
+        api_client: ApiClient = s._api_client
+        api_client.request_compression = "deflate"
+        api_client.compression_threshold = 0
+        sent_headers = []
+
+        async def request(header_params, body):
+            sent_headers.append(header_params)
+            if "Content-Encoding" in header_params:
+                raise APIError("Unsupported Media Type", status_code=415)
+            return body
+
+        try:
+            body = asyncio.run(
+                api_client.send_compressed(
+                    "POST",
+                    "app/1/dataSet/1/data/batch",
+                    request,
+                    header_params={},
+                    body=b"[]",
+                )
+            )
+            assert "batch" not in api_client.compressed_endpoints
+        finally:
+            api_client.request_compression = None
+            api_client.compression_threshold = 1024
+            api_client.compressed_endpoints = {"batch"}
+        assert body == b"[]"
+        assert sent_headers[0]["Content-Encoding"] == "deflate"
+        assert "Content-Encoding" not in sent_headers[1]
+
+    def test_rate_limiter_is_shared_between_clients(self):
+        config = {"access_token": "local", "rate_limit": 50, "rate_limit_burst": 2}
+        config["rate_limit_name"] = f"test {uuid4()}"
+        first_client = ApiClient("production", playground=True, config=config)
+        second_client = ApiClient("production", playground=True, config=config)
+        assert first_client.rate_limiter is second_client.rate_limiter
+
+        async def acquire_from_both_clients():
+            await asyncio.gather(
+                *[
+                    client.rate_limiter.acquire()
+                    for client in [first_client, second_client] * 5
+                ]
+            )
+
+        initial_time = time.perf_counter()
+        asyncio.run(acquire_from_both_clients())
+        # The burst is free, the other 8 requests are spaced 1/50 seconds
+        assert time.perf_counter() - initial_time >= 8 / 50 * 0.9
+        stats = first_client.rate_limiter.get_stats()
+        assert stats["requests"] == 10
+        assert stats["throttled_requests"] == 8
+        assert stats["max_wait_time_ms"] >= 8 / 50 * 1000 * 0.9
+
+    def test_file_rate_limiter_is_shared_between_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bucket")
+            # Each limiter stands for a different process using the same file
+            limiters = [FileRateLimiter(path, rate=50, burst=1) for _ in range(2)]
+
+            async def acquire_from_both_limiters():
+                for _ in range(3):
+                    for limiter in limiters:
+                        await limiter.acquire()
+
+            initial_time = time.perf_counter()
+            asyncio.run(acquire_from_both_limiters())
+            assert time.perf_counter() - initial_time >= 5 / 50 * 0.9
+            assert sum(limiter.throttled_requests for limiter in limiters) == 5
+
+    def test_task_scheduler_orders_dependent_tasks(self):
+        scheduler = TaskScheduler()
+        events = []
+
+        async def task(name: str, fail: bool = False):
+            events.append(f"start {name}")
+            await asyncio.sleep(0.01)
+            events.append(f"end {name}")
+            if fail:
+                raise RuntimeError(name)
+            return name
+
+        scheduler.add(task("write a"), "write a", [], ["a"])
+        scheduler.add(task("read a"), "read a", ["a"], [])
+        scheduler.add(task("write b"), "write b", [], ["b"])
+        scheduler.add(task("rewrite a"), "rewrite a", [], ["a"])
+        undeclared = scheduler.add(task("undeclared"), "undeclared")
+        dependencies = [t["depends_on"] for t in scheduler.explain()]
+        assert dependencies == [[], [0], [], [0, 1], []]
+        assert [t["wave"] for t in scheduler.explain()] == [0, 1, 0, 2, 0]
+        assert scheduler.has_pending_writer("a")
+
+        # Only the target and its dependencies are executed
+        assert asyncio.run(scheduler.run(targets=[undeclared])) == ["undeclared"]
+        assert len(scheduler) == 4
+        results = asyncio.run(scheduler.run(max_workers=1))
+        assert results == ["write a", "read a", "write b", "rewrite a"]
+        assert not scheduler.has_pending_writer("a")
+        assert events.index("end write a") < events.index("start read a")
+        assert events.index("end read a") < events.index("start rewrite a")
+        # One worker executes the tasks one at a time
+        assert all(e.startswith("start") for e in events[2::2])
+
+        scheduler.add(task("fails", fail=True), "fails", [], ["c"])
+        scheduler.add(task("depends"), "depends", ["c"], [])
+        scheduler.add(task("independent"), "independent", [], ["d"])
+        with self.assertRaises(RuntimeError):
+            asyncio.run(scheduler.run())
+        statuses = [t["status"] for t in scheduler.explain()[-3:]]
+        assert statuses == ["failed", "skipped", "done"]
+
+    def test_menu_paths_are_built_concurrently(self):
+        menu_paths = [f"{API_CLIENT_TEST_PATH} {i}" for i in range(3)]
+        first_index = s._async_pool.task_scheduler._added
+        s.activate_async_execution(max_workers=4)
+        try:
+            for menu_path in menu_paths:
+                s.set_menu_path(menu_path)
+                for order in range(3):
+                    s.plt.html(html=f"<p>{menu_path} {order}</p>", order=order)
+            # Changing the menu path does not wait for the charts of the other paths
+            assert len(s._async_pool.task_scheduler) == 9
+            s.set_menu_path(menu_paths[0])
+            assert len(s._async_pool.task_scheduler) == 6
+            s.plt.html(html="<p>updated</p>", order=0)
+            s.run()
+        finally:
+            s.activate_sequential_execution()
+            s._async_pool.max_workers = DEFAULT_MAX_WORKERS
+
+        schedule = [t for t in s.get_task_schedule() if t["index"] >= first_index]
+        assert all(task["status"] == "done" for task in schedule)
+        # Going back to the first menu path waits for its charts
+        revisit = [t for t in schedule if t["name"] == "set_menu_path"][-1]
+        assert len(revisit["depends_on"]) == 3
+        html_tasks = [task for task in schedule if task["name"] == "html"]
+        assert len(html_tasks) == 10
+        assert len({task["run"] for task in html_tasks}) == 2
+        assert "('menu_path', " in s.get_task_schedule("text")
+
+        for menu_path in menu_paths:
+            s.set_menu_path(menu_path)
+            html = sorted(
+                component["chartData"][0]["value"]
+                for component in s.components.get_components_in_sub_path(path=None)
+            )
+            expected = [f"<p>{menu_path} {order}</p>" for order in range(3)]
+            if menu_path == menu_paths[0]:
+                expected = ["<p>updated</p>"] + expected[1:]
+            assert html == sorted(expected)
+            s.pop_out_of_menu_path()
+            s.menu_paths.delete_menu_path(name=menu_path)
+
+    def test_async_client_awaits_the_layers_directly(self):
+        menu_path = f"{API_CLIENT_TEST_PATH} async"
+
+        async def build_menu_path():
+            async with AsyncClient(
+                local_port=s.local_port, verbosity="WARNING"
+            ) as async_client:
+                await async_client.set_workspace(uuid=business_id)
+                await async_client.set_menu_path(menu_path)
+                await asyncio.gather(
+                    *[
+                        async_client.plt.html(html=f"<p>{order}</p>", order=order)
+                        for order in range(3)
+                    ]
+                )
+                await async_client.plt.set_tabs_index(("tabs", "tab"), order=3)
+                await async_client.plt.html(html="<p>tab</p>", order=0)
+                async_client.plt.pop_out_of_tabs_group()
+                order = await async_client.plt.indicator(
+                    data=[
+                        {"title": "Sales", "value": 10},
+                        {"title": "Clients", "value": 3},
+                    ],
+                    order=4,
+                )
+                assert order == 6
+                await async_client.plt.line_with_summary(
+                    order=order,
+                    data=[{"x": "a", "y": 1}, {"x": "b", "y": 2}],
+                    title="Summary",
+                    x="x",
+                    value=3,
+                )
+                assert not async_client.plt._bentobox_data
+                await async_client.run()
+                assert not async_client._async_pool.ending_tasks
+                menu_path_components = (
+                    await async_client.menu_paths.get_menu_path_components(
+                        name=menu_path
+                    )
+                )
+                await async_client.pop_out_of_menu_path()
+                await async_client.menu_paths.delete_menu_path(name=menu_path)
+                return menu_path_components
+
+        components = asyncio.run(build_menu_path())
+        # The htmls, the tabs group, the two indicators and the area and the indicator
+        # of the summary line
+        assert len(components) == 9
+        tabs_group = [c for c in components if c["reportType"] == "TABS"][0]
+        assert len(tabs_group["properties"]["tabs"]["tab"]["reportIds"]) == 1
+        indicators = [c for c in components if c["reportType"] == "INDICATOR"]
+        assert sorted(c["order"] for c in indicators) == [4, 5, 7]
+        summary = [c for c in components if c["order"] in (6, 7)]
+        assert len({c["bentobox"]["bentoboxId"] for c in summary}) == 1
+
+    def test_task_profile_and_chrome_trace(self):
+        s.activate_async_execution(max_workers=2)
+        s.enable_task_profiling()
+        try:
+            for order in range(4):
+                s.plt.html(html=f"<p>{order}</p>", order=order)
+            s.run()
+        finally:
+            s.disable_task_profiling()
+            s.activate_sequential_execution()
+            s._async_pool.max_workers = DEFAULT_MAX_WORKERS
+
+        profile = s.get_task_profile(top=2)
+        # The four charts and the run
+        assert profile["tasks"] == 5
+        assert profile["max_concurrency"] == 2
+        assert profile["api_calls"] > 0 and profile["bytes_sent"] > 0
+        assert len(profile["slowest_tasks"]) == 2
+        charts = [t for t in profile["critical_path"]["tasks"] if t["name"] == "html"]
+        # The charts are independent, only the slowest is in the critical path
+        assert len(charts) == 1
+        assert charts[0]["labels"]["menu_path"] == API_CLIENT_TEST_PATH
+        assert charts[0]["api_calls"] > 0
+        assert profile["critical_path"]["duration_ms"] <= profile["wall_time_ms"]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            s.export_task_trace(path)
+            with open(path) as trace_file:
+                events = json.load(trace_file)["traceEvents"]
+        tasks = [event for event in events if event["ph"] == "X"]
+        assert len(tasks) == 5
+        assert {event["tid"] for event in tasks} == {0, 1}
+        assert all(event["dur"] > 0 for event in tasks)
+
+    def test_method_timings_sink(self):
+        timings = MethodTimings()
+        add_instrumentation_sink(timings)
+        try:
+            with self.assertRaises(APIError):
+                s.components.get_component(uuid=str(uuid4()))
+        finally:
+            remove_instrumentation_sink(timings)
+        calls = timings.to_dict()
+        assert calls["ComponentsLayer.get_component"]["calls"] == 1
+        assert calls["ComponentsLayer.get_component"]["failures"] == 1
+        assert any(name.startswith("App.") for name in calls)
+        assert all(call["total_ms"] >= call["max_ms"] for call in calls.values())
+
+        # Once removed the sink does not receive the calls
+        with self.assertRaises(APIError):
+            s.components.get_component(uuid=str(uuid4()))
+        assert timings.to_dict()["ComponentsLayer.get_component"]["calls"] == 1
+
+    def test_log_indentation_follows_the_calls(self):
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(IndentFormatter("%(indent)s%(message)s"))
+        test_logger = logging.getLogger("test_log_indentation")
+        test_logger.addHandler(handler)
+        test_logger.setLevel(logging.INFO)
+        test_logger.propagate = False
+
+        @logging_before_and_after(test_logger.info, name="inner")
+        async def inner():
+            await asyncio.sleep(0.01)
+            test_logger.info("inside")
+
+        @logging_before_and_after(test_logger.info, name="outer")
+        async def outer():
+            # The concurrent calls are one level deeper than the outer call
+            await asyncio.gather(inner(), inner())
+
+        asyncio.run(outer())
+        lines = [
+            line.replace("\033[4m", "").replace("\033[0m", "")
+            for line in stream.getvalue().splitlines()
+        ]
+        assert lines[0] == " -> Starting execution: outer"
+        assert lines[1:3] == [" ｜ -> Starting execution: inner"] * 2
+        middle = sorted(line.split(",")[0] for line in lines[3:7])
+        assert middle == [" ｜ <- Finished execution: inner"] * 2 + [" ｜ ｜ | inside"] * 2
+        assert lines[-1].startswith(" <- Finished execution: outer")
+
+    def test_json_logs_are_written_from_a_queue(self):
+        stream = io.StringIO()
+        s.activate_async_execution()
+        try:
+            configure_logging("DEBUG", stream, json_format=True, queued=True)
+            for order in range(2):
+                s.plt.html(html=f"<p>{order}</p>", order=order)
+            s.run()
+            # Writes the records left in the queue
+            stop_logging_queue()
+        finally:
+            configure_logging("WARNING")
+            s.activate_sequential_execution()
+
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert all("\033" not in record["message"] for record in records)
+        requests = [record for record in records if "latency_ms" in record]
+        charts = [record for record in requests if record.get("task") == "html"]
+        assert {record["order"] for record in charts} == {0, 1}
+        assert all(record["menu_path"] == API_CLIENT_TEST_PATH for record in charts)
+        assert all(record["call_depth"] > 0 for record in charts)
+        assert all(record["bytes_sent"] > 0 for record in charts)
+
+    def test_package_is_imported_lazily(self):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, shimoku; "
+                "print('pandas' in sys.modules, 'shimoku.client' in sys.modules); "
+                "shimoku.Client; "
+                "print('shimoku.client' in sys.modules)",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.split() == ["False", "False", "True"]
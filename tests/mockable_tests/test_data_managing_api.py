@@ -1,4 +1,5 @@
 """"""
+import asyncio
 import json
 import time
 
@@ -6,10 +7,14 @@ from os import getenv
 from typing import Dict
 from unittest import TestCase
 
+import numpy as np
 import pandas as pd
 
-from shimoku.exceptions import DataError
+from shimoku.exceptions import DataError, APIError, BatchUploadError
 from shimoku import Client
+from shimoku.api.client import ApiClient
+from shimoku.api.transport import Transport
+from shimoku.api.resources.data_set import convert_input_data_to_db_items
 
 from utils import initiate_shimoku
 
@@ -140,3 +145,187 @@ class TestDataSets(TestCase):
             bad_df_aux = [bad_df[1]]
             with self.assertRaises(DataError):
                 self.shimoku_client.data.append_to_data_set(name=TEST_DATA_SET_NAME, data=bad_df_aux)
+
+    def test_data_with_numpy_values_is_uploaded(self):
+        data = [{"a": np.int64(i), "b": np.float64(i / 2)} for i in range(150)]
+        self.shimoku_client.data.append_to_data_set(name="numpy values", data=data)
+        data_set_data = self.shimoku_client.data.get_data_from_data_set(
+            name="numpy values"
+        )
+        assert len(data_set_data) == 150
+        self.shimoku_client.data.delete_data_set(name="numpy values")
+
+    def test_batches_are_streamed_with_bounded_concurrency(self):
+        api_client: ApiClient = self.shimoku_client._api_client
+        app = self.shimoku_client._app_object
+        batches_sent = []
+        in_flight = [0, 0]
+
+        class CountingTransport(Transport):
+            async def send(self, api_client, method, url, *args, **kwargs):
+                if not url.endswith("/batch"):
+                    return await super().send(api_client, method, url, *args, **kwargs)
+                batches_sent.append(url)
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+                try:
+                    await asyncio.sleep(0.01)
+                    # The third chunk fails
+                    if len(batches_sent) == 3:
+                        raise APIError("Bad request", status_code=400)
+                    return await super().send(api_client, method, url, *args, **kwargs)
+                finally:
+                    in_flight[0] -= 1
+
+        items = convert_input_data_to_db_items(pd.DataFrame({"x": range(450)}))
+        progress = []
+
+        async def upload():
+            async with api_client:
+                data_set = await app.get_data_set(name="streamed batches")
+                await data_set._base_resource.create_children_batch(
+                    data_set.DataPoint,
+                    (item for item in items),
+                    unit=" data points",
+                    max_in_flight=2,
+                    progress_callback=lambda created, total: progress.append(
+                        (created, total)
+                    ),
+                )
+
+        transport = api_client.transport
+        api_client.transport = CountingTransport()
+        try:
+            with self.assertRaises(BatchUploadError) as context:
+                asyncio.run(upload())
+        finally:
+            api_client.transport = transport
+            asyncio.run(app.delete_data_set(name="streamed batches"))
+
+        assert len(batches_sent) == 5
+        assert in_flight[1] == 2
+        assert context.exception.failed_ranges == [(200, 300)]
+        assert context.exception.status_code == 400
+        assert progress[-1] == (350, None)
+
+    def test_failing_progress_callback_stops_the_upload(self):
+        api_client: ApiClient = self.shimoku_client._api_client
+        app = self.shimoku_client._app_object
+        items = convert_input_data_to_db_items(pd.DataFrame({"x": range(1000)}))
+
+        def failing_callback(created, total):
+            raise RuntimeError("Progress bar closed")
+
+        async def upload():
+            async with api_client:
+                data_set = await app.get_data_set(name="failing progress")
+                await asyncio.wait_for(
+                    data_set._base_resource.create_children_batch(
+                        data_set.DataPoint,
+                        (item for item in items),
+                        unit=" data points",
+                        max_in_flight=2,
+                        progress_callback=failing_callback,
+                    ),
+                    timeout=30,
+                )
+
+        try:
+            with self.assertRaises(RuntimeError):
+                asyncio.run(upload())
+        finally:
+            asyncio.run(app.delete_data_set(name="failing progress"))
+
+    def test_data_points_only_store_the_fields_they_use(self):
+        app = self.shimoku_client._app_object
+
+        async def create_and_list():
+            data_set = await app.get_data_set(name="sparse data points")
+            await data_set.create_data_points(
+                pd.DataFrame({"name": ["a", "b"], "value": [1, 2]})
+            )
+            return data_set, await data_set.get_data_points()
+
+        try:
+            data_set, data_points = asyncio.run(create_and_list())
+            data_point = data_points[0]
+            params = data_point._base_resource.params
+            assert set(params._values) <= {
+                "dataSetId",
+                "stringField1",
+                "intField1",
+                "orderField1",
+                "description",
+                "customField1",
+            }
+            # It behaves like the dict with the whole schema
+            assert len(data_point.cascade_to_dict()) == 110
+            assert data_point["stringField50"] is None
+            data_point["intField1"] = 3.0
+            assert data_point.cascade_to_dict()["intField1"] == 3.0
+            asyncio.run(data_point.update())
+            data_set.clear()
+            updated = sorted(
+                dp["intField1"] for dp in asyncio.run(data_set.get_data_points())
+            )
+            assert updated == sorted([3.0, data_points[1]["intField1"]])
+        finally:
+            asyncio.run(app.delete_data_set(name="sparse data points"))
+
+    def test_data_set_is_fetched_into_a_data_frame(self):
+        df = pd.DataFrame(
+            {
+                "name": ["a", "b", "c"],
+                "value": [1.5, 2.0, 3.0],
+                "date": pd.to_datetime(["2024-01-01", "2024-02-01", "2024-03-01"]),
+            }
+        )
+        self.shimoku_client.data.append_to_data_set(data=df, name="data frame data set")
+        try:
+            result = self.shimoku_client.data.get_data_frame_from_data_set(
+                name="data frame data set"
+            )
+            result = result.sort_values("name", ignore_index=True)
+            pd.testing.assert_frame_equal(result, df, check_dtype=False)
+            assert pd.api.types.is_datetime64_dtype(result["date"])
+
+            result = self.shimoku_client.data.get_data_frame_from_data_set(
+                name="data frame data set", columns=["value"], limit=2
+            )
+            assert list(result.columns) == ["value"]
+            assert len(result) == 2
+            with self.assertRaises(DataError):
+                self.shimoku_client.data.get_data_frame_from_data_set(
+                    name="data frame data set", columns=["unknown"]
+                )
+        finally:
+            self.shimoku_client.data.delete_data_set(name="data frame data set")
+
+    def test_data_frame_rows_keep_their_order_without_the_order_column(self):
+        names = [f"row {i}" for i in range(20)]
+        self.shimoku_client.data.append_to_data_set(
+            data=pd.DataFrame({"name": names}), name="ordered data set"
+        )
+
+        class ReversingTransport(Transport):
+            # The api does not return the data points in order
+            async def send(self, api_client, method, url, *args, **kwargs):
+                data, sent, received = await super().send(
+                    api_client, method, url, *args, **kwargs
+                )
+                if method == "GET" and "/datas" in url:
+                    data.reverse()
+                return data, sent, received
+
+        api_client: ApiClient = self.shimoku_client._api_client
+        transport = api_client.transport
+        api_client.transport = ReversingTransport()
+        try:
+            result = self.shimoku_client.data.get_data_frame_from_data_set(
+                name="ordered data set", columns=["name"]
+            )
+            assert list(result.columns) == ["name"]
+            assert list(result["name"]) == names
+        finally:
+            api_client.transport = transport
+            self.shimoku_client.data.delete_data_set(name="ordered data set")
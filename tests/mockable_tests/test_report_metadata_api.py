@@ -1,14 +1,29 @@
+import asyncio
+import json
+import time
 import unittest
 from os import getenv
 from utils import initiate_shimoku
+from shimoku.api.client import ApiClient
+from shimoku.api.cache_policy import CachePolicy
+from shimoku.api.transport import Transport
+from shimoku.api.base_resource import BaseResource
+from shimoku.api.resources.report import Report
 from shimoku.exceptions import APIError
 
 s = initiate_shimoku()
 business_id: str = getenv("BUSINESS_ID")
 mock: bool = getenv("MOCK") == "TRUE"
 
+REPORT_TEST_PATH = "Report test path"
+
 
 class TestReport(unittest.TestCase):
+    def setUp(self):
+        s.set_workspace(uuid=business_id)
+        s.set_menu_path(REPORT_TEST_PATH)
+        s.plt.clear_menu_path()
+
     def test_get_report(self):
         s.set_workspace(uuid=business_id)
         s.set_menu_path("Report test path")
@@ -25,3 +40,202 @@ class TestReport(unittest.TestCase):
         if not mock:
             with self.assertRaises(APIError):
                 s.components.get_component(uuid=report["id"])
+
+    def test_resource_cache_eviction_and_staleness(self):
+        for order in range(4):
+            s.plt.html(html="<h1>test</h1>", order=order)
+        s.run()
+        app = s._app_object
+        app.clear()
+        reports_cache = app.children[Report]
+
+        s.set_cache_policy(CachePolicy(max_entries=2), "reports")
+        try:
+            reports = asyncio.run(app.get_reports())
+            assert len(reports) == 4
+            assert reports_cache.get_stats()["entries"] == 2
+            assert reports_cache.evictions == 2
+            # The evicted reports are fetched again by id
+            evicted_id = reports[0]["id"]
+            assert evicted_id not in reports_cache
+            assert asyncio.run(app.get_report(uuid=evicted_id))["id"] == evicted_id
+            # Incomplete listings are not trusted
+            assert len(asyncio.run(app.get_reports())) == 4
+
+            app.clear()
+            s.set_cache_policy(CachePolicy(ttl=0.05), "reports")
+            reports = asyncio.run(app.get_reports())
+            calls = s.get_api_calls_counter()
+            assert asyncio.run(app.get_reports()) == reports
+            assert s.get_api_calls_counter() == calls
+            time.sleep(0.1)
+            refreshed = asyncio.run(app.get_reports())
+            assert s.get_api_calls_counter() == calls + 1
+            # The stale listing is refreshed in place
+            assert all(a is b for a, b in zip(reports, refreshed))
+            assert reports_cache.refreshes == 4
+        finally:
+            s.set_cache_policy(None, "reports")
+            app.clear()
+
+    def test_eviction_only_checks_the_changes_it_needs(self):
+        # A menu path of its own, so that the evictions of its cache are not counted
+        # by the other tests
+        s.set_menu_path(f"{REPORT_TEST_PATH} eviction")
+        for order in range(4):
+            s.plt.html(html="<h1>test</h1>", order=order)
+        s.run()
+        app = s._app_object
+        app.clear()
+        reports_cache = app.children[Report]
+        digests = []
+        get_digest = BaseResource.get_digest
+
+        def counting_get_digest(value):
+            digests.append(value)
+            return get_digest(value)
+
+        s.set_cache_policy(CachePolicy(max_entries=4), "reports")
+        BaseResource.get_digest = staticmethod(counting_get_digest)
+        try:
+            reports = asyncio.run(app.get_reports())
+            for report in reports:
+                report["properties"], report["dataFields"]
+            # The least recently used report has changes that have not been sent
+            reports[0]["properties"]["modified"] = True
+            digests.clear()
+            reports_cache._evict()
+            assert not digests
+
+            s.set_cache_policy(CachePolicy(max_entries=3), "reports")
+            reports_cache._evict()
+            # It stops at the first changed param, then evicts the next report
+            assert len(digests) == 3
+            assert reports[0]["id"] in reports_cache
+            assert reports[1]["id"] not in reports_cache
+        finally:
+            BaseResource.get_digest = staticmethod(get_digest)
+            s.set_cache_policy(None, "reports")
+            app.clear()
+            s.plt.clear_menu_path()
+
+    def test_resource_cache_secondary_indexes(self):
+        s.plt.html(html="<h1>test</h1>", order=0)
+        s.set_menu_path(REPORT_TEST_PATH, "Sub path")
+        s.plt.bar(data=[{"x": "a", "y": 1}], x="x", y="y", order=0)
+        s.plt.bar(data=[{"x": "b", "y": 2}], x="x", y="y", order=1)
+        s.run()
+        app = s._app_object
+        app.clear()
+
+        async def lookups():
+            await app.get_reports()
+            calls = s.get_api_calls_counter()
+            by_path = await app.get_reports_by_path()
+            in_sub_path = await app.get_reports_in_path("Sub path")
+            assert s.get_api_calls_counter() == calls
+            return by_path, in_sub_path
+
+        by_path, in_sub_path = asyncio.run(lookups())
+        assert set(by_path) == {None, "Sub path"}
+        assert by_path["Sub path"] == in_sub_path
+        assert len(in_sub_path) == 2
+
+        report = in_sub_path[0]
+        data_set_ids = asyncio.run(report.get_linked_data_set_ids())
+        assert len(data_set_ids) == 1
+        links = asyncio.run(report.get_report_data_sets_of_data_set(data_set_ids[0]))
+        assert links and all(link["dataSetId"] == data_set_ids[0] for link in links)
+
+        # The index follows the changes of the params
+        report["path"] = "Other path"
+        assert asyncio.run(app.get_reports_in_path("Other path")) == [report]
+        assert len(asyncio.run(app.get_reports_in_path("Sub path"))) == 1
+        report["path"] = "Sub path"
+        report.empty_changed_params()
+        assert asyncio.run(app.get_paths_in_order()) == ["Sub path"]
+
+        s.plt.clear_menu_path()
+        assert asyncio.run(app.get_reports_in_path("Sub path")) == []
+        assert len(asyncio.run(app.get_reports_in_path(None))) == 1
+
+    def test_reports_are_grouped_by_path_with_one_listing(self):
+        s.plt.html(html="<h1>test</h1>", order=0)
+        for path in ("First", "Second", "Third"):
+            s.set_menu_path(REPORT_TEST_PATH, path)
+            s.plt.html(html=f"<h1>{path}</h1>", order=0)
+        s.run()
+
+        def report_listings() -> int:
+            return sum(
+                endpoint["calls"]
+                for key, endpoint in s.get_api_metrics().items()
+                if key.startswith("GET ") and key.endswith("/reports")
+            )
+
+        s.disable_caching()
+        try:
+            listings = report_listings()
+            paths = asyncio.run(s._app_object.get_paths_in_order())
+            assert paths == ["First", "Second", "Third"]
+            assert report_listings() == listings + 1
+
+            # One listing to find the reports of the path and one to find the data
+            # sets that are not used anymore
+            s.plt.clear_menu_path()
+            assert report_listings() == listings + 3
+        finally:
+            s.enable_caching()
+        s._app_object.clear()
+        assert set(asyncio.run(s._app_object.get_reports_by_path())) == {
+            None,
+            "First",
+            "Second",
+        }
+
+    def test_only_modified_params_are_updated(self):
+        s.plt.html(html="<h1>test</h1>", order=0)
+        s.run()
+        app = s._app_object
+        report = asyncio.run(app.get_reports())[0]
+        patches = []
+
+        class PatchRecordingTransport(Transport):
+            async def send(
+                self,
+                api_client,
+                method,
+                url,
+                query_params=None,
+                headers=None,
+                body=None,
+            ):
+                if method == "PATCH":
+                    patches.append(body)
+                return await super().send(
+                    api_client, method, url, query_params, headers, body
+                )
+
+        api_client: ApiClient = s._api_client
+        transport = api_client.transport
+        api_client.transport = PatchRecordingTransport()
+        try:
+            avoided = s.get_avoided_patches_counter()
+            # Reading a dict param does not make it change
+            report["properties"]
+            report["order"] = report["order"]
+            assert not asyncio.run(report.update())
+            assert s.get_avoided_patches_counter() == avoided + 1
+
+            # Plotting the same chart again sends nothing
+            s.plt.html(html="<h1>test</h1>", order=0)
+            s.run()
+            assert not patches
+
+            # The references read can still be modified after an update
+            report["bentobox"]["modified"] = True
+            assert asyncio.run(report.update())
+            assert len(patches) == 1
+            assert set(json.loads(patches[0])) == {"bentobox"}
+        finally:
+            api_client.transport = transport